@@ -2,15 +2,25 @@ import asyncio
 import logging
 from collections.abc import Awaitable
 from http import HTTPStatus
-from typing import Callable, Optional
+from typing import Callable, Dict, Optional
 from urllib.parse import unquote, urlparse
 
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.types import Send
 
+from .async_map import Budget
+from .conditions import if_range_holds, not_modified
 from .folder import Folder
 from .member import Member
-from .reqres import PropfindRequest, propfind
+from .propfind_cache import PropfindCache
+from .ranges import (
+    MultipartByteranges,
+    RangeNotSatisfiable,
+    content_range,
+    parse_range,
+)
+from .reqres import INFINITY, PropfindRequest, propfind_stream
 from .resource import Resource
 
 logger = logging.getLogger(__name__)
@@ -33,6 +43,34 @@ def extract_path_from_destination(destination: str) -> str:
     return unquote(path)
 
 
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    Closes the body once the response ends, also when the client went away in the
+    middle of it, so whatever the body still had running is cancelled right away
+    instead of whenever the generator is collected.
+    """
+
+    async def stream_response(self, send: Send) -> None:
+        try:
+            await super().stream_response(send)
+        finally:
+            if (aclose := getattr(self.body_iterator, "aclose", None)) is not None:
+                await aclose()
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() != "gzip":
+            continue
+        q = params.strip().removeprefix("q=") or "1"
+        try:
+            return float(q) > 0
+        except ValueError:
+            return True
+    return False
+
+
 METHODS = frozenset(
     {
         "GET",
@@ -54,6 +92,10 @@ METHODS = frozenset(
 def create_app(
     get_member: Callable[[str], Awaitable[Optional[Member]]],
     base_path: str = "",
+    propfind_cache: Optional[PropfindCache] = None,
+    propfind_concurrency: int = 64,
+    allow_infinite_depth: bool = False,
+    max_infinite_depth_responses: Optional[int] = None,
 ) -> FastAPI:
     async def root() -> Folder:
         res = await get_member("/")
@@ -76,6 +118,18 @@ def create_app(
     def BAD_REQUEST(detail: str) -> Response:
         return Response(status_code=HTTPStatus.BAD_REQUEST, content=detail)
 
+    # a PROPFIND of the whole tree is refused unless allowed (RFC 4918, 9.1)
+    FINITE_DEPTH_REQUIRED = Response(
+        status_code=HTTPStatus.FORBIDDEN,
+        content='<?xml version="1.0" encoding="utf-8"?>'
+        '<D:error xmlns:D="DAV:"><D:propfind-finite-depth/></D:error>',
+        headers=common_headers | {"Content-Type": "application/xml; charset=utf-8"},
+    )
+
+    # properties resolved at once by all PROPFIND requests together, each of them
+    # only gets a share of it
+    propfind_budget = Budget(propfind_concurrency)
+
     app = FastAPI()
 
     @app.options(path="/{path:path}")
@@ -91,101 +145,163 @@ def create_app(
 
     @app.api_route("/{path:path}", methods=["PROPFIND"])
     async def handle_propfind(request: Request, path: str):
-        r = await PropfindRequest.from_request(request)
-        if member := await get_member(path):
-            resp = await propfind((member,), r.depth, r.props, base_path)
-            return Response(
-                resp,
-                status_code=HTTPStatus.MULTI_STATUS,
-                media_type="application/xml; charset=utf-8",
-                headers=common_headers
-                | {"Content-Type": "application/xml; charset=utf-8"},
-            )
-        return NOT_FOUND
+        try:
+            r = await PropfindRequest.from_request(request)
+        except ValueError as ex:
+            return BAD_REQUEST(str(ex))
+        if r.depth == INFINITY and not allow_infinite_depth:
+            return FINITE_DEPTH_REQUIRED
+        if not (member := await get_member(path)):
+            return NOT_FOUND
+
+        headers = common_headers | {"Content-Type": "application/xml; charset=utf-8"}
+        chunks = propfind_stream(
+            (member,),
+            r.depth,
+            r.props,
+            base_path,
+            propfind_budget,
+            max_infinite_depth_responses if r.depth == INFINITY else None,
+        )
+
+        generation = member.generation()
+        if propfind_cache is not None and generation is not None:
+            key = (member.path, r.depth, tuple(sorted(r.props)))
+            headers["Vary"] = "Accept-Encoding"
+            if cached := propfind_cache.get(key, generation):
+                if accepts_gzip(request.headers.get("Accept-Encoding", "")):
+                    body = propfind_cache.gzipped(key, cached)
+                    headers["Content-Encoding"] = "gzip"
+                else:
+                    body = cached.body
+                return Response(
+                    body, status_code=HTTPStatus.MULTI_STATUS, headers=headers
+                )
+            chunks = propfind_cache.tee(key, generation, chunks)
+
+        return ClosingStreamingResponse(
+            chunks,
+            status_code=HTTPStatus.MULTI_STATUS,
+            media_type="application/xml; charset=utf-8",
+            headers=headers,
+        )
+
+    def validators(etag: Optional[str], last_modified: Optional[int]) -> Dict[str, str]:
+        res = {}
+        if last_modified is not None:
+            res["Last-Modified"] = Member.unixdate2rfc1123(last_modified)
+        if etag is not None:
+            res["ETag"] = etag
+        return res
+
+    def NOT_MODIFIED(etag: Optional[str], last_modified: Optional[int]) -> Response:
+        return Response(
+            status_code=HTTPStatus.NOT_MODIFIED,
+            headers=common_headers | validators(etag, last_modified),
+        )
 
     @app.head("/{path:path}")
     async def head(request: Request, path: str):
         if member := await get_member(path):
             if isinstance(member, Folder):
+                # the last modification of a folder does not cover what happens to
+                # its members, only the entity tag is a validator of it
+                etag = await member.etag()
+                if not_modified(request.headers, etag, None):
+                    return NOT_MODIFIED(etag, None)
                 return Response(
                     status_code=HTTPStatus.OK,
                     headers=common_headers
+                    | validators(etag, None)
                     | {
                         "Content-Type": "httpd/unix-directory",
-                        "Last-Modified": str(await member.last_modified()),
                         "Accept-Ranges": "none",
                     },
                 )
-            content_length, content_type, last_modified = await asyncio.gather(
+            content_length, content_type, last_modified, etag = await asyncio.gather(
                 member.content_length(),
                 member.content_type(),
                 member.last_modified(),
+                member.etag(),
             )
+            if not_modified(request.headers, etag, last_modified):
+                return NOT_MODIFIED(etag, last_modified)
             return Response(
                 status_code=HTTPStatus.OK,
                 headers=common_headers
+                | validators(etag, last_modified)
                 | {
                     "Content-Type": content_type,
                     "Content-Length": str(content_length),
-                    "Last-Modified": str(last_modified),
                 },
             )
         return NOT_FOUND
 
     @app.get("/{path:path}")
     async def get(request: Request, path: str):
-        begin, end = 0, -1
-        is_range_request = False
-
-        if "Range" in request.headers:
-            range_header = request.headers["Range"]
-            if range_header.startswith("bytes="):
-                is_range_request = True
-                range_value = range_header[len("bytes=") :]
-                if "-" in range_value:
-                    begin_str, end_str = range_value.split("-", 1)
-                    if begin_str:
-                        begin = int(begin_str.strip())
-                    if end_str:
-                        end = int(end_str.strip())
-                else:
-                    begin = int(range_value)
-
-        if member := await get_member(path):
-            if isinstance(member, Resource):
-                content, media_type, last_modified, content_length = (
-                    await asyncio.gather(
-                        member.get_content(begin, end),
-                        member.content_type(),
-                        member.last_modified(),
-                        member.content_length(),
-                    )
-                )
+        if not (member := await get_member(path)):
+            return NOT_FOUND
+        if not isinstance(member, Resource):
+            raise ValueError("Expected a Resource, got a Folder")
 
-                headers = {
-                    "Last-Modified": str(last_modified),
-                    "Accept-Ranges": "bytes",
-                }
-
-                if is_range_request:
-                    actual_end = end if end != -1 else content_length - 1
-                    headers["Content-Range"] = (
-                        f"bytes {begin}-{actual_end}/{content_length}"
-                    )
-                    status_code = HTTPStatus.PARTIAL_CONTENT
-                else:
-                    status_code = HTTPStatus.OK
+        media_type, last_modified, size, etag = await asyncio.gather(
+            member.content_type(),
+            member.last_modified(),
+            member.content_length(),
+            member.etag(),
+        )
 
-                return StreamingResponse(
-                    content=content,
-                    status_code=status_code,
-                    media_type=media_type,
-                    headers=headers,
+        if not_modified(request.headers, etag, last_modified):
+            return NOT_MODIFIED(etag, last_modified)
+
+        headers = validators(etag, last_modified) | {"Accept-Ranges": "bytes"}
+
+        ranges = None
+        # ranges of content of unknown size cannot be resolved, nor the ones of
+        # another version of it than the client has
+        if (
+            (range_header := request.headers.get("Range")) is not None
+            and size >= 0
+            and if_range_holds(request.headers, etag, last_modified)
+        ):
+            try:
+                ranges = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers=headers | {"Content-Range": f"bytes */{size}"},
                 )
 
-            raise ValueError("Expected a Resource, got a Folder")
+        if ranges is None:
+            if size >= 0:
+                headers["Content-Length"] = str(size)
+            return ClosingStreamingResponse(
+                content=await member.get_content(0, -1),
+                status_code=HTTPStatus.OK,
+                media_type=media_type,
+                headers=headers,
+            )
 
-        return NOT_FOUND
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            return ClosingStreamingResponse(
+                content=await member.get_content(first, last),
+                status_code=HTTPStatus.PARTIAL_CONTENT,
+                media_type=media_type,
+                headers=headers
+                | {
+                    "Content-Range": content_range(ranges[0], size),
+                    "Content-Length": str(last - first + 1),
+                },
+            )
+
+        multipart = MultipartByteranges(ranges, size, media_type)
+        return ClosingStreamingResponse(
+            content=multipart.body(lambda r: member.get_content(*r)),
+            status_code=HTTPStatus.PARTIAL_CONTENT,
+            media_type=multipart.content_type,
+            headers=headers | {"Content-Length": str(len(multipart))},
+        )
 
     @app.put("/{path:path}")
     async def put(request: Request, path: str):
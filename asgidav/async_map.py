@@ -1,14 +1,103 @@
 import asyncio
-from typing import Any, Callable, Coroutine, Iterable, List, TypeVar
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Deque,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
 
 T = TypeVar("T")
 U = TypeVar("U")
 
 
+# calls running at once when nothing else is said
+LIMIT = 32
+
+
+class Budget:
+    """
+    At most `limit` calls at once among everyone holding the budget. A call holds a
+    slot of the budget and of all of its parents, so that parts of a budget can be
+    handed out (see share) without any one of them using it all up.
+    """
+
+    def __init__(self, limit: int, parent: Optional["Budget"] = None):
+        self._semaphore = asyncio.Semaphore(limit)
+        self._parent = parent
+
+    def share(self, limit: int) -> "Budget":
+        return Budget(limit, self)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        # always the own slot first, then the parent's, so no two holders can wait
+        # for each other
+        async with self._semaphore:
+            if self._parent is None:
+                yield
+            else:
+                async with self._parent.slot():
+                    yield
+
+
+async def _call(
+    func: Callable[[T], Coroutine[Any, Any, U]], item: T, budget: Optional[Budget]
+) -> U:
+    if budget is None:
+        return await func(item)
+    async with budget.slot():
+        return await func(item)
+
+
 async def async_map(
-    func: Callable[[T], Coroutine[Any, Any, U]], iterable: Iterable[T]
+    func: Callable[[T], Coroutine[Any, Any, U]],
+    iterable: Iterable[T],
+    limit: int = LIMIT,
+    budget: Optional[Budget] = None,
 ) -> List[U]:
-    tasks: List[asyncio.Task[U]] = [
-        asyncio.create_task(func(item)) for item in iterable
-    ]
-    return await asyncio.gather(*tasks)
+    """The results of the calls in order, with at most `limit` of them running at once"""
+    return [r async for r in async_imap(func, iterable, limit, budget)]
+
+
+async def _aiter(iterable: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    if isinstance(iterable, AsyncIterable):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
+
+
+async def async_imap(
+    func: Callable[[T], Coroutine[Any, Any, U]],
+    iterable: Union[Iterable[T], AsyncIterable[T]],
+    limit: int = LIMIT,
+    budget: Optional[Budget] = None,
+) -> AsyncGenerator[U, None]:
+    """
+    Like async_map, but yields the results in order as soon as they are ready, with at
+    most `limit` calls running ahead of the consumer, and only as many running at once
+    as the budget allows. Calls still running when the consumer stops, or when the
+    generator is closed, are cancelled.
+    """
+    pending: Deque[asyncio.Task[U]] = deque()
+    try:
+        async for item in _aiter(iterable):
+            if len(pending) >= limit:
+                yield await pending.popleft()
+            pending.append(asyncio.create_task(_call(func, item, budget)))
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
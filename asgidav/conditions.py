@@ -0,0 +1,71 @@
+import email.utils
+from typing import List, Mapping, Optional
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    """The unix time in seconds, None if the value is not a date"""
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _etags(value: str) -> List[str]:
+    # entity tags cannot contain commas, the list splits on them
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+def _opaque(etag: str) -> str:
+    return etag.removeprefix("W/")
+
+
+def is_weak(etag: str) -> bool:
+    return etag.startswith("W/")
+
+
+def _weak_match(a: str, b: str) -> bool:
+    return _opaque(a) == _opaque(b)
+
+
+def _strong_match(a: str, b: str) -> bool:
+    return not is_weak(a) and not is_weak(b) and a == b
+
+
+def not_modified(
+    headers: Mapping[str, str], etag: Optional[str], last_modified: Optional[int]
+) -> bool:
+    """
+    Whether a GET or HEAD can be answered with 304 Not Modified. If-None-Match takes
+    precedence over If-Modified-Since, which only has a second of precision and is
+    ignored for members without a modification date.
+    """
+    if (if_none_match := headers.get("If-None-Match")) is not None:
+        if etag is None:
+            return False
+        return any(
+            tag == "*" or _weak_match(tag, etag) for tag in _etags(if_none_match)
+        )
+    if (
+        if_modified_since := headers.get("If-Modified-Since")
+    ) is not None and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and last_modified // 1000 <= since
+    return False
+
+
+def if_range_holds(
+    headers: Mapping[str, str], etag: Optional[str], last_modified: int
+) -> bool:
+    """
+    Whether the Range of a request is to be served. It is not when If-Range names
+    another state of the resource: the client then gets the whole current content
+    instead of a part of it to splice into what it has from an older one.
+    """
+    if (if_range := headers.get("If-Range")) is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        return etag is not None and _strong_match(if_range, etag)
+    # a date is only good enough if it is exactly the one of the content
+    date = _parse_http_date(if_range)
+    return date is not None and date == last_modified // 1000
@@ -1,10 +1,14 @@
 from abc import abstractmethod
-from typing import Tuple
+from typing import Iterable, List, Optional, Tuple, TypedDict
 
+from asgidav.async_map import async_map
 from asgidav.member import Member, Properties, ResourceType
 
+# RFC 4331, not a valid identifier
+_QuotaProperties = TypedDict("_QuotaProperties", {"quota-used-bytes": str}, total=False)
 
-class FolderProperties(Properties):
+
+class FolderProperties(Properties, _QuotaProperties):
     childcount: int
 
 
@@ -25,6 +29,13 @@ class Folder(Member):
     async def member(self, path: str) -> Member | None:
         raise NotImplementedError
 
+    async def members(self, names: Iterable[str]) -> List[Member | None]:
+        """
+        The direct members with the given names, for listings. Override to load what
+        their properties need in bulk instead of member by member.
+        """
+        return await async_map(self.member, names)
+
     @abstractmethod
     async def create_empty_resource(self, path: str) -> Member:
         raise NotImplementedError
@@ -32,9 +43,16 @@ class Folder(Member):
     async def create_folder(self, name: str) -> "Folder":
         raise NotImplementedError
 
+    async def quota_used_bytes(self) -> Optional[int]:
+        """Total size of everything in the folder, None if it is not known"""
+        return None
+
     async def get_properties(self) -> FolderProperties:
         properties = await Member.get_properties(self)
-        return FolderProperties(
+        res = FolderProperties(
             **properties,
             childcount=len(await self.member_names()),
         )
+        if (used := await self.quota_used_bytes()) is not None:
+            res["quota-used-bytes"] = str(used)
+        return res
@@ -3,7 +3,7 @@ import datetime
 import email.utils
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Literal, TypedDict
+from typing import Hashable, Literal, Optional, TypedDict
 
 
 class ResourceType(Enum):
@@ -12,11 +12,21 @@ class ResourceType(Enum):
 
 
 PropertyName = Literal[
-    "getlastmodified", "creationdate", "displayname", "resourcetype", "getcontenttype"
+    "getlastmodified",
+    "creationdate",
+    "displayname",
+    "resourcetype",
+    "getcontenttype",
+    "quota-used-bytes",
 ]
 
 
-class Properties(TypedDict, total=False):
+# properties of RFC 4331, their names are not identifiers
+_QuotaProperties = TypedDict("_QuotaProperties", {"quota-used-bytes": str}, total=False)
+
+
+class Properties(_QuotaProperties, total=False):
+    getetag: str
     getlastmodified: str
     creationdate: str
     displayname: str
@@ -53,6 +63,20 @@ class Member(ABC):
     async def last_modified(self) -> int:
         raise NotImplementedError
 
+    async def etag(self) -> Optional[str]:
+        """
+        The entity tag of the current state of the member, quoted and prefixed with W/
+        when it is weak (RFC 7232, 2.3). Members without one are not sent one.
+        """
+        return None
+
+    def generation(self) -> Optional[Hashable]:
+        """
+        A value which changes whenever anything a PROPFIND of the member reports
+        changes, at any depth. PROPFIND responses of members without one are not cached.
+        """
+        return None
+
     @abstractmethod
     async def remove(self) -> None:
         raise NotImplementedError
@@ -66,22 +90,26 @@ class Member(ABC):
         raise NotImplementedError
 
     async def get_properties(self) -> Properties:
-        getlastmodified, creationdate, displayname, getcontenttype = (
+        getlastmodified, creationdate, displayname, getcontenttype, getetag = (
             await asyncio.gather(
                 self.last_modified(),
                 self.creation_date(),
                 self.display_name(),
                 self.content_type(),
+                self.etag(),
             )
         )
 
-        return Properties(
+        res = Properties(
             getlastmodified=self.unixdate2rfc1123(getlastmodified),
             creationdate=self.unixdate2iso8601(creationdate),
             displayname=displayname,
             resourcetype=self.resource_type.value,
             getcontenttype=getcontenttype,
         )
+        if getetag is not None:
+            res["getetag"] = getetag
+        return res
 
     @classmethod
     def unixdate2iso8601(cls, t: float):
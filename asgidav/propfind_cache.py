@@ -0,0 +1,111 @@
+import gzip
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, Hashable, List, Optional, Tuple
+
+# member path, depth and the requested properties
+Key = Tuple[str, int, Tuple[str, ...]]
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    generation: Hashable
+    body: bytes
+    gzipped: Optional[bytes] = None
+
+    def gzip(self) -> bytes:
+        if self.gzipped is None:
+            self.gzipped = gzip.compress(self.body, compresslevel=6)
+        return self.gzipped
+
+
+class PropfindCache:
+    """
+    Whole PROPFIND responses, kept against the generation of the member they were
+    written for (see Member.generation) and served as long as it did not move on.
+    Responses larger than `max_response_bytes` are only streamed, at most `max_bytes`
+    of responses are kept, the least recently used ones are evicted first.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_response_bytes: int = 1024 * 1024,
+    ):
+        self._max_bytes = max_bytes
+        self._max_response_bytes = max_response_bytes
+        self._responses: OrderedDict[Key, CachedResponse] = OrderedDict()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _cost(response: CachedResponse) -> int:
+        return len(response.body) + len(response.gzipped or b"")
+
+    def _drop(self, key: Key) -> None:
+        if (response := self._responses.pop(key, None)) is not None:
+            self._size -= self._cost(response)
+
+    def get(self, key: Key, generation: Hashable) -> Optional[CachedResponse]:
+        response = self._responses.get(key)
+        if response is None or response.generation != generation:
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._responses.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def gzipped(self, key: Key, response: CachedResponse) -> bytes:
+        """The response compressed, compressed only once"""
+        if response.gzipped is None:
+            body = response.gzip()
+            if self._responses.get(key) is response:
+                self._size += len(body)
+                self._evict()
+        return response.gzip()
+
+    def put(self, key: Key, generation: Hashable, body: bytes) -> None:
+        if len(body) > self._max_response_bytes:
+            return
+        self._drop(key)
+        self._responses[key] = CachedResponse(generation, body)
+        self._size += len(body)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._size > self._max_bytes and self._responses:
+            _, response = self._responses.popitem(last=False)
+            self._size -= self._cost(response)
+
+    async def tee(
+        self, key: Key, generation: Hashable, chunks: AsyncGenerator[bytes, None]
+    ) -> AsyncGenerator[bytes, None]:
+        """Pass the chunks of a response through, and keep it if it is small enough"""
+        kept: Optional[List[bytes]] = []
+        size = 0
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if kept is not None:
+                    size += len(chunk)
+                    if size <= self._max_response_bytes:
+                        kept.append(chunk)
+                    else:
+                        kept = None
+                yield chunk
+        if kept is not None:
+            self.put(key, generation, b"".join(kept))
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._responses),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
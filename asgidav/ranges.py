@@ -0,0 +1,135 @@
+import secrets
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .async_map import async_map
+
+# first and last byte of a range, both included
+ByteRange = Tuple[int, int]
+
+# more ranges than this in one request are not worth the parts, the whole content is
+# sent instead (RFC 7233, 6.1)
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _parse_spec(spec: str, size: int) -> Optional[ByteRange]:
+    """
+    The range of a byte-range-spec or suffix-byte-range-spec within the content, None if
+    it does not overlap with it. Raises ValueError when it is malformed.
+    """
+    first_str, sep, last_str = spec.strip().partition("-")
+    first_str, last_str = first_str.strip(), last_str.strip()
+    if not sep or not (first_str or last_str):
+        raise ValueError(spec)
+    if not all(s.isdigit() for s in (first_str, last_str) if s):
+        raise ValueError(spec)
+
+    if not first_str:
+        # the last bytes, e.g. the index at the end of a video
+        suffix = int(last_str)
+        if suffix == 0 or size == 0:
+            return None
+        return max(0, size - suffix), size - 1
+
+    first = int(first_str)
+    last = int(last_str) if last_str else None
+    if last is not None and last < first:
+        raise ValueError(spec)
+    if first >= size:
+        return None
+    return first, size - 1 if last is None else min(last, size - 1)
+
+
+def _coalesce(ranges: List[ByteRange]) -> List[ByteRange]:
+    """Overlapping or adjacent ranges merged, in order of the content if any were"""
+    ordered = sorted(ranges)
+    merged = [ordered[0]]
+    for first, last in ordered[1:]:
+        if first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return ranges if len(merged) == len(ranges) else merged
+
+
+def parse_range(header: str, size: int) -> Optional[List[ByteRange]]:
+    """
+    The ranges of a Range header (RFC 7233, 2.1) within content of the given size, in
+    the order they were asked for. None when the header is to be ignored and the whole
+    content sent: another unit than bytes, a malformed header or too many ranges.
+    Raises RangeNotSatisfiable when none of the ranges overlaps with the content.
+    """
+    unit, sep, specs = header.partition("=")
+    if not sep or unit.strip().lower() != "bytes":
+        return None
+
+    try:
+        parsed = [_parse_spec(spec, size) for spec in specs.split(",") if spec.strip()]
+    except ValueError:
+        return None
+    if not parsed or len(parsed) > MAX_RANGES:
+        return None
+
+    ranges = [r for r in parsed if r is not None]
+    if not ranges:
+        raise RangeNotSatisfiable(header)
+    return _coalesce(ranges)
+
+
+def content_range(r: ByteRange, size: int) -> str:
+    return f"bytes {r[0]}-{r[1]}/{size}"
+
+
+class MultipartByteranges:
+    """
+    A multipart/byteranges body (RFC 7233, appendix A) of several ranges of a content,
+    whose exact length is known before any of the content is read
+    """
+
+    def __init__(self, ranges: List[ByteRange], size: int, media_type: str):
+        self.ranges = ranges
+        self.boundary = secrets.token_hex(16)
+        self._heads = [
+            (
+                f"--{self.boundary}\r\n"
+                f"Content-Type: {media_type}\r\n"
+                f"Content-Range: {content_range(r, size)}\r\n\r\n"
+            ).encode()
+            for r in ranges
+        ]
+        self._tail = f"--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/byteranges; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return sum(
+            len(head) + last - first + 1 + 2
+            for head, (first, last) in zip(self._heads, self.ranges)
+        ) + len(self._tail)
+
+    async def body(
+        self,
+        fetch: Callable[[ByteRange], Coroutine[Any, Any, AsyncIterator[bytes]]],
+    ) -> AsyncGenerator[bytes, None]:
+        # all the ranges are requested at once, and sent one after the other
+        contents = await async_map(fetch, self.ranges)
+        for head, content in zip(self._heads, contents):
+            yield head
+            async for chunk in content:
+                yield chunk
+            yield b"\r\n"
+        yield self._tail
@@ -1,18 +1,35 @@
+from contextlib import aclosing
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import AsyncGenerator, AsyncIterator, List, Optional, Tuple
 from urllib.parse import quote
 
 import lxml.etree as et
 from fastapi import Request
 from lxml.etree import _Element as Element
 
-from asgidav.async_map import async_map
+from asgidav.async_map import Budget, async_imap
 from asgidav.folder import Folder
 from asgidav.member import Member, Properties, PropertyName, ResourceType
 
 DAV_NS = "DAV:"
 NS_MAP = {"D": DAV_NS}
 
+# only returned when asked for by name, not for allprop (RFC 4331)
+NAMED_PROPS = ("quota-used-bytes",)
+
+# Depth: infinity
+INFINITY = -1
+
+# responses resolved ahead of the one being written
+CONCURRENCY = 32
+# responses resolved at once by one request, out of the budget shared by all of them
+REQUEST_CONCURRENCY = 16
+# members of a folder resolved at a time, a listing of a huge folder is not held in
+# memory as a whole
+MEMBERS_PER_CHUNK = 2000
+# bytes of responses sent at a time
+FLUSH_BYTES = 16 * 1024
+
 
 @dataclass
 class PropfindRequest:
@@ -27,9 +44,18 @@ class PropfindRequest:
         "resourcetype",
     )
 
+    @staticmethod
+    def parse_depth(value: Optional[str]) -> int:
+        # infinity when there is no Depth header (RFC 4918, 9.1)
+        if value is None or (value := value.strip().lower()) == "infinity":
+            return INFINITY
+        if value not in ("0", "1"):
+            raise ValueError(f"Invalid Depth header: {value}")
+        return int(value)
+
     @classmethod
     async def from_request(cls, request: Request):
-        depth = int(request.headers["Depth"])
+        depth = cls.parse_depth(request.headers.get("Depth"))
 
         try:
             body = await request.body()
@@ -46,7 +72,8 @@ class PropfindRequest:
                     et.QName(prop_elem).localname for prop_elem in elem
                 )
                 return cls(
-                    depth=depth, props=tuple(requested_props.intersection(cls.props))
+                    depth=depth,
+                    props=tuple(requested_props.intersection(cls.props + NAMED_PROPS)),
                 )
         except (et.XMLSyntaxError,):
             return cls(depth=depth)
@@ -73,37 +100,140 @@ async def _propstat(member: Member, prop_names: Tuple[PropertyName, ...]) -> Ele
     return root
 
 
-async def _propfind_response(
-    member: Member, depth: int, prop_names: Tuple[PropertyName, ...], base_path: str
-) -> List[Element]:
-    root = et.Element(_tag("response"))
+async def _response(
+    member: Member, prop_names: Tuple[PropertyName, ...], base_path: str
+) -> Element:
+    # declares the namespace itself, responses are written one by one
+    root = et.Element(_tag("response"), nsmap=NS_MAP)
 
     href = et.SubElement(root, _tag("href"))
     href.text = quote(f"{base_path}{member.path}", safe="/")
 
-    propstat_elem = await _propstat(
-        member=member,
-        prop_names=prop_names,
-    )
-    root.append(propstat_elem)
+    root.append(await _propstat(member=member, prop_names=prop_names))
+    return root
 
-    res = [root]
+
+def _truncated(member: Member, base_path: str) -> Element:
+    root = et.Element(_tag("response"), nsmap=NS_MAP)
+    href = et.SubElement(root, _tag("href"))
+    href.text = quote(f"{base_path}{member.path}", safe="/")
+    status = et.SubElement(root, _tag("status"))
+    status.text = "HTTP/1.1 507 Insufficient Storage"
+    description = et.SubElement(root, _tag("responsedescription"))
+    description.text = "Too many members, the listing is truncated"
+    return root
+
+
+async def _sub_members(folder: Folder) -> AsyncIterator[Member]:
+    # sorted, so that repeated listings come in the same order
+    names = sorted(await folder.member_names())
+    for i in range(0, len(names), MEMBERS_PER_CHUNK):
+        for member in await folder.members(names[i : i + MEMBERS_PER_CHUNK]):
+            if member is not None:
+                yield member
+
+
+async def _responses(
+    member: Member,
+    response: Element,
+    depth: int,
+    prop_names: Tuple[PropertyName, ...],
+    base_path: str,
+    budget: Budget,
+) -> AsyncGenerator[Element, None]:
+    """
+    The response of the member, followed by the ones of its members depth-first. Closing
+    it cancels everything it still resolves, at every level.
+    """
+    yield response
 
     if not isinstance(member, Folder) or depth == 0:
-        return res
+        return
+
+    async def with_response(m: Member) -> Tuple[Member, Element]:
+        return m, await _response(m, prop_names, base_path)
+
+    async with aclosing(
+        async_imap(with_response, _sub_members(member), CONCURRENCY, budget)
+    ) as sub_responses:
+        async for sub_member, sub_response in sub_responses:
+            async with aclosing(
+                _responses(
+                    sub_member,
+                    sub_response,
+                    depth - 1 if depth != INFINITY else INFINITY,
+                    prop_names,
+                    base_path,
+                    budget,
+                )
+            ) as rs:
+                async for r in rs:
+                    yield r
 
-    folder: Folder = member
 
-    names = await member.member_names()
-    sub_members = await async_map(lambda name: folder.member(name), names)
-    propfind_responses = await async_map(
-        lambda m: _propfind_response(m, depth - 1, prop_names, base_path),
-        (m for m in sub_members if m is not None),
-    )
-    for sub_response in propfind_responses:
-        res.extend(sub_response)
+async def _propfind_response(
+    member: Member, depth: int, prop_names: Tuple[PropertyName, ...], base_path: str
+) -> List[Element]:
+    response = await _response(member, prop_names, base_path)
+    budget = Budget(REQUEST_CONCURRENCY)
+    return [
+        r
+        async for r in _responses(
+            member, response, depth, prop_names, base_path, budget
+        )
+    ]
 
-    return res
+
+async def propfind_stream(
+    members: Tuple[Member, ...],
+    depth: int,
+    prop_names: Tuple[PropertyName, ...],
+    base_path: str,
+    budget: Optional[Budget] = None,
+    max_responses: Optional[int] = None,
+) -> AsyncGenerator[bytes, None]:
+    """
+    The multistatus body, written as the responses are resolved instead of being
+    built as a whole first. Responses are sent in batches of about FLUSH_BYTES, the
+    first one right away. At most REQUEST_CONCURRENCY responses are resolved at once,
+    out of the budget shared with the other requests.
+
+    Past `max_responses` responses the body ends with a 507 response for the member
+    whose listing is cut off, the status of the whole response is already sent.
+    """
+    request_budget = (
+        Budget(REQUEST_CONCURRENCY)
+        if budget is None
+        else budget.share(REQUEST_CONCURRENCY)
+    )
+    buffer = bytearray(
+        b'<?xml version="1.0" encoding="utf-8"?>\n' b'<D:multistatus xmlns:D="DAV:">'
+    )
+    first = True
+    count = 0
+    truncated = False
+    for member in members:
+        response = await _response(member, prop_names, base_path)
+        async with aclosing(
+            _responses(member, response, depth, prop_names, base_path, request_budget)
+        ) as responses:
+            async for r in responses:
+                if count == max_responses:
+                    buffer += et.tostring(
+                        _truncated(member, base_path), encoding="utf-8"
+                    )
+                    truncated = True
+                    break
+                count += 1
+                buffer += et.tostring(r, encoding="utf-8")
+                if first or len(buffer) >= FLUSH_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+                    first = False
+        if truncated:
+            break
+    buffer += b"</D:multistatus>"
+    yield bytes(buffer)
 
 
 async def propfind(
@@ -112,13 +242,9 @@ async def propfind(
     prop_names: Tuple[PropertyName, ...],
     base_path: str,
 ) -> str:
-    root = et.Element(_tag("multistatus"), nsmap=NS_MAP)
-
-    for propfind_responses in await async_map(
-        lambda member: _propfind_response(member, depth, prop_names, base_path), members
-    ):
-        for response in propfind_responses:
-            root.append(response)
-
-    et.register_namespace("D", DAV_NS)
-    return et.tostring(root, encoding="unicode")
+    return b"".join(
+        [
+            chunk
+            async for chunk in propfind_stream(members, depth, prop_names, base_path)
+        ]
+    ).decode()
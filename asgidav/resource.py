@@ -19,6 +19,7 @@ class Resource(Member):
 
     @abstractmethod
     async def get_content(self, begin: int = 0, end: int = -1) -> AsyncIterator[bytes]:
+        """The bytes from begin to end, both included, up to the last one if end is -1"""
         pass
 
     async def get_properties(self) -> ResourceProperties:
@@ -0,0 +1,94 @@
+"""
+Memory and latency of the path cache behind the WebDAV members, under lookups of
+cached paths and under probes of paths which do not exist.
+
+Usage:
+    python -m benchmarks.bench_fs_cache --depth 10 --entries 10000 --probes 100000
+"""
+
+import argparse
+import secrets
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from tgfs.utils.path_trie import PathTrie
+
+
+def run(trie: PathTrie[str], paths: List[str], probes: List[str]) -> Dict[str, float]:
+    """Microseconds per operation of each phase"""
+    # twice the cap, everything set first has to be evicted
+    more = [f"{p}.new" for p in paths]
+
+    def set_all(ps: List[str]) -> Callable[[], None]:
+        def f() -> None:
+            for p in ps:
+                trie.set(p, p)
+
+        return f
+
+    def get_all(ps: List[str]) -> Callable[[], None]:
+        def f() -> None:
+            for p in ps:
+                trie.get(p)
+
+        return f
+
+    phases = {
+        "set": set_all(paths),
+        "get (hit)": get_all(paths),
+        "get (probe)": get_all(probes),
+        "set (evict)": set_all(more),
+    }
+    res = {}
+    for name, phase in phases.items():
+        n = len(probes) if name == "get (probe)" else len(paths)
+        start = time.perf_counter()
+        phase()
+        res[name] = (time.perf_counter() - start) / n * 1e6
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--probes", type=int, default=100_000)
+    args = parser.parse_args()
+
+    paths = [
+        "/"
+        # ten subdirectories per directory, by the digits of the entry
+        + "/".join(f"d{i // 10**level % 10}" for level in range(args.depth - 1))
+        + f"/f{i}"
+        for i in range(args.entries)
+    ]
+    probes = [f"/scan/{secrets.token_hex(8)}/x" for _ in range(args.probes)]
+
+    latencies = run(PathTrie[str](max_entries=args.entries), paths, probes)
+
+    tracemalloc.start()
+    trie = PathTrie[str](max_entries=args.entries)
+    for p in paths:
+        trie.set(p, p)
+    filled = tracemalloc.get_traced_memory()[0]
+    for p in probes:
+        trie.get(p)
+    probed = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    entries = len(trie)
+    start = time.perf_counter()
+    trie.reset("/d0")
+    reset = time.perf_counter() - start
+
+    print(f"entries:      {entries} (cap {args.entries}, depth {args.depth})")
+    for name, us in latencies.items():
+        print(f"{name + ':':<14}{us:.2f} us")
+    print(f"reset /d0:    {reset * 1e3:.2f} ms ({entries - len(trie)} entries)")
+    print(f"memory:       {filled / 2**20:.1f} MiB")
+    print(f"after probes: {(probed - filled) / 2**10:+.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Load a synthetic metadata tree and report load time and resident memory.
+
+Usage:
+    python -m benchmarks.bench_metadata_load --files 1000000 --files-per-dir 1000 [--lazy]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import time
+
+from tgfs.core.model import TGFSMetadata
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        # ru_maxrss is a high-water mark, reported in KB on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_metadata(n_files: int, files_per_dir: int) -> bytes:
+    n_dirs = max(1, n_files // files_per_dir)
+    children = [
+        {
+            "type": "D",
+            "name": f"dir-{d}",
+            "children": [],
+            "files": [
+                {
+                    "type": "FR",
+                    "messageId": d * files_per_dir + i + 1,
+                    "name": f"{i}.mp4",
+                }
+                for i in range(min(files_per_dir, n_files - d * files_per_dir))
+            ],
+        }
+        for d in range(n_dirs)
+    ]
+    return json.dumps(
+        {
+            "type": "TGFSMetadata",
+            "dir": {"type": "D", "name": "root", "children": children, "files": []},
+        }
+    ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--files-per-dir", type=int, default=1000)
+    parser.add_argument("--lazy", action="store_true")
+    args = parser.parse_args()
+
+    buffer = synthetic_metadata(args.files, args.files_per_dir)
+
+    start = time.perf_counter()
+    data = json.loads(buffer)
+    parsed = time.perf_counter()
+
+    # measure while the parsed payload is still alive, so that memory freed back
+    # to the allocator (but not to the OS) does not blur the tree's own footprint
+    gc.collect()
+    baseline = rss_mb()
+    build_start = time.perf_counter()
+    metadata = TGFSMetadata.from_dict(data, lazy=args.lazy)
+    built = time.perf_counter()
+    tree_rss = rss_mb() - baseline
+
+    print(f"files:       {args.files}")
+    print(f"parse time:  {parsed - start:.2f} s")
+    print(f"build time:  {built - build_start:.2f} s")
+    print(f"tree RSS:    {tree_rss:.1f} MB")
+    print(f"directories: {len(metadata.dir.children)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Resolve paths deep down a synthetic tree, with and without the path index.
+
+Usage:
+    python -m benchmarks.bench_path_resolve --depth 20 --width 100 --lookups 10000
+"""
+
+import argparse
+import time
+from typing import cast
+
+from tgfs.core.api.directory import DirectoryApi
+from tgfs.core.api.metadata import MetaDataApi
+from tgfs.core.model import TGFSDirectory
+
+
+class StaticMetaDataApi:
+    def __init__(self, root: TGFSDirectory):
+        self._root = root
+
+    def get_root_directory(self) -> TGFSDirectory:
+        return self._root
+
+
+def synthetic_tree(depth: int, width: int) -> tuple[TGFSDirectory, str]:
+    """A tree `depth` levels deep, with `width` siblings at every level"""
+    root = d = TGFSDirectory.root_dir()
+    path = ""
+    for level in range(depth):
+        for i in range(width):
+            child = d.create_dir(f"dir-{level}-{i}", None)
+        # descend into the last sibling, the worst case for a linear scan
+        d = child
+        path = f"{path}/{d.name}"
+    return root, path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+
+    root, path = synthetic_tree(args.depth, args.width)
+    dir_api = DirectoryApi(cast(MetaDataApi, StaticMetaDataApi(root)))
+
+    start = time.perf_counter()
+    for _ in range(args.lookups):
+        # a change to the tree drops the index, so every lookup walks from the root
+        TGFSDirectory.generation += 1
+        dir_api.resolve(path)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.lookups):
+        dir_api.resolve(path)
+    warm = time.perf_counter() - start
+
+    print(f"depth:        {args.depth}")
+    print(f"width:        {args.width}")
+    print(f"walk:         {cold / args.lookups * 1e6:.1f} us/lookup")
+    print(f"indexed:      {warm / args.lookups * 1e6:.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
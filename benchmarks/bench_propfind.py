@@ -0,0 +1,127 @@
+"""
+Time to first byte and peak memory of a PROPFIND Depth 1 of a large folder, written
+as a stream and built as a whole.
+
+Usage:
+    python -m benchmarks.bench_propfind --entries 50000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import AsyncIterator, Dict, Tuple, cast
+
+from asgidav.folder import Folder
+from asgidav.member import Member, PropertyName
+from asgidav.reqres import PropfindRequest, propfind, propfind_stream
+from asgidav.resource import Resource
+
+PROPS = cast(Tuple[PropertyName, ...], PropfindRequest.props)
+
+
+class File(Resource):
+    async def content_type(self) -> str:
+        return "application/octet-stream"
+
+    async def content_length(self) -> int:
+        return 1024
+
+    async def display_name(self) -> str:
+        return self.path.rsplit("/", 1)[-1]
+
+    async def creation_date(self) -> int:
+        return 1672531200000
+
+    async def last_modified(self) -> int:
+        return 1672531200000
+
+    async def get_content(self, begin: int = 0, end: int = -1) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def overwrite(self, content: AsyncIterator[bytes], size: int) -> None:
+        raise NotImplementedError
+
+    async def remove(self) -> None:
+        raise NotImplementedError
+
+    async def copy_to(self, destination: str) -> None:
+        raise NotImplementedError
+
+    async def move_to(self, destination: str) -> None:
+        raise NotImplementedError
+
+
+class Directory(Folder):
+    def __init__(self, path: str, entries: int):
+        super().__init__(path)
+        self._names = tuple(f"file-{i:06d}.bin" for i in range(entries))
+
+    async def display_name(self) -> str:
+        return "dir"
+
+    async def creation_date(self) -> int:
+        return 1672531200000
+
+    async def last_modified(self) -> int:
+        return 1672531200000
+
+    async def member_names(self):
+        return self._names
+
+    async def member(self, path: str) -> Member | None:
+        # created on demand, like members which are not cached
+        return File(f"{self.path}/{path}")
+
+    async def create_empty_resource(self, path: str) -> Member:
+        raise NotImplementedError
+
+    async def remove(self) -> None:
+        raise NotImplementedError
+
+    async def copy_to(self, destination: str) -> None:
+        raise NotImplementedError
+
+    async def move_to(self, destination: str) -> None:
+        raise NotImplementedError
+
+
+async def streamed(folder: Folder) -> Dict[str, float]:
+    start = time.perf_counter()
+    first = None
+    size = 0
+    async for chunk in propfind_stream((folder,), 1, PROPS, ""):
+        first = first or time.perf_counter() - start
+        # sent and dropped
+        size += len(chunk)
+    return {"first byte": first or 0, "total": time.perf_counter() - start}
+
+
+async def whole(folder: Folder) -> Dict[str, float]:
+    start = time.perf_counter()
+    await propfind((folder,), 1, PROPS, "")
+    elapsed = time.perf_counter() - start
+    return {"first byte": elapsed, "total": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50_000)
+    args = parser.parse_args()
+
+    folder = Directory("/dir", args.entries)
+    print(f"entries:      {args.entries}")
+    for name, run in (("streamed", streamed), ("whole", whole)):
+        times = asyncio.run(run(folder))
+        tracemalloc.start()
+        asyncio.run(run(folder))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"{name + ':':<14}first byte {times['first byte'] * 1e3:.1f} ms,"
+            f" total {times['total']:.2f} s, peak {peak / 2**20:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
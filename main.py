@@ -19,6 +19,7 @@ from tgfs.app import create_app
 from tgfs.config import Config, get_config
 from tgfs.core import Client, Clients
 from tgfs.telegram import PyrogramAPI, TDLibApi, TelethonAPI, pyrogram, telethon
+from tgfs.utils.message_cache import configure_message_cache
 
 
 async def create_clients(config: Config) -> Clients:
@@ -54,6 +55,7 @@ async def create_clients(config: Config) -> Clients:
                 if config.telegram.account
                 else False
             ),
+            config.tgfs.integrity,
         )
     return clients
 
@@ -76,12 +78,22 @@ async def run_server(app, host: str, port: int, name: str):
 
 async def main():
     config = get_config()
+    configure_message_cache(config.tgfs.message_cache)
 
     clients = await create_clients(config)
 
+    scans = [
+        asyncio.create_task(client.integrity_scanner.run())
+        for client in clients.values()
+        if client.integrity_scanner
+    ]
+
     app = create_app(clients, config)
     await run_server(app, config.tgfs.server.host, config.tgfs.server.port, "TGFS")
 
+    for scan in scans:
+        scan.cancel()
+
 
 if __name__ == "__main__":
     loop = asyncio.new_event_loop()
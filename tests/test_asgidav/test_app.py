@@ -1,4 +1,10 @@
-from asgidav.app import split_path, extract_path_from_destination
+import pytest
+
+from asgidav.app import (
+    ClosingStreamingResponse,
+    extract_path_from_destination,
+    split_path,
+)
 
 
 class TestAppHelpers:
@@ -41,3 +47,25 @@ class TestAppHelpers:
         path = "/webdav/path%20with%20spaces/file.txt"
         result = extract_path_from_destination(path)
         assert result == "/webdav/path with spaces/file.txt"
+
+
+class TestClosingStreamingResponse:
+    @pytest.mark.asyncio
+    async def test_body_is_closed_when_the_client_goes_away(self):
+        closed = []
+
+        async def body():
+            try:
+                yield b"a"
+                yield b"b"
+            finally:
+                closed.append(True)
+
+        async def send(message):
+            if message.get("body"):
+                raise OSError("gone")
+
+        with pytest.raises(OSError):
+            await ClosingStreamingResponse(body()).stream_response(send)
+
+        assert closed == [True]
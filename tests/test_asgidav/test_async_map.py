@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
-from asgidav.async_map import async_map
+
+from asgidav.async_map import Budget, async_imap, async_map
 
 
 class TestAsyncMap:
@@ -38,3 +41,107 @@ class TestAsyncMap:
 
         result = await async_map(slow_process, [1, 2, 3, 4, 5])
         assert result == [10, 20, 30, 40, 50]
+
+
+class TestAsyncIMap:
+    @pytest.mark.asyncio
+    async def test_yields_in_order(self):
+        async def slow_process(x):
+            await asyncio.sleep(0.01 * (5 - x))
+            return x * 10
+
+        result = [r async for r in async_imap(slow_process, [1, 2, 3, 4, 5], 2)]
+        assert result == [10, 20, 30, 40, 50]
+
+    @pytest.mark.asyncio
+    async def test_limits_running_calls(self):
+        running = 0
+        most = 0
+
+        async def track(x):
+            nonlocal running, most
+            running += 1
+            most = max(most, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+            return x
+
+        async def items():
+            for i in range(20):
+                yield i
+
+        result = [r async for r in async_imap(track, items(), 3)]
+        assert result == list(range(20))
+        assert most == 3
+
+    @pytest.mark.asyncio
+    async def test_cancels_when_consumer_stops(self):
+        cancelled = []
+
+        async def slow(x):
+            try:
+                await asyncio.sleep(0 if x == 0 else 3600)
+            except asyncio.CancelledError:
+                cancelled.append(x)
+                raise
+            return x
+
+        results = async_imap(slow, range(10), 4)
+        assert await anext(results) == 0
+        await results.aclose()
+        await asyncio.sleep(0)
+
+        assert sorted(cancelled) == [1, 2, 3]
+
+
+class TestBudget:
+    @staticmethod
+    def tracker():
+        state = {"running": 0, "most": 0}
+
+        async def track(x):
+            state["running"] += 1
+            state["most"] = max(state["most"], state["running"])
+            await asyncio.sleep(0.001)
+            state["running"] -= 1
+            return x
+
+        return track, state
+
+    @pytest.mark.asyncio
+    async def test_shared_across_consumers(self):
+        track, state = self.tracker()
+        budget = Budget(4)
+
+        results = await asyncio.gather(
+            *(async_map(track, range(10), 10, budget) for _ in range(3))
+        )
+
+        assert results == [list(range(10))] * 3
+        assert state["most"] == 4
+
+    @pytest.mark.asyncio
+    async def test_share_leaves_room_for_others(self):
+        track, state = self.tracker()
+        budget = Budget(4)
+        heavy = budget.share(3)
+        started = asyncio.Event()
+
+        async def light(x):
+            started.set()
+            return x
+
+        crawl = asyncio.create_task(async_map(track, range(50), 50, heavy))
+        await asyncio.sleep(0)
+        # the crawl holds 3 of the 4 slots, the other call gets in right away
+        assert await async_map(light, [1], budget=budget) == [1]
+        assert not crawl.done()
+        assert await crawl == list(range(50))
+        assert state["most"] == 3
+
+    @pytest.mark.asyncio
+    async def test_async_map_is_bounded(self):
+        track, state = self.tracker()
+
+        assert await async_map(track, range(100), 5) == list(range(100))
+        assert state["most"] == 5
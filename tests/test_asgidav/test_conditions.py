@@ -0,0 +1,157 @@
+from typing import Optional
+
+import pytest
+from fastapi.testclient import TestClient
+
+from asgidav.app import create_app
+from asgidav.conditions import if_range_holds, not_modified
+from .common import MockFolder, MockResource
+
+ETAG = '"v1"'
+# 2021-01-02 00:00:00 UTC
+LAST_MODIFIED = 1609545600000
+DATE = "Sat, 02 Jan 2021 00:00:00 GMT"
+EARLIER = "Fri, 01 Jan 2021 00:00:00 GMT"
+
+
+class TestNotModified:
+    @pytest.mark.parametrize(
+        "headers, expected",
+        [
+            ({}, False),
+            ({"If-None-Match": ETAG}, True),
+            ({"If-None-Match": 'W/"v1"'}, True),
+            ({"If-None-Match": '"v0", "v1"'}, True),
+            ({"If-None-Match": "*"}, True),
+            ({"If-None-Match": '"v0"'}, False),
+            ({"If-Modified-Since": DATE}, True),
+            ({"If-Modified-Since": EARLIER}, False),
+            ({"If-Modified-Since": "yesterday"}, False),
+            # If-None-Match wins
+            ({"If-None-Match": '"v0"', "If-Modified-Since": DATE}, False),
+        ],
+    )
+    def test_not_modified(self, headers, expected):
+        assert not_modified(headers, ETAG, LAST_MODIFIED) is expected
+
+    def test_without_an_etag_only_dates_count(self):
+        assert not not_modified({"If-None-Match": "*"}, None, LAST_MODIFIED)
+        assert not_modified({"If-Modified-Since": DATE}, None, LAST_MODIFIED)
+
+    def test_without_a_date_only_etags_count(self):
+        assert not not_modified({"If-Modified-Since": DATE}, ETAG, None)
+        assert not_modified({"If-None-Match": ETAG}, ETAG, None)
+
+
+class TestIfRange:
+    @pytest.mark.parametrize(
+        "headers, expected",
+        [
+            ({}, True),
+            ({"If-Range": ETAG}, True),
+            ({"If-Range": '"v0"'}, False),
+            # weak tags never match
+            ({"If-Range": 'W/"v1"'}, False),
+            ({"If-Range": DATE}, True),
+            ({"If-Range": EARLIER}, False),
+            ({"If-Range": "garbage"}, False),
+        ],
+    )
+    def test_if_range_holds(self, headers, expected):
+        assert if_range_holds(headers, ETAG, LAST_MODIFIED) is expected
+
+
+class TaggedResource(MockResource):
+    async def content_length(self) -> int:
+        return 7
+
+    async def etag(self) -> Optional[str]:
+        return ETAG
+
+
+class TestConditionalGet:
+    @pytest.fixture
+    def client(self) -> TestClient:
+        resource = TaggedResource("/f.txt")
+
+        async def get_member(path: str):
+            return resource if path.strip("/") == "f.txt" else None
+
+        return TestClient(create_app(get_member))
+
+    def test_validators_are_sent(self, client):
+        response = client.get("/f.txt")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] == ETAG
+        assert response.headers["Last-Modified"] == DATE
+
+    @pytest.mark.parametrize("method", ["GET", "HEAD"])
+    def test_unchanged_is_not_sent_again(self, client, method):
+        response = client.request(method, "/f.txt", headers={"If-None-Match": ETAG})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == ETAG
+
+    def test_resumed_download_of_the_same_version(self, client):
+        response = client.get("/f.txt", headers={"Range": "bytes=2-", "If-Range": ETAG})
+
+        assert response.status_code == 206
+        assert response.headers["Content-Range"] == "bytes 2-6/7"
+
+    def test_resumed_download_of_another_version(self, client):
+        response = client.get(
+            "/f.txt", headers={"Range": "bytes=2-", "If-Range": '"v0"'}
+        )
+
+        assert response.status_code == 200
+        assert "Content-Range" not in response.headers
+
+
+class TaggedFolder(MockFolder):
+    version = 1
+
+    async def etag(self) -> Optional[str]:
+        return f'W/"{self.version}"'
+
+
+class TestConditionalHeadOfFolder:
+    @pytest.fixture
+    def folder(self) -> TaggedFolder:
+        return TaggedFolder("/dir")
+
+    @pytest.fixture
+    def client(self, folder) -> TestClient:
+        async def get_member(path: str):
+            return folder if path.strip("/") == "dir" else None
+
+        return TestClient(create_app(get_member))
+
+    def test_only_the_etag_is_sent(self, client):
+        response = client.head("/dir")
+
+        assert response.headers["ETag"] == 'W/"1"'
+        assert "Last-Modified" not in response.headers
+
+    def test_changed_folder_is_sent_again(self, client, folder):
+        etag = client.head("/dir").headers["ETag"]
+        assert client.head("/dir", headers={"If-None-Match": etag}).status_code == 304
+
+        folder.version = 2
+
+        assert client.head("/dir", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_dates_are_ignored(self, client):
+        response = client.head(
+            "/dir", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+        )
+
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_etag_is_a_property():
+    properties = await TaggedResource("/f.txt").get_properties()
+    assert properties["getetag"] == ETAG
+    assert "getetag" not in await MockResource("/g.txt").get_properties()
@@ -41,6 +41,18 @@ class TestFolder:
 
         assert properties["childcount"] == 3
 
+    @pytest.mark.asyncio
+    async def test_get_properties_quota_used_bytes(self, mocker):
+        folder = MockFolder("/test")
+        assert "quota-used-bytes" not in await folder.get_properties()
+
+        mocker.patch.object(
+            folder, "quota_used_bytes", mocker.AsyncMock(return_value=42)
+        )
+        properties = await folder.get_properties()
+
+        assert properties["quota-used-bytes"] == "42"
+
     @pytest.mark.asyncio
     async def test_member_names(self):
         members = {
@@ -0,0 +1,197 @@
+import gzip
+from typing import Hashable, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+
+from asgidav.app import accepts_gzip, create_app
+from asgidav.propfind_cache import PropfindCache
+from .common import MockFolder, MockResource
+
+KEY = ("/dir", 1, ("displayname",))
+
+
+class VersionedFolder(MockFolder):
+    def __init__(self, path, members=None):
+        super().__init__(path, members)
+        self.version: Optional[int] = 1
+        self.listed = 0
+
+    def generation(self) -> Optional[Hashable]:
+        return self.version
+
+    async def member_names(self):
+        self.listed += 1
+        return await super().member_names()
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+class TestPropfindCache:
+    def test_served_while_the_generation_matches(self):
+        cache = PropfindCache()
+        cache.put(KEY, 1, b"body")
+
+        assert (cached := cache.get(KEY, 1)) is not None
+        assert cached.body == b"body"
+        assert cache.get(KEY, 2) is None
+        # the stale response is gone for good
+        assert cache.get(KEY, 1) is None
+        assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 2}
+
+    def test_large_responses_are_not_kept(self):
+        cache = PropfindCache(max_response_bytes=3)
+        cache.put(KEY, 1, b"body")
+
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        cache = PropfindCache(max_bytes=8)
+        cache.put(("/a", 0, ()), 1, b"aaaa")
+        cache.put(("/b", 0, ()), 1, b"bbbb")
+        cache.get(("/a", 0, ()), 1)
+        cache.put(("/c", 0, ()), 1, b"cccc")
+
+        assert cache.get(("/a", 0, ()), 1) is not None
+        assert cache.get(("/b", 0, ()), 1) is None
+        assert cache.stats()["bytes"] == 8
+
+    def test_compressed_once(self):
+        cache = PropfindCache()
+        cache.put(KEY, 1, b"body" * 100)
+        cached = cache.get(KEY, 1)
+        assert cached is not None
+
+        body = cache.gzipped(KEY, cached)
+
+        assert gzip.decompress(body) == b"body" * 100
+        assert cache.gzipped(KEY, cached) is body
+        assert cache.stats()["bytes"] == 400 + len(body)
+
+    @pytest.mark.asyncio
+    async def test_tee_keeps_what_it_passes_through(self):
+        cache = PropfindCache()
+
+        passed = [c async for c in cache.tee(KEY, 1, chunks(b"a", b"b"))]
+
+        assert passed == [b"a", b"b"]
+        assert (cached := cache.get(KEY, 1)) is not None
+        assert cached.body == b"ab"
+
+    @pytest.mark.asyncio
+    async def test_tee_drops_large_responses(self):
+        cache = PropfindCache(max_response_bytes=1)
+
+        passed = [c async for c in cache.tee(KEY, 1, chunks(b"a", b"b"))]
+
+        assert passed == [b"a", b"b"]
+        assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip", True),
+        ("deflate, GZIP;q=0.5", True),
+        ("gzip;q=0", False),
+        ("br", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+class TestCachedPropfind:
+    @pytest.fixture
+    def folder(self) -> VersionedFolder:
+        return VersionedFolder("/dir", {"a.txt": MockResource("/dir/a.txt")})
+
+    @pytest.fixture
+    def client(self, folder) -> TestClient:
+        async def get_member(path: str):
+            return folder if path.strip("/") == "dir" else None
+
+        return TestClient(create_app(get_member, propfind_cache=PropfindCache()))
+
+    @staticmethod
+    def propfind(client: TestClient, **headers: str):
+        return client.request(
+            "PROPFIND",
+            "/dir",
+            headers={"Depth": "1", "Accept-Encoding": "identity"} | headers,
+        )
+
+    def test_repeated_propfind_is_served_from_the_cache(self, client, folder):
+        first = self.propfind(client)
+        listed = folder.listed
+        second = self.propfind(client)
+
+        assert first.status_code == second.status_code == 207
+        assert first.content == second.content
+        assert folder.listed == listed
+
+    def test_new_generation_is_listed_again(self, client, folder):
+        self.propfind(client)
+        listed = folder.listed
+        folder.version = 2
+        self.propfind(client)
+
+        assert folder.listed == 2 * listed
+
+    def test_members_without_a_generation_are_not_cached(self, client, folder):
+        folder.version = None
+        self.propfind(client)
+        listed = folder.listed
+        self.propfind(client)
+
+        assert folder.listed == 2 * listed
+
+    def test_cached_response_is_compressed(self, client, folder):
+        plain = self.propfind(client)
+        compressed = self.propfind(client, **{"Accept-Encoding": "gzip"})
+
+        assert compressed.headers["Content-Encoding"] == "gzip"
+        assert compressed.content == plain.content
+
+
+class TestPropfindDepth:
+    @staticmethod
+    def client(**kwargs) -> TestClient:
+        folder = MockFolder("/dir", {"a.txt": MockResource("/dir/a.txt")})
+
+        async def get_member(path: str):
+            return folder if path.strip("/") == "dir" else None
+
+        return TestClient(create_app(get_member, **kwargs))
+
+    @pytest.mark.parametrize("depth", ["2", "abc"])
+    def test_malformed_depth_is_a_bad_request(self, depth):
+        resp = self.client().request("PROPFIND", "/dir", headers={"Depth": depth})
+
+        assert resp.status_code == 400
+
+    @pytest.mark.parametrize("headers", [{"Depth": "infinity"}, {}])
+    def test_infinite_depth_is_refused(self, headers):
+        resp = self.client().request("PROPFIND", "/dir", headers=headers)
+
+        assert resp.status_code == 403
+        assert b"propfind-finite-depth" in resp.content
+
+    def test_infinite_depth_when_allowed(self):
+        client = self.client(allow_infinite_depth=True)
+        resp = client.request("PROPFIND", "/dir", headers={"Depth": "infinity"})
+
+        assert resp.status_code == 207
+        assert b"a.txt" in resp.content
+
+    def test_infinite_depth_is_cut_off(self):
+        client = self.client(allow_infinite_depth=True, max_infinite_depth_responses=1)
+        resp = client.request("PROPFIND", "/dir", headers={"Depth": "infinity"})
+
+        assert resp.status_code == 207
+        assert b"a.txt" not in resp.content
+        assert b"507 Insufficient Storage" in resp.content
@@ -0,0 +1,154 @@
+from email.parser import BytesParser
+from typing import AsyncIterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from asgidav.app import create_app
+from asgidav.ranges import (
+    MAX_RANGES,
+    MultipartByteranges,
+    RangeNotSatisfiable,
+    parse_range,
+)
+from .common import MockResource
+
+DATA = bytes(range(100))
+
+
+class DataResource(MockResource):
+    def __init__(self, path: str, data: bytes):
+        super().__init__(path)
+        self.data = data
+        self.fetched: list = []
+
+    async def content_type(self) -> str:
+        return "video/mp4"
+
+    async def content_length(self) -> int:
+        return len(self.data)
+
+    async def get_content(self, begin: int = 0, end: int = -1) -> AsyncIterator[bytes]:
+        self.fetched.append((begin, end))
+        data = self.data[begin:] if end == -1 else self.data[begin : end + 1]
+
+        async def chunks():
+            for i in range(0, len(data), 7):
+                yield data[i : i + 7]
+
+        return chunks()
+
+
+class TestParseRange:
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("bytes=0-9", [(0, 9)]),
+            ("bytes=90-", [(90, 99)]),
+            ("bytes=-10", [(90, 99)]),
+            ("bytes=-1000", [(0, 99)]),
+            ("bytes=95-1000", [(95, 99)]),
+            ("bytes=0-0, -1", [(0, 0), (99, 99)]),
+            ("bytes=50-59,0-9", [(50, 59), (0, 9)]),
+            # overlapping ones are merged
+            ("bytes=0-9,5-19,30-39", [(0, 19), (30, 39)]),
+            ("bytes=0-9,10-19", [(0, 19)]),
+            # the ones outside of the content are left out
+            ("bytes=0-9,200-300", [(0, 9)]),
+        ],
+    )
+    def test_ranges(self, header, expected):
+        assert parse_range(header, len(DATA)) == expected
+
+    @pytest.mark.parametrize(
+        "header",
+        ["items=0-9", "bytes=", "bytes=9-0", "bytes=a-b", "bytes=-", "bytes 0-9"],
+    )
+    def test_ignored(self, header):
+        assert parse_range(header, len(DATA)) is None
+
+    def test_too_many_ranges_are_ignored(self):
+        header = "bytes=" + ",".join(f"{i * 2}-{i * 2}" for i in range(MAX_RANGES + 1))
+        assert parse_range(header, len(DATA)) is None
+
+    @pytest.mark.parametrize(
+        "header, size", [("bytes=100-", 100), ("bytes=-0", 100), ("bytes=-5", 0)]
+    )
+    def test_not_satisfiable(self, header, size):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, size)
+
+
+class TestMultipartByteranges:
+    @pytest.mark.asyncio
+    async def test_length_is_exact(self):
+        resource = DataResource("/v.mp4", DATA)
+        multipart = MultipartByteranges([(0, 9), (90, 99)], len(DATA), "video/mp4")
+
+        body = b"".join(
+            [c async for c in multipart.body(lambda r: resource.get_content(*r))]
+        )
+
+        assert len(body) == len(multipart)
+        assert resource.fetched == [(0, 9), (90, 99)]
+
+
+class TestRangedGet:
+    @pytest.fixture
+    def resource(self) -> DataResource:
+        return DataResource("/v.mp4", DATA)
+
+    @pytest.fixture
+    def client(self, resource) -> TestClient:
+        async def get_member(path: str):
+            return resource if path.strip("/") == "v.mp4" else None
+
+        return TestClient(create_app(get_member))
+
+    def test_whole_content_has_a_length(self, client):
+        response = client.get("/v.mp4")
+
+        assert response.status_code == 200
+        assert response.headers["Content-Length"] == "100"
+        assert response.content == DATA
+
+    def test_suffix_range(self, client, resource):
+        response = client.get("/v.mp4", headers={"Range": "bytes=-10"})
+
+        assert response.status_code == 206
+        assert response.headers["Content-Range"] == "bytes 90-99/100"
+        assert response.headers["Content-Length"] == "10"
+        assert response.content == DATA[90:]
+        # only what was asked for is read
+        assert resource.fetched == [(90, 99)]
+
+    def test_multiple_ranges(self, client):
+        response = client.get("/v.mp4", headers={"Range": "bytes=0-9,50-54"})
+
+        assert response.status_code == 206
+        assert response.headers["Content-Type"].startswith("multipart/byteranges")
+        assert int(response.headers["Content-Length"]) == len(response.content)
+        message = BytesParser().parsebytes(
+            b"Content-Type: "
+            + response.headers["Content-Type"].encode()
+            + b"\r\n\r\n"
+            + response.content
+        )
+        parts: list = message.get_payload()  # type: ignore[assignment]
+        assert [p["Content-Range"] for p in parts] == [
+            "bytes 0-9/100",
+            "bytes 50-54/100",
+        ]
+        assert [p.get_payload(decode=True) for p in parts] == [DATA[:10], DATA[50:55]]
+
+    def test_not_satisfiable(self, client):
+        response = client.get("/v.mp4", headers={"Range": "bytes=200-300"})
+
+        assert response.status_code == 416
+        assert response.headers["Content-Range"] == "bytes */100"
+
+    def test_malformed_range_gets_everything(self, client):
+        response = client.get("/v.mp4", headers={"Range": "bytes=x-y"})
+
+        assert response.status_code == 200
+        assert response.content == DATA
@@ -1,7 +1,19 @@
+import asyncio
+
+import lxml.etree as et
 import pytest
 from fastapi import Request
-from asgidav.reqres import PropfindRequest, propfind, _propstat, _propfind_response
-from .common import MockResource, MockFolder
+
+from asgidav.reqres import (
+    INFINITY,
+    PropfindRequest,
+    _propfind_response,
+    _propstat,
+    propfind,
+    propfind_stream,
+)
+
+from .common import MockFolder, MockResource
 
 
 class TestPropfindRequest:
@@ -74,6 +86,26 @@ class TestPropfindRequest:
         assert result.depth == 1
         assert set(result.props) == {"displayname", "getcontentlength"}
 
+    @pytest.mark.asyncio
+    async def test_from_request_with_named_props(self, mocker):
+        mock_request = mocker.Mock(spec=Request)
+        mock_request.headers = {"Depth": "1"}
+        mock_request.body = mocker.AsyncMock(
+            return_value=b"""<?xml version="1.0"?>
+            <D:propfind xmlns:D="DAV:">
+                <D:prop>
+                    <D:displayname/>
+                    <D:quota-used-bytes/>
+                </D:prop>
+            </D:propfind>"""
+        )
+
+        result = await PropfindRequest.from_request(mock_request)
+
+        assert set(result.props) == {"displayname", "quota-used-bytes"}
+        # not part of allprop
+        assert "quota-used-bytes" not in PropfindRequest(depth=1).props
+
     @pytest.mark.asyncio
     async def test_from_request_invalid_xml(self, mocker):
         mock_request = mocker.Mock(spec=Request)
@@ -157,3 +189,157 @@ class TestPropfindFunctions:
 
         assert isinstance(result, str)
         assert "multistatus" in result
+
+
+class TestDepth:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("0", 0),
+            ("1", 1),
+            ("infinity", INFINITY),
+            ("Infinity", INFINITY),
+            (None, INFINITY),
+        ],
+    )
+    def test_parse_depth(self, value, expected):
+        assert PropfindRequest.parse_depth(value) == expected
+
+    @pytest.mark.parametrize("value", ["2", "-1", "abc", ""])
+    def test_invalid_depth(self, value):
+        with pytest.raises(ValueError):
+            PropfindRequest.parse_depth(value)
+
+    @pytest.mark.asyncio
+    async def test_infinity_walks_the_whole_tree(self):
+        folder = MockFolder(
+            "/a",
+            {
+                "b": MockFolder(
+                    "/a/b", {"c": MockFolder("/a/b/c", {"d": MockResource("/a/b/c/d")})}
+                )
+            },
+        )
+
+        body = await propfind((folder,), INFINITY, ("displayname",), "")
+
+        root = et.fromstring(body.encode())
+        assert [href.text for href in root.iter("{DAV:}href")] == [
+            "/a",
+            "/a/b",
+            "/a/b/c",
+            "/a/b/c/d",
+        ]
+
+
+class TestPropfindStream:
+    @pytest.mark.asyncio
+    async def test_first_response_is_sent_right_away(self):
+        folder = MockFolder(
+            "/test", {f"f{i}": MockResource(f"/test/f{i}") for i in range(3)}
+        )
+
+        chunks = propfind_stream((folder,), 1, ("displayname",), "/webdav")
+        first = await anext(chunks)
+
+        assert first.count(b"<D:response") == 1
+        rest = b"".join([c async for c in chunks])
+        assert rest.endswith(b"</D:multistatus>")
+
+    @pytest.mark.asyncio
+    async def test_well_formed_and_sorted(self):
+        folder = MockFolder(
+            "/test",
+            {
+                "b": MockResource("/test/b"),
+                "a": MockFolder("/test/a", {"c": MockResource("/test/a/c")}),
+            },
+        )
+
+        body = b"".join(
+            [c async for c in propfind_stream((folder,), 2, ("displayname",), "")]
+        )
+
+        root = et.fromstring(body)
+        assert [href.text for href in root.iter("{DAV:}href")] == [
+            "/test",
+            "/test/a",
+            "/test/a/c",
+            "/test/b",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cut_off_past_max_responses(self):
+        folder = MockFolder(
+            "/test", {f"f{i}": MockResource(f"/test/f{i}") for i in range(3)}
+        )
+
+        body = b"".join(
+            [
+                c
+                async for c in propfind_stream(
+                    (folder,), INFINITY, ("displayname",), "", max_responses=2
+                )
+            ]
+        )
+
+        root = et.fromstring(body)
+        responses = root.findall("{DAV:}response")
+        assert [r.findtext("{DAV:}href") for r in responses] == [
+            "/test",
+            "/test/f0",
+            "/test",
+        ]
+        assert (
+            responses[-1].findtext("{DAV:}status")
+            == "HTTP/1.1 507 Insufficient Storage"
+        )
+
+    @pytest.mark.asyncio
+    async def test_not_cut_off_at_max_responses(self):
+        folder = MockFolder("/test", {"f": MockResource("/test/f")})
+
+        body = b"".join(
+            [
+                c
+                async for c in propfind_stream(
+                    (folder,), INFINITY, ("displayname",), "", max_responses=2
+                )
+            ]
+        )
+
+        assert b"507" not in body
+        assert body.count(b"<D:response") == 2
+
+    @pytest.mark.asyncio
+    async def test_closing_cancels_pending_responses(self):
+        cancelled = []
+
+        class SlowResource(MockResource):
+            async def display_name(self) -> str:
+                try:
+                    await asyncio.sleep(3600)
+                except asyncio.CancelledError:
+                    cancelled.append(self.path)
+                    raise
+                return "slow"
+
+        folder = MockFolder(
+            "/test",
+            {
+                "a": MockFolder("/test/a", {"x": SlowResource("/test/a/x")}),
+                "b": SlowResource("/test/b"),
+            },
+        )
+
+        chunks = propfind_stream((folder,), INFINITY, ("displayname",), "")
+        await anext(chunks)
+        pending = asyncio.create_task(anext(chunks))
+        await asyncio.sleep(0.01)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        await chunks.aclose()
+
+        # at every level
+        assert sorted(cancelled) == ["/test/a/x", "/test/b"]
@@ -56,6 +56,7 @@ class TestMain:
             mock_metadata_cfg,
             mock_tdlib_instance,
             mock_config.telegram.account.used_to_upload,
+            mock_config.tgfs.integrity,
         )
         assert result == {"test_client": mock_client}
 
@@ -105,7 +106,11 @@ class TestMain:
         mock_telethon_login_account.assert_not_called()
         mock_telethon_login_bots.assert_called_once_with(mock_config)
         mock_client_create.assert_called_once_with(
-            67890, mock_metadata_cfg, mock_tdlib_instance, False
+            67890,
+            mock_metadata_cfg,
+            mock_tdlib_instance,
+            False,
+            mock_config.tgfs.integrity,
         )
         assert result == {"test_client": mock_client}
 
@@ -149,11 +154,12 @@ class TestMain:
         mock_create_clients = mocker.patch("main.create_clients")
         mock_create_app = mocker.patch("main.create_app")
         mock_run_server = mocker.patch("main.run_server")
+        mock_configure_message_cache = mocker.patch("main.configure_message_cache")
         mock_config = mocker.Mock()
         mock_config.tgfs.server.host = "0.0.0.0"
         mock_config.tgfs.server.port = 9000
 
-        mock_clients = mocker.Mock()
+        mock_clients = {"test_client": mocker.Mock(integrity_scanner=None)}
         mock_app = mocker.Mock()
 
         mock_get_config.return_value = mock_config
@@ -166,6 +172,9 @@ class TestMain:
 
         # Assertions
         mock_get_config.assert_called_once()
+        mock_configure_message_cache.assert_called_once_with(
+            mock_config.tgfs.message_cache
+        )
         mock_create_clients.assert_called_once_with(mock_config)
         mock_create_app.assert_called_once_with(mock_clients, mock_config)
         mock_run_server.assert_called_once_with(mock_app, "0.0.0.0", 9000, "TGFS")
@@ -1,8 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
+from tgfs.app.fs_cache import FSCache
 from tgfs.app.manager.app import create_manager_app
 from tgfs.config import Config
+from tgfs.core.api.search import SearchHit, SearchMode
 from tgfs.core.client import Client
+from tgfs.core.model import TGFSDirectory
+from tgfs.errors import FileOrDirectoryDoesNotExist
+from tgfs.utils.histogram import Histogram
+from tgfs.utils.message_cache import channel_cache
 
 
 class TestManagerApp:
@@ -240,3 +246,89 @@ class TestManagerApp:
 
         assert response.status_code == 400
         assert "not in one of the configured file channels" in response.json()["detail"]
+
+    def test_search(self, manager_app, mock_client, mocker):
+        mock_client.dir_api = mocker.Mock()
+        mock_client.dir_api.search.return_value = [
+            SearchHit(path=f"/dir/file{i}.txt", is_dir=False) for i in range(5)
+        ] + [SearchHit(path="/dir", is_dir=True)]
+
+        client = TestClient(manager_app)
+        response = client.get("/search?q=*.txt&mode=glob&offset=4&limit=1")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "total": 6,
+            "items": [{"path": "/channel/dir/file4.txt", "type": "file"}],
+        }
+        mock_client.dir_api.search.assert_called_once_with("*.txt", SearchMode.GLOB)
+
+    def test_search_unknown_client(self, manager_app):
+        client = TestClient(manager_app)
+        response = client.get("/search?q=a&client=missing")
+
+        assert response.status_code == 404
+
+    def test_stats(self, manager_app, mock_client, mocker):
+        root = TGFSDirectory.root_dir()
+        root.create_dir("dir", None).create_file_ref("a.txt", 1, size=10)
+        root.create_file_ref("legacy.txt", 2)
+        mock_client.dir_api = mocker.Mock()
+        mock_client.dir_api.resolve.side_effect = lambda path: (
+            root.find_dir("dir") if path == "/dir" else root
+        )
+
+        client = TestClient(manager_app)
+
+        response = client.get("/stats?path=/channel/dir/")
+        assert response.json() == {
+            "size": 10,
+            "files": 1,
+            "directories": 0,
+            "unsized_files": 0,
+        }
+        response = client.get("/stats?path=/channel")
+        assert response.json() == {
+            "size": 10,
+            "files": 2,
+            "directories": 1,
+            "unsized_files": 1,
+        }
+
+    def test_stats_not_found(self, manager_app, mock_client, mocker):
+        mock_client.dir_api = mocker.Mock()
+        mock_client.dir_api.resolve.side_effect = FileOrDirectoryDoesNotExist("x")
+
+        client = TestClient(manager_app)
+
+        assert client.get("/stats?path=/channel/x").status_code == 404
+        assert client.get("/stats?path=/missing").status_code == 404
+
+    def test_metrics(self, manager_app, mock_client, mocker):
+        webdav_cache = FSCache()
+        webdav_cache.get("/missing")
+        mocker.patch.dict("tgfs.app.manager.app.gfc", {"channel": webdav_cache})
+        mock_client.message_api.batch_sizes = Histogram((1, 100))
+        mock_client.message_api.batch_sizes.observe(42)
+        mock_client.message_api.wait_times = Histogram((0.01,))
+        mock_client.message_api.private_file_channel = 123456
+
+        client = TestClient(manager_app)
+
+        response = client.get("/metrics")
+        assert response.json() == {
+            "channel": {
+                "message_batch_sizes": {
+                    "count": 1,
+                    "sum": 42,
+                    "buckets": {"1": 0, "100": 1, "+Inf": 1},
+                },
+                "message_wait_seconds": {
+                    "count": 0,
+                    "sum": 0,
+                    "buckets": {"0.01": 0, "+Inf": 0},
+                },
+                "message_cache": channel_cache(123456).stats(),
+                "webdav_cache": webdav_cache.stats(),
+            }
+        }
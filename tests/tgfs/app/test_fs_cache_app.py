@@ -1,5 +1,20 @@
 from typing import Optional
-from tgfs.app.fs_cache import FSCache, gfc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from tgfs.app.fs_cache import FSCache, FSCacheInvalidator, gfc
+from tgfs.app.webdav import _get_member, create_webdav_app
+from tgfs.app.webdav.folder import Folder
+from tgfs.app.webdav.resource import Resource
+from tgfs.config import PropfindConfig
+from tgfs.core.api import DirectoryApi, MetaDataApi
+from tgfs.core.api.file import FileApi
+from tgfs.core.api.file_desc import FileDescApi
+from tgfs.core.client import Client
+from tgfs.core.model import TGFSDirectory, TGFSFileDesc
+from tgfs.core.repository.interface import FDRepositoryResp
+from tgfs.reqres import FileMessageImported, SentFileMessage
 from asgidav.member import Member
 
 
@@ -50,17 +65,17 @@ class TestFSCache:
     """Test suite for FSCache class"""
 
     def test_init_default(self):
-        """Test FSCache initialization with default value"""
+        """Test FSCache initialization with default limits"""
         cache = FSCache()
-        assert cache._value is None
-        assert isinstance(cache._cache, dict)
+        assert len(cache) == 0
+        assert cache.get("/") is None
 
-    def test_init_with_value(self):
-        """Test FSCache initialization with a value"""
-        member = MockMember("/test", "test_file")
-        cache = FSCache(member)
-        assert cache._value == member
-        assert isinstance(cache._cache, dict)
+    def test_init_with_limits(self):
+        """Test FSCache initialization with an entry cap and a TTL"""
+        cache = FSCache(max_entries=1, ttl=60)
+        cache.set("/a", MockMember("/a"))
+        cache.set("/b", MockMember("/b"))
+        assert len(cache) == 1
 
     def test_split_path_root(self):
         """Test path splitting for root path"""
@@ -512,3 +527,256 @@ class TestIntegrationScenarios:
             isinstance(remaining_file2_member, MockMember)
             and remaining_file2_member.name == "file2"
         )
+
+
+class TestStats:
+    def test_counts_hits_and_misses(self):
+        cache = FSCache()
+        cache.set("/a", MockMember("/a"))
+
+        cache.get("/a")
+        cache.get("/b")
+        cache.get("/a/b")
+
+        assert cache.stats() == {
+            "entries": 1,
+            "hits": 1,
+            "misses": 2,
+            "evictions": 0,
+        }
+
+    def test_set_keeps_members_below(self):
+        cache = FSCache()
+        cache.set("/a/b", MockMember("/a/b"))
+
+        cache.set("/a", MockMember("/a"))
+        assert cache.get("/a/b") is not None
+
+        cache.discard("/a")
+        assert cache.get("/a") is None
+        assert cache.get("/a/b") is not None
+
+
+class TestFSCacheInvalidator:
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        root = TGFSDirectory.root_dir()
+        root.create_dir("docs", None).create_file_ref("a.txt", 1)
+        root.create_dir("src", None)
+        return root
+
+    @pytest.fixture
+    def cache(self, root) -> FSCache:
+        cache = FSCache()
+        for path in ["/", "/docs/", "/docs/a.txt", "/src/"]:
+            cache.set(path, MockMember(path))
+        self.invalidator = FSCacheInvalidator(cache, lambda: root)
+        return cache
+
+    def test_added_file_drops_the_listing(self, root, cache):
+        root.find_dir("docs").create_file_ref("b.txt", 2)
+
+        assert cache.get("/docs") is None
+        assert cache.get("/docs/a.txt") is not None
+        assert cache.get("/") is not None
+
+    def test_removed_directory_drops_the_subtree(self, root, cache):
+        root.find_dir("docs").delete()
+
+        assert cache.get("/") is None
+        assert cache.get("/docs/a.txt") is None
+        assert cache.get("/src") is not None
+
+    def test_moved_file_drops_both_listings(self, root, cache):
+        root.find_dir("docs").find_file("a.txt").move(root.find_dir("src"))
+
+        assert cache.get("/docs") is None
+        assert cache.get("/docs/a.txt") is None
+        assert cache.get("/src") is None
+
+    def test_other_trees_are_ignored(self, cache):
+        TGFSDirectory.root_dir().create_dir("docs", None).create_file_ref("x", 3)
+
+        assert cache.get("/docs") is not None
+
+    def test_reset_clears_everything(self, cache):
+        TGFSDirectory._changed()
+
+        assert cache.get("/") is None
+        assert cache.get("/src") is None
+
+
+class TestMemberLookups:
+    @pytest.fixture
+    def client(self, mocker):
+        root = TGFSDirectory.root_dir()
+        root.create_dir("docs", None).create_file_ref("a.txt", 1)
+        metadata_api = mocker.Mock(spec=MetaDataApi)
+        metadata_api.get_root_directory.return_value = root
+        client = mocker.Mock(spec=Client)
+        client.name = "c"
+        client.dir_api = DirectoryApi(metadata_api)
+        client.watcher = None
+        return client
+
+    @pytest.mark.asyncio
+    async def test_members_are_reused(self, client):
+        create_webdav_app({"c": client})
+
+        folder = await _get_member("/c/docs", {"c": client})
+        resource = await _get_member("/c/docs/a.txt", {"c": client})
+
+        assert isinstance(folder, Folder)
+        assert isinstance(resource, Resource)
+        assert await _get_member("/c/docs/", {"c": client}) is folder
+        assert await _get_member("/c/docs/a.txt", {"c": client}) is resource
+        assert gfc["c"].hits > 0
+
+    @pytest.mark.asyncio
+    async def test_changes_show_up(self, client):
+        create_webdav_app({"c": client})
+        folder = await _get_member("/c/docs", {"c": client})
+
+        client.dir_api.root.find_dir("docs").create_file_ref("b.txt", 2)
+
+        assert await _get_member("/c/docs", {"c": client}) is not folder
+        assert await _get_member("/c/docs/b.txt", {"c": client}) is not None
+
+    @pytest.mark.asyncio
+    async def test_listing_loads_descriptors_together(self, client, mocker):
+        create_webdav_app({"c": client})
+        client.file_api = mocker.AsyncMock()
+        client.file_api.descs.side_effect = lambda frs: [
+            TGFSFileDesc.empty(fr.name) for fr in frs
+        ]
+        client.dir_api.root.find_dir("docs").create_file_ref("b.txt", 2)
+        folder = await _get_member("/c/docs", {"c": client})
+        assert isinstance(folder, Folder)
+
+        members = await folder.members(sorted(await folder.member_names()))
+        await folder.members(sorted(await folder.member_names()))
+
+        client.file_api.descs.assert_awaited_once()
+        assert [fr.name for fr in client.file_api.descs.call_args.args[0]] == [
+            "a.txt",
+            "b.txt",
+        ]
+        assert isinstance(members[0], Resource)
+        assert await members[0].content_length() == -1
+        client.file_api.desc.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_generation_follows_the_subtree(self, client):
+        create_webdav_app({"c": client})
+        root = await _get_member("/c/", {"c": client})
+        resource = await _get_member("/c/docs/a.txt", {"c": client})
+        assert root is not None and resource is not None
+        before = (root.generation(), resource.generation())
+
+        client.dir_api.root.find_dir("docs").find_file("a.txt").location.touch()
+
+        assert root.generation() != before[0]
+        assert resource.generation() != before[1]
+
+    @pytest.mark.asyncio
+    async def test_quota_once_every_size_is_known(self, client, mocker):
+        create_webdav_app({"c": client})
+        file_desc_api = mocker.AsyncMock(spec=FileDescApi)
+        client.file_api = FileApi(mocker.AsyncMock(spec=MetaDataApi), file_desc_api)
+        fd = TGFSFileDesc.empty("a.txt")
+        fd.add_version_from_sent_file_message(SentFileMessage(10, 100))
+        file_desc_api.get_file_descs.return_value = [fd]
+        folder = await _get_member("/c/docs", {"c": client})
+        assert isinstance(folder, Folder)
+        generation = folder.generation()
+
+        assert await folder.quota_used_bytes() is None
+        await folder.members(["a.txt"])
+
+        assert await folder.quota_used_bytes() == 100
+        assert folder.generation() != generation
+
+    @pytest.mark.asyncio
+    async def test_etags(self, client, mocker):
+        create_webdav_app({"c": client})
+        client.file_api = mocker.AsyncMock()
+        fd = TGFSFileDesc.empty("a.txt")
+        fd.add_empty_version()
+        client.file_api.desc.return_value = fd
+        folder = await _get_member("/c/docs", {"c": client})
+        resource = await _get_member("/c/docs/a.txt", {"c": client})
+        assert folder is not None and resource is not None
+        before = await folder.etag()
+
+        assert await resource.etag() == f'"{fd.latest_version_id}"'
+        assert before is not None and before.startswith("W/")
+        client.dir_api.root.find_dir("docs").touch()
+        assert await folder.etag() != before
+
+    def test_conditional_head_of_a_changed_folder(self, client):
+        app = TestClient(create_webdav_app({"c": client}))
+        since = {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+        etag = app.head("/c/docs").headers["ETag"]
+        assert app.head("/c/docs", headers={"If-None-Match": etag}).status_code == 304
+
+        client.dir_api.root.find_dir("docs").create_file_ref("b.txt", 2)
+
+        assert app.head("/c/docs", headers={"If-None-Match": etag}).status_code == 200
+        assert app.head("/c/docs", headers=since).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_overwrite_reaches_cached_resources(self, client, mocker):
+        create_webdav_app({"c": client})
+        file_desc_api = mocker.AsyncMock(spec=FileDescApi)
+        client.file_api = FileApi(mocker.AsyncMock(spec=MetaDataApi), file_desc_api)
+        fd = TGFSFileDesc.empty("a.txt")
+        fd.add_version_from_sent_file_message(SentFileMessage(10, 100))
+        file_desc_api.get_file_desc.return_value = fd
+        resource = await _get_member("/c/docs/a.txt", {"c": client})
+        assert resource is not None
+        before = await resource.etag()
+
+        overwritten = TGFSFileDesc.empty("a.txt")
+        overwritten.add_version_from_sent_file_message(SentFileMessage(11, 200))
+        file_desc_api.append_file_version.return_value = FDRepositoryResp(
+            message_id=1, fd=overwritten
+        )
+        file_desc_api.get_file_desc.return_value = overwritten
+        await client.file_api.upload(
+            client.dir_api.root.find_dir("docs"),
+            FileMessageImported.new(message_id=11, size=200, name="a.txt"),
+        )
+
+        assert await _get_member("/c/docs/a.txt", {"c": client}) is resource
+        assert await resource.etag() != before
+        assert await resource.etag() == f'"{overwritten.latest_version_id}"'
+        assert await resource.content_length() == 200
+
+    @pytest.mark.parametrize("headers", [{"Depth": "infinity"}, {}])
+    def test_infinite_depth_propfind(self, client, mocker, headers):
+        client.file_api = mocker.AsyncMock()
+        client.file_api.descs.side_effect = lambda frs: [
+            TGFSFileDesc.empty(fr.name) for fr in frs
+        ]
+        app = TestClient(create_webdav_app({"c": client}))
+
+        resp = app.request("PROPFIND", "/c", headers=headers)
+
+        assert resp.status_code == 207
+        assert b"/c/docs/a.txt" in resp.content
+
+    def test_infinite_depth_propfind_is_cut_off(self, client, mocker):
+        client.file_api = mocker.AsyncMock()
+        client.file_api.descs.side_effect = lambda frs: [
+            TGFSFileDesc.empty(fr.name) for fr in frs
+        ]
+        propfind = PropfindConfig(
+            allow_infinite_depth=True, max_infinite_depth_responses=2
+        )
+        app = TestClient(create_webdav_app({"c": client}, propfind=propfind))
+
+        resp = app.request("PROPFIND", "/c", headers={"Depth": "infinity"})
+
+        assert resp.status_code == 207
+        assert b"/c/docs/a.txt" not in resp.content
+        assert b"507 Insufficient Storage" in resp.content
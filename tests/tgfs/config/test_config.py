@@ -9,6 +9,8 @@ from tgfs.config import (
     TGFSConfig,
     Config,
     GithubRepoConfig,
+    IntegrityConfig,
+    PropfindConfig,
     MetadataConfig,
     MetadataType,
     MetadataConfigDict,
@@ -98,6 +100,9 @@ class TestTGFSConfig:
         assert config.download.chunk_size_kb == 512
         assert config.jwt.secret == "test"
         assert config.server.host == "localhost"
+        assert config.integrity.enabled is True
+        assert config.message_cache.max_entries == 100_000
+        assert config.message_cache.persistent is False
 
     def test_from_dict_with_users(self):
         data = {
@@ -129,6 +134,38 @@ class TestTGFSConfig:
         assert config.users == {}
 
 
+class TestIntegrityConfig:
+    def test_from_dict(self):
+        data = {"enabled": False, "interval": 60, "requests_per_second": 0.5}
+        config = IntegrityConfig.from_dict(data)
+
+        assert config.enabled is False
+        assert config.interval == 60
+        assert config.requests_per_second == 0.5
+
+    def test_from_dict_defaults(self):
+        config = IntegrityConfig.from_dict({})
+
+        assert config.enabled is True
+        assert config.interval == 24 * 60 * 60
+        assert config.requests_per_second == 1
+
+
+class TestPropfindConfig:
+    def test_from_dict(self):
+        data = {"allow_infinite_depth": False, "max_infinite_depth_responses": 10}
+        config = PropfindConfig.from_dict(data)
+
+        assert config.allow_infinite_depth is False
+        assert config.max_infinite_depth_responses == 10
+
+    def test_from_dict_defaults(self):
+        config = PropfindConfig.from_dict({})
+
+        assert config.allow_infinite_depth is True
+        assert config.max_infinite_depth_responses == 10_000
+
+
 class TestGithubRepoConfig:
     def test_from_dict(self):
         data = {"repo": "owner/repo", "commit": "main", "access_token": "token123"}
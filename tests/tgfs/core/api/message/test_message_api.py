@@ -54,11 +54,6 @@ class TestMessageApi:
     def message_api(self, mock_tdlib, mock_private_channel):
         return MessageApi(mock_tdlib, mock_private_channel)
 
-    @pytest.fixture(autouse=True)
-    def mock_rate_limiter(self, mocker):
-        # Mock the rate limiter to avoid delays in tests
-        mocker.patch("tgfs.core.api.message.limiter.try_acquire")
-
     @pytest.mark.asyncio
     async def test_send_text(self, message_api, mock_tdlib, mock_private_channel):
         # Setup
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from tgfs.core.api.message import message_broker
+from tgfs.core.api.message.message_broker import MessageBroker
+from tgfs.reqres import GetMessagesReq, MessageResp
+from tgfs.telegram.interface import TDLibApi
+from tgfs.utils.message_cache import global_message_cache
+
+CHANNEL = 42
+
+
+class TestMessageBroker:
+    @pytest.fixture(autouse=True)
+    def clear_message_cache(self):
+        global_message_cache.clear()
+        yield
+        global_message_cache.clear()
+
+    @pytest.fixture
+    def bot(self, mocker):
+        bot = mocker.Mock()
+
+        async def get_messages(req: GetMessagesReq):
+            return [
+                MessageResp(message_id=i, text=str(i), document=None) if i > 0 else None
+                for i in req.message_ids
+            ]
+
+        bot.get_messages = mocker.AsyncMock(side_effect=get_messages)
+        return bot
+
+    @pytest.fixture
+    def broker(self, bot) -> MessageBroker:
+        return MessageBroker(TDLibApi(bots=[bot]), CHANNEL)
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_requests(self, broker, bot):
+        a, b = await asyncio.gather(
+            broker.get_messages([1, 2]), broker.get_messages([2, 3, -1])
+        )
+
+        assert [m.message_id for m in a] == [1, 2]
+        assert [m and m.message_id for m in b] == [2, 3, None]
+        bot.get_messages.assert_awaited_once_with(
+            GetMessagesReq(chat=CHANNEL, message_ids=(-1, 1, 2, 3))
+        )
+        assert broker.batch_sizes.count == 1
+        assert broker.wait_times.count == 2
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_full(self, broker, bot, mocker):
+        mocker.patch.object(message_broker, "IDLE_GAP", 60)
+        mocker.patch.object(message_broker, "MAX_DELAY", 60)
+
+        messages = await asyncio.wait_for(
+            broker.get_messages(list(range(1, 101))), timeout=1
+        )
+
+        assert len(messages) == 100
+        bot.get_messages.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_max_delay_bounds_a_trickle(self, broker, bot, mocker):
+        mocker.patch.object(message_broker, "IDLE_GAP", 0.02)
+        mocker.patch.object(message_broker, "MAX_DELAY", 0.05)
+
+        async def trickle():
+            tasks = []
+            for i in range(1, 21):
+                tasks.append(asyncio.create_task(broker.get_messages([i])))
+                await asyncio.sleep(0.005)
+            return await asyncio.gather(*tasks)
+
+        await trickle()
+
+        # the requests keep arriving within the idle gap, only the deadline
+        # flushes the first batch
+        assert bot.get_messages.await_count >= 2
+        assert broker.wait_times.sum / broker.wait_times.count < 0.1
+
+    @pytest.mark.asyncio
+    async def test_splits_across_bots(self, mocker, bot):
+        other = mocker.Mock()
+        other.get_messages = mocker.AsyncMock(side_effect=bot.get_messages.side_effect)
+        broker = MessageBroker(TDLibApi(bots=[bot, other]), CHANNEL)
+
+        messages = await broker.get_messages(list(range(1, 151)))
+
+        assert [m and m.message_id for m in messages] == list(range(1, 151))
+        assert len(bot.get_messages.await_args.args[0].message_ids) == 100
+        assert len(other.get_messages.await_args.args[0].message_ids) == 50
+        assert broker.batch_sizes.count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_fails_its_requests_only(self, mocker, bot):
+        failing = mocker.Mock()
+        failing.get_messages = mocker.AsyncMock(side_effect=RuntimeError("flood"))
+        broker = MessageBroker(TDLibApi(bots=[bot, failing]), CHANNEL)
+
+        first, second = await asyncio.gather(
+            broker.get_messages(list(range(1, 101))),
+            broker.get_messages([150]),
+            return_exceptions=True,
+        )
+
+        assert isinstance(first, list) and len(first) == 100
+        assert isinstance(second, RuntimeError)
+
+    @pytest.mark.asyncio
+    async def test_cached_messages_skip_the_batch(self, broker, bot):
+        await broker.get_messages([1])
+        global_message_cache[CHANNEL].id[1] = MessageResp(
+            message_id=1, text="1", document=None
+        )
+
+        assert (await broker.get_messages([1]))[0].message_id == 1
+        bot.get_messages.assert_awaited_once()
@@ -0,0 +1,111 @@
+import pytest
+from pyrogram.errors import FloodWait
+from telethon.errors import FloodWaitError
+
+from tgfs.core.api.message.rate_limiter import (
+    MAX_RETRIES,
+    MethodClass,
+    RateLimiter,
+    TokenBucket,
+    flood_wait_seconds,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(mocker) -> FakeClock:
+    clock = FakeClock()
+    mocker.patch("tgfs.core.api.message.rate_limiter.time.monotonic", clock.monotonic)
+    mocker.patch("tgfs.core.api.message.rate_limiter.asyncio.sleep", clock.sleep)
+    return clock
+
+
+def flood_wait(seconds: int) -> FloodWaitError:
+    return FloodWaitError(request=None, capture=seconds)
+
+
+def test_flood_wait_seconds():
+    assert flood_wait_seconds(flood_wait(3)) == 3
+    assert flood_wait_seconds(FloodWait(value=5)) == 5
+    assert flood_wait_seconds(ValueError()) is None
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_burst_then_rate(self, clock):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        for _ in range(4):
+            await bucket.acquire()
+
+        assert clock.sleeps == pytest.approx([0.1, 0.1])
+
+    @pytest.mark.asyncio
+    async def test_flood_wait_blocks_and_slows_down(self, clock):
+        bucket = TokenBucket(rate=10, capacity=2)
+        bucket.flood_wait(3)
+
+        await bucket.acquire()
+
+        assert sum(clock.sleeps) == pytest.approx(3)
+        assert bucket.rate == 5
+        for _ in range(100):
+            bucket.succeeded()
+        assert bucket.rate == 10
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_buckets_per_bot_chat_and_method(self, clock):
+        limiter = RateLimiter({MethodClass.WRITE: (1, 1), MethodClass.READ: (1, 1)})
+
+        async def call():
+            return 1
+
+        await limiter.run("bot1", 1, MethodClass.WRITE, call)
+        await limiter.run("bot2", 1, MethodClass.WRITE, call)
+        await limiter.run("bot1", 2, MethodClass.WRITE, call)
+        await limiter.run("bot1", 1, MethodClass.READ, call)
+        assert clock.sleeps == []
+
+        await limiter.run("bot1", 1, MethodClass.WRITE, call)
+        assert clock.sleeps == [1]
+
+    @pytest.mark.asyncio
+    async def test_retries_after_flood_wait(self, clock, mocker):
+        call = mocker.AsyncMock(side_effect=[flood_wait(7), "ok"])
+        limiter = RateLimiter()
+
+        assert await limiter.run("bot", 1, MethodClass.WRITE, call) == "ok"
+
+        assert call.await_count == 2
+        assert sum(clock.sleeps) == pytest.approx(7)
+        assert limiter.bucket("bot", 1, MethodClass.WRITE).rate < 20
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, clock, mocker):
+        call = mocker.AsyncMock(side_effect=flood_wait(1))
+
+        with pytest.raises(FloodWaitError):
+            await RateLimiter().run("bot", 1, MethodClass.READ, call)
+        assert call.await_count == MAX_RETRIES + 1
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_not_retried(self, clock, mocker):
+        call = mocker.AsyncMock(side_effect=ValueError())
+
+        with pytest.raises(ValueError):
+            await RateLimiter().run("bot", 1, MethodClass.READ, call)
+        call.assert_awaited_once()
@@ -0,0 +1,115 @@
+import pytest
+
+from tgfs.core.api.directory import DirectoryApi
+from tgfs.core.api.metadata import MetaDataApi
+from tgfs.core.api.search import SearchMode
+from tgfs.core.model import TGFSDirectory
+from tgfs.errors import FileOrDirectoryDoesNotExist
+
+
+class TestResolve:
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        root = TGFSDirectory.root_dir()
+        root.create_dir("a", None).create_dir("b", None).create_dir("c", None)
+        root.create_dir("x", None)
+        return root
+
+    @pytest.fixture
+    def metadata_api(self, mocker, root):
+        api = mocker.AsyncMock(spec=MetaDataApi)
+        api.get_root_directory = mocker.Mock(return_value=root)
+        return api
+
+    @pytest.fixture
+    def dir_api(self, metadata_api) -> DirectoryApi:
+        return DirectoryApi(metadata_api)
+
+    def test_resolve(self, dir_api, root):
+        assert dir_api.resolve("/") is root
+        assert dir_api.resolve("") is root
+        assert dir_api.resolve("/a/b/c").absolute_path == "/a/b/c"
+        assert dir_api.resolve("/a/b/").absolute_path == "/a/b"
+
+    def test_resolve_relative_parts(self, dir_api, root):
+        assert dir_api.resolve("/a/b/..") is root.find_dir("a")
+        assert dir_api.resolve("/a/./b") is root.find_dir("a").find_dir("b")
+        assert dir_api.resolve("/..") is root
+
+    def test_resolve_missing(self, dir_api):
+        with pytest.raises(FileOrDirectoryDoesNotExist):
+            dir_api.resolve("/a/missing")
+
+    def test_resolve_uses_index(self, dir_api, root, mocker):
+        c = dir_api.resolve("/a/b/c")
+        find_dir = mocker.spy(TGFSDirectory, "find_dir")
+
+        assert dir_api.resolve("/a/b/c") is c
+        assert dir_api.resolve("/a/b") is c.parent
+        find_dir.assert_not_called()
+
+        # only the levels below the deepest indexed ancestor are walked
+        c.create_dir("d", None)
+        dir_api.resolve("/a/b/c")
+        find_dir.reset_mock()
+        dir_api.resolve("/a/b/c/d")
+        assert find_dir.call_count == 1
+
+    def test_resolve_after_move(self, dir_api, root):
+        c = dir_api.resolve("/a/b/c")
+
+        c.move(root.find_dir("x"))
+
+        assert dir_api.resolve("/x/c") is c
+        with pytest.raises(FileOrDirectoryDoesNotExist):
+            dir_api.resolve("/a/b/c")
+
+    def test_resolve_after_delete(self, dir_api):
+        dir_api.resolve("/a/b").delete()
+
+        with pytest.raises(FileOrDirectoryDoesNotExist):
+            dir_api.resolve("/a/b")
+
+    def test_resolve_new_root(self, dir_api, metadata_api):
+        dir_api.resolve("/a")
+        new_root = TGFSDirectory.root_dir()
+        a = new_root.create_dir("a", None)
+        generation = TGFSDirectory.generation
+        metadata_api.get_root_directory.return_value = new_root
+
+        assert dir_api.resolve("/a") is a
+        assert TGFSDirectory.generation == generation
+
+
+class TestSearch:
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        root = TGFSDirectory.root_dir()
+        root.create_dir("music", None).create_file_ref("song.mp3", 1)
+        return root
+
+    @pytest.fixture
+    def metadata_api(self, mocker, root):
+        api = mocker.AsyncMock(spec=MetaDataApi)
+        api.get_root_directory = mocker.Mock(return_value=root)
+        return api
+
+    def test_search(self, metadata_api, root):
+        dir_api = DirectoryApi(metadata_api)
+
+        assert [hit.path for hit in dir_api.search("*.mp3", SearchMode.GLOB)] == [
+            "/music/song.mp3"
+        ]
+
+        root.find_dir("music").create_file_ref("other.mp3", 2)
+        assert len(dir_api.search("mp3")) == 2
+
+    def test_search_new_root(self, metadata_api):
+        dir_api = DirectoryApi(metadata_api)
+        dir_api.search("song")
+
+        new_root = TGFSDirectory.root_dir()
+        new_root.create_file_ref("song.flac", 3)
+        metadata_api.get_root_directory.return_value = new_root
+
+        assert [hit.path for hit in dir_api.search("song")] == ["/song.flac"]
@@ -10,6 +10,7 @@ from tgfs.reqres import (
     FileMessage,
     FileMessageEmpty,
     FileMessageFromBuffer,
+    SentFileMessage,
 )
 
 
@@ -33,7 +34,7 @@ class TestFileApi:
     @pytest.fixture
     def sample_file_ref(self, sample_directory) -> TGFSFileRef:
         return TGFSFileRef(
-            message_id=123, name="test_file.txt", location=sample_directory
+            message_id=123, name="test_file.txt", location=sample_directory, size=0
         )
 
     @pytest.fixture
@@ -63,12 +64,14 @@ class TestFileApi:
         self, file_api, mock_metadata_api, sample_directory, sample_file_ref, mocker
     ):
         new_name = "copied_file.txt"
-        sample_directory.create_file_ref = mocker.Mock(return_value=sample_file_ref)
+        mocker.patch.object(
+            TGFSDirectory, "create_file_ref", mocker.Mock(return_value=sample_file_ref)
+        )
 
         result = await file_api.copy(sample_directory, sample_file_ref, new_name)
 
         sample_directory.create_file_ref.assert_called_once_with(
-            new_name, sample_file_ref.message_id
+            new_name, sample_file_ref.message_id, sample_file_ref.size
         )
         mock_metadata_api.push.assert_called_once()
         assert result == sample_file_ref
@@ -77,16 +80,30 @@ class TestFileApi:
     async def test_copy_with_default_name(
         self, file_api, mock_metadata_api, sample_directory, sample_file_ref, mocker
     ):
-        sample_directory.create_file_ref = mocker.Mock(return_value=sample_file_ref)
+        mocker.patch.object(
+            TGFSDirectory, "create_file_ref", mocker.Mock(return_value=sample_file_ref)
+        )
 
         result = await file_api.copy(sample_directory, sample_file_ref)
 
         sample_directory.create_file_ref.assert_called_once_with(
-            sample_file_ref.name, sample_file_ref.message_id
+            sample_file_ref.name, sample_file_ref.message_id, sample_file_ref.size
         )
         mock_metadata_api.push.assert_called_once()
         assert result == sample_file_ref
 
+    @pytest.mark.asyncio
+    async def test_move(self, file_api, mock_metadata_api, sample_directory):
+        fr = sample_directory.create_file_ref("test_file.txt", 123)
+        dest = sample_directory.create_dir("dest", None)
+
+        result = await file_api.move(fr, dest, "moved.txt")
+
+        assert result is fr
+        assert dest.find_file("moved.txt").message_id == 123
+        assert sample_directory.find_files(["test_file.txt"]) == []
+        mock_metadata_api.push.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_create_new_file(
         self,
@@ -99,40 +116,38 @@ class TestFileApi:
     ):
         mock_response = mocker.Mock()
         mock_response.message_id = 456
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.create_file_desc.return_value = mock_response
-        sample_directory.create_file_ref = mocker.Mock()
+        mocker.patch.object(TGFSDirectory, "create_file_ref", mocker.Mock())
 
         result = await file_api._create_new_file(sample_directory, sample_file_message)
 
         mock_file_desc_api.create_file_desc.assert_called_once_with(sample_file_message)
         sample_directory.create_file_ref.assert_called_once_with(
-            sample_file_message.name, mock_response.message_id
+            sample_file_message.name, mock_response.message_id, 0
         )
         mock_metadata_api.push.assert_called_once()
         assert result == mock_response.fd
 
     @pytest.mark.asyncio
-    async def test_update_file_ref_message_id_if_necessary_no_update(
+    async def test_update_file_ref_if_necessary_no_update(
         self, file_api, mock_metadata_api, sample_file_ref
     ):
         current_message_id = sample_file_ref.message_id
 
-        await file_api._update_file_ref_message_id_if_necessary(
+        await file_api._update_file_ref_if_necessary(
             sample_file_ref, current_message_id
         )
 
         mock_metadata_api.push.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_update_file_ref_message_id_if_necessary_with_update(
+    async def test_update_file_ref_if_necessary_with_update(
         self, file_api, mock_metadata_api, sample_file_ref
     ):
         new_message_id = 999
 
-        await file_api._update_file_ref_message_id_if_necessary(
-            sample_file_ref, new_message_id
-        )
+        await file_api._update_file_ref_if_necessary(sample_file_ref, new_message_id)
 
         assert sample_file_ref.message_id == new_message_id
         mock_metadata_api.push.assert_called_once()
@@ -146,7 +161,7 @@ class TestFileApi:
         mock_response.message_id = (
             sample_file_ref.message_id
         )  # Same ID, no update needed
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.update_file_version.return_value = mock_response
 
         result = await file_api._update_existing_file(
@@ -167,7 +182,7 @@ class TestFileApi:
         mock_response.message_id = (
             sample_file_ref.message_id
         )  # Same ID, no update needed
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.append_file_version.return_value = mock_response
 
         result = await file_api._update_existing_file(
@@ -184,7 +199,7 @@ class TestFileApi:
     async def test_rm_without_version_id(
         self, file_api, mock_metadata_api, sample_file_ref, mocker
     ):
-        sample_file_ref.delete = mocker.Mock()
+        mocker.patch.object(TGFSFileRef, "delete", mocker.Mock())
 
         await file_api.rm(sample_file_ref)
 
@@ -200,8 +215,9 @@ class TestFileApi:
         mock_response.message_id = (
             sample_file_ref.message_id
         )  # Same ID, no update needed
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.delete_file_version.return_value = mock_response
-        sample_file_ref.delete = mocker.Mock()
+        mocker.patch.object(TGFSFileRef, "delete", mocker.Mock())
 
         await file_api.rm(sample_file_ref, version_id)
 
@@ -217,21 +233,23 @@ class TestFileApi:
         # Create a non-uploadable file message (regular FileMessage)
         file_msg = mocker.Mock(spec=FileMessage)
         file_msg.name = "test_file.txt"
-        sample_directory.find_file = mocker.Mock(
-            side_effect=FileOrDirectoryDoesNotExist("Not found")
+        mocker.patch.object(
+            TGFSDirectory,
+            "find_file",
+            mocker.Mock(side_effect=FileOrDirectoryDoesNotExist("Not found")),
         )
 
         mock_response = mocker.Mock()
         mock_response.message_id = 789
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.create_file_desc.return_value = mock_response
-        sample_directory.create_file_ref = mocker.Mock()
+        mocker.patch.object(TGFSDirectory, "create_file_ref", mocker.Mock())
 
         result = await file_api.upload(sample_directory, file_msg)
 
         sample_directory.find_file.assert_called_once_with(file_msg.name)
         mock_file_desc_api.create_file_desc.assert_called_once_with(file_msg)
-        sample_directory.create_file_ref.assert_called_once_with(file_msg.name, 789)
+        sample_directory.create_file_ref.assert_called_once_with(file_msg.name, 789, 0)
         mock_metadata_api.push.assert_called_once()
         assert result == mock_response.fd
 
@@ -242,13 +260,15 @@ class TestFileApi:
         # Create a non-uploadable file message (regular FileMessage)
         file_msg = mocker.Mock(spec=FileMessage)
         file_msg.name = "test_file.txt"
-        sample_directory.find_file = mocker.Mock(return_value=sample_file_ref)
+        mocker.patch.object(
+            TGFSDirectory, "find_file", mocker.Mock(return_value=sample_file_ref)
+        )
 
         mock_response = mocker.Mock()
         mock_response.message_id = (
             sample_file_ref.message_id
         )  # Same ID, no update needed
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.append_file_version.return_value = mock_response
 
         result = await file_api.upload(sample_directory, file_msg)
@@ -270,14 +290,16 @@ class TestFileApi:
         mocker,
     ):
         # Mock directory behavior for new file creation
-        sample_directory.find_file = mocker.Mock(
-            side_effect=FileOrDirectoryDoesNotExist("Not found")
+        mocker.patch.object(
+            TGFSDirectory,
+            "find_file",
+            mocker.Mock(side_effect=FileOrDirectoryDoesNotExist("Not found")),
         )
-        sample_directory.create_file_ref = mocker.Mock()
+        mocker.patch.object(TGFSDirectory, "create_file_ref", mocker.Mock())
 
         mock_response = mocker.Mock()
         mock_response.message_id = 789
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.create_file_desc.return_value = mock_response
 
         # Mock absolute_path property
@@ -304,8 +326,10 @@ class TestFileApi:
         mocker,
     ):
         # Mock directory behavior for new file creation
-        sample_directory.find_file = mocker.Mock(
-            side_effect=FileOrDirectoryDoesNotExist("Not found")
+        mocker.patch.object(
+            TGFSDirectory,
+            "find_file",
+            mocker.Mock(side_effect=FileOrDirectoryDoesNotExist("Not found")),
         )
 
         # Mock file creation failure
@@ -334,6 +358,40 @@ class TestFileApi:
         mock_file_desc_api.get_file_desc.assert_called_once_with(sample_file_ref)
         assert result == sample_file_desc
 
+    @pytest.mark.asyncio
+    async def test_desc_learns_size(
+        self, file_api, mock_file_desc_api, sample_directory, sample_file_desc
+    ):
+        fr = sample_directory.create_file_ref("legacy.bin", 1)
+        mock_file_desc_api.get_file_desc.return_value = sample_file_desc
+
+        await file_api.desc(fr)
+
+        assert fr.size == 1024
+        assert sample_directory.total_size == 1024
+
+    @pytest.mark.asyncio
+    async def test_update_existing_file_resizes(
+        self,
+        file_api,
+        mock_metadata_api,
+        mock_file_desc_api,
+        sample_directory,
+        sample_file_message,
+        mocker,
+    ):
+        fr = sample_directory.create_file_ref("test_file.txt", 123, size=10)
+        fd = TGFSFileDesc(name="test_file.txt")
+        fd.add_version_from_sent_file_message(SentFileMessage(message_id=5, size=12))
+        mock_response = mocker.Mock(message_id=123, fd=fd)
+        mock_file_desc_api.append_file_version.return_value = mock_response
+
+        await file_api._update_existing_file(fr, sample_file_message, None)
+
+        assert fr.size == 12
+        assert sample_directory.total_size == 12
+        mock_metadata_api.push.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_retrieve_empty_file(
         self, file_api, mock_file_desc_api, sample_file_ref
@@ -466,13 +524,15 @@ class TestFileApi:
         mocker,
     ):
         version_id = "v3"
-        sample_directory.find_file = mocker.Mock(return_value=sample_file_ref)
+        mocker.patch.object(
+            TGFSDirectory, "find_file", mocker.Mock(return_value=sample_file_ref)
+        )
 
         mock_response = mocker.Mock()
         mock_response.message_id = (
             sample_file_ref.message_id
         )  # Same ID, no update needed
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.update_file_version.return_value = mock_response
 
         result = await file_api.upload(
@@ -493,6 +553,7 @@ class TestFileApi:
         new_message_id = 999
         mock_response = mocker.Mock()
         mock_response.message_id = new_message_id  # Different ID, update needed
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.delete_file_version.return_value = mock_response
 
         await file_api.rm(sample_file_ref, version_id)
@@ -517,7 +578,7 @@ class TestFileApi:
         new_message_id = 888
         mock_response = mocker.Mock()
         mock_response.message_id = new_message_id  # Different ID, update needed
-        mock_response.fd = mocker.Mock(spec=TGFSFileDesc)
+        mock_response.fd = TGFSFileDesc.empty("test_file.txt")
         mock_file_desc_api.append_file_version.return_value = mock_response
 
         result = await file_api._update_existing_file(
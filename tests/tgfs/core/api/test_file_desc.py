@@ -0,0 +1,59 @@
+import pytest
+
+from tgfs.core.api.file_desc import FileDescApi
+from tgfs.core.model import TGFSDirectory, TGFSFileDesc, TGFSFileRef
+from tgfs.core.repository.interface import (
+    FDRepositoryResp,
+    IFDRepository,
+    IFileContentRepository,
+)
+from tgfs.reqres import FileMessageEmpty, SentFileMessage
+
+
+class TestFileDescApi:
+    @pytest.fixture
+    def shared_fd(self) -> TGFSFileDesc:
+        fd = TGFSFileDesc(name="f")
+        fd.add_version_from_sent_file_message(SentFileMessage(5, 10))
+        return fd
+
+    @pytest.fixture
+    def fd_repo(self, mocker, shared_fd):
+        repo = mocker.AsyncMock(spec=IFDRepository)
+        repo.get.return_value = shared_fd
+        repo.save.side_effect = lambda fd, fr: FDRepositoryResp(message_id=1, fd=fd)
+        return repo
+
+    @pytest.fixture
+    def file_desc_api(self, mocker, fd_repo) -> FileDescApi:
+        return FileDescApi(fd_repo, mocker.AsyncMock(spec=IFileContentRepository))
+
+    @pytest.fixture
+    def fr(self) -> TGFSFileRef:
+        return TGFSFileRef(message_id=1, name="f", location=TGFSDirectory.root_dir())
+
+    @pytest.mark.asyncio
+    async def test_edits_a_copy(self, file_desc_api, shared_fd, fr):
+        version_id = shared_fd.latest_version_id
+
+        resp = await file_desc_api.append_file_version(FileMessageEmpty.new("f"), fr)
+        await file_desc_api.delete_file_version(fr, version_id)
+
+        assert list(shared_fd.versions) == [version_id]
+        assert resp.fd is not shared_fd
+        assert len(resp.fd.versions) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_save_leaves_descriptor(
+        self, file_desc_api, fd_repo, shared_fd, fr
+    ):
+        fd_repo.save.side_effect = Exception("flood wait")
+        version_id = shared_fd.latest_version_id
+
+        with pytest.raises(Exception, match="flood wait"):
+            await file_desc_api.update_file_version(
+                fr, FileMessageEmpty.new("f"), version_id
+            )
+
+        assert shared_fd.get_version(version_id).message_ids == [5]
+        assert list(shared_fd.versions) == [version_id]
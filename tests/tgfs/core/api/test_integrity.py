@@ -0,0 +1,211 @@
+import asyncio
+import json
+
+import pytest
+
+from tgfs.config import IntegrityConfig
+from tgfs.core.api.integrity import IntegrityIndex, IntegrityScanner
+from tgfs.core.api.message import MessageApi
+from tgfs.core.api.metadata import MetaDataApi
+from tgfs.core.model import TGFSDirectory, TGFSFileDesc
+from tgfs.utils.message_cache import channel_cache, global_message_cache
+
+CHANNEL = 42
+
+
+def descriptor(*versions: list[int]) -> dict:
+    return dict(
+        text=json.dumps(
+            {
+                "type": "F",
+                "versions": [
+                    {
+                        "type": "FV",
+                        "id": f"v{i}",
+                        "updatedAt": 1672531200000 + i,
+                        "messageIds": ids,
+                        "size": 100 * len(ids),
+                    }
+                    for i, ids in enumerate(versions)
+                ],
+            }
+        ),
+        document=None,
+    )
+
+
+def part() -> dict:
+    return dict(text="", document=object())
+
+
+class TestIntegrityScanner:
+    @pytest.fixture(autouse=True)
+    def clear_message_cache(self):
+        global_message_cache.clear()
+        yield
+        global_message_cache.clear()
+
+    @pytest.fixture
+    def channel(self) -> dict:
+        return {}
+
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        return TGFSDirectory.root_dir()
+
+    @pytest.fixture
+    def message_api(self, mocker, channel):
+        api = mocker.AsyncMock(spec=MessageApi)
+        api.private_file_channel = CHANNEL
+
+        async def get_messages(ids):
+            return [
+                (
+                    mocker.Mock(message_id=i, **channel[i], spec=["text", "document"])
+                    if i in channel
+                    else None
+                )
+                for i in ids
+            ]
+
+        api.get_messages.side_effect = get_messages
+        return api
+
+    @pytest.fixture
+    def metadata_api(self, mocker, root):
+        api = mocker.AsyncMock(spec=MetaDataApi)
+        api.get_root_directory = mocker.Mock(return_value=root)
+        return api
+
+    @pytest.fixture
+    def index(self) -> IntegrityIndex:
+        return IntegrityIndex()
+
+    @pytest.fixture
+    def scanner(self, metadata_api, message_api, index) -> IntegrityScanner:
+        config = IntegrityConfig(enabled=True, interval=60, requests_per_second=1000)
+        return IntegrityScanner(metadata_api, message_api, index, config)
+
+    @pytest.mark.asyncio
+    async def test_scan_healthy(self, scanner, channel, root, index, message_api):
+        channel.update({1: descriptor([10, 11]), 10: part(), 11: part()})
+        root.create_file_ref("a", 1)
+        root.create_dir("sub", None).create_file_ref("b", 1)
+
+        report = await scanner.scan()
+
+        assert report.files == 2
+        assert report.missing_descriptors == 0
+        assert report.invalid_versions == 0
+        assert index.missing_messages == set()
+        # one request for the descriptors, one for their parts
+        assert message_api.get_messages.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_scan_missing_parts(self, scanner, channel, root, index):
+        channel.update({1: descriptor([10], [11, 12]), 10: part(), 11: part()})
+        docs = root.create_dir("docs", None)
+        docs.create_file_ref("a", 1)
+        root.create_file_ref("copy", 1)
+        other = root.create_dir("other", None)
+        channel_cache(CHANNEL).fd[1] = TGFSFileDesc.empty("a")
+        generations = (docs.subtree_generation, other.subtree_generation)
+
+        report = await scanner.scan()
+
+        assert report.invalid_versions == 1
+        assert index.missing_messages == {12}
+        assert 1 not in channel_cache(CHANNEL).fd
+        # cached listings and descriptors of both copies are stale
+        assert docs.subtree_generation != generations[0]
+        assert other.subtree_generation == generations[1]
+
+    @pytest.mark.asyncio
+    async def test_scan_missing_descriptor(self, scanner, root, index, message_api):
+        root.create_file_ref("a", 1)
+        generation = root.subtree_generation
+
+        report = await scanner.scan()
+        assert report.missing_descriptors == 1
+        assert index.missing_messages == {1}
+        assert root.subtree_generation != generation
+
+        # known missing messages are not fetched again
+        message_api.get_messages.reset_mock()
+        await scanner.scan()
+        message_api.get_messages.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_scan_repairs_copies(
+        self, scanner, channel, root, index, metadata_api
+    ):
+        channel.update({2: descriptor([10]), 10: part()})
+        index.missing_messages.add(1)
+        index.replaced_descriptors[1] = 2
+        copy = root.create_file_ref("copy", 1)
+
+        report = await scanner.scan()
+
+        assert report.repaired_refs == 1
+        assert report.missing_descriptors == 0
+        assert copy.message_id == 2
+        metadata_api.push.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_scan_batches(self, scanner, channel, root, message_api):
+        for i in range(250):
+            channel[1000 + i] = descriptor([i])
+            channel[i] = part()
+            root.create_file_ref(f"f{i}", 1000 + i)
+
+        report = await scanner.scan()
+
+        assert report.files == 250
+        assert all(
+            len(call.args[0]) <= 100 for call in message_api.get_messages.call_args_list
+        )
+
+    @pytest.mark.asyncio
+    async def test_scan_budget(self, mocker, metadata_api, message_api, index, root):
+        sleep = mocker.patch("tgfs.core.api.integrity.asyncio.sleep")
+        root.create_file_ref("a", 1)
+        config = IntegrityConfig(enabled=True, interval=60, requests_per_second=4)
+
+        await IntegrityScanner(metadata_api, message_api, index, config).scan()
+
+        sleep.assert_awaited_with(0.25)
+        assert sleep.await_count == message_api.get_messages.call_count
+
+    @pytest.fixture
+    def lazy_root(self, metadata_api) -> TGFSDirectory:
+        tree = TGFSDirectory.root_dir()
+        tree.create_file_ref("a", 1)
+        tree.create_dir("sub", None).create_file_ref("b", 2)
+        root = TGFSDirectory.from_dict(
+            json.loads(json.dumps(tree.to_dict())), lazy=True
+        )
+        metadata_api.get_root_directory.return_value = root
+        return root
+
+    @pytest.mark.asyncio
+    async def test_scan_skips_unloaded_subtrees(self, scanner, channel, lazy_root):
+        channel.update({1: descriptor([10]), 10: part()})
+        assert [fr.name for fr in lazy_root.files] == ["a"]
+
+        report = await scanner.scan()
+
+        assert report.files == 1
+        assert not lazy_root.find_dir("sub").is_materialized
+
+    @pytest.mark.asyncio
+    async def test_run_leaves_tree_unloaded(self, scanner, lazy_root, message_api):
+        task = asyncio.create_task(scanner.run())
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        assert not lazy_root.is_materialized
+        message_api.get_messages.assert_not_called()
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
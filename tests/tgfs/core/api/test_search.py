@@ -0,0 +1,88 @@
+import pytest
+
+from tgfs.core.api.search import NameIndex, SearchHit, SearchMode, _glob_literals
+from tgfs.core.model import TGFSDirectory
+
+
+def paths(index: NameIndex, query: str, mode=SearchMode.SUBSTRING) -> list[str]:
+    return [hit.path for hit in index.find(query, mode)]
+
+
+class TestNameIndex:
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        root = TGFSDirectory.root_dir()
+        videos = root.create_dir("Videos", None)
+        videos.create_file_ref("holiday.mp4", 1)
+        videos.create_file_ref("holiday.mp3", 2)
+        docs = root.create_dir("docs", None)
+        docs.create_file_ref("report.pdf", 3)
+        docs.create_dir("holiday-plans", None).create_file_ref("day1.md", 4)
+        return root
+
+    @pytest.fixture
+    def index(self, root) -> NameIndex:
+        return NameIndex(root)
+
+    def test_substring(self, index):
+        assert index.find("holiday") == [
+            SearchHit(path="/Videos/holiday.mp3", is_dir=False),
+            SearchHit(path="/Videos/holiday.mp4", is_dir=False),
+            SearchHit(path="/docs/holiday-plans", is_dir=True),
+        ]
+
+    def test_short_and_case_insensitive(self, index):
+        assert paths(index, "VID") == ["/Videos"]
+        assert paths(index, "y1") == ["/docs/holiday-plans/day1.md"]
+
+    def test_prefix(self, index):
+        assert paths(index, "day", SearchMode.PREFIX) == ["/docs/holiday-plans/day1.md"]
+
+    def test_glob(self, index):
+        assert paths(index, "*.mp[34]", SearchMode.GLOB) == [
+            "/Videos/holiday.mp3",
+            "/Videos/holiday.mp4",
+        ]
+        assert paths(index, "holiday.mp?", SearchMode.GLOB) == [
+            "/Videos/holiday.mp3",
+            "/Videos/holiday.mp4",
+        ]
+        assert paths(index, "*plans", SearchMode.GLOB) == ["/docs/holiday-plans"]
+
+    def test_no_match(self, index):
+        assert index.find("nothing") == []
+
+    def test_follows_changes(self, root, index):
+        docs = root.find_dir("docs")
+
+        docs.create_file_ref("holiday.jpg", 5)
+        root.find_dir("Videos").find_file("holiday.mp3").delete()
+        docs.find_dir("holiday-plans").move(root, "trips")
+        docs.find_file("report.pdf").move(root, "holiday-report.pdf")
+
+        assert paths(index, "holiday") == [
+            "/Videos/holiday.mp4",
+            "/docs/holiday.jpg",
+            "/holiday-report.pdf",
+        ]
+        # moving a directory moves what is in it
+        assert paths(index, "day1") == ["/trips/day1.md"]
+
+        root.find_dir("trips").delete()
+        assert index.find("day1") == []
+
+    def test_ignores_other_trees(self, index):
+        other = TGFSDirectory.root_dir()
+        other.create_file_ref("holiday.txt", 9)
+
+        assert len(index.find("holiday")) == 3
+
+    def test_copied_directory(self, root, index):
+        root.create_dir("copy", root.find_dir("docs")).delete()
+
+        assert paths(index, "report") == ["/docs/report.pdf"]
+
+    def test_glob_literals(self):
+        assert _glob_literals("*.mp[34]") == [".mp"]
+        assert _glob_literals("a?bc*def") == ["a", "bc", "def"]
+        assert _glob_literals("[]x]yz") == ["yz"]
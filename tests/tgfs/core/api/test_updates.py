@@ -0,0 +1,192 @@
+import json
+
+import pytest
+
+from tgfs.core.api import updates
+from tgfs.core.api.integrity import IntegrityIndex
+from tgfs.core.api.message import MessageApi
+from tgfs.core.api.metadata import MetaDataApi
+from tgfs.core.api.updates import ChannelWatcher, FileRefIndex
+from tgfs.core.model import TGFSDirectory
+from tgfs.reqres import ChannelUpdate, MessageResp, UpdateKind
+from tgfs.utils.message_cache import channel_cache, global_message_cache
+
+CHANNEL = 42
+
+
+class TestChannelWatcher:
+    @pytest.fixture(autouse=True)
+    def clear_message_cache(self):
+        global_message_cache.clear()
+        yield
+        global_message_cache.clear()
+
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        root = TGFSDirectory.root_dir()
+        root.create_dir("docs", None).create_file_ref("a.txt", 10)
+        root.create_file_ref("b.txt", 20)
+        return root
+
+    @pytest.fixture
+    def metadata_api(self, mocker, root):
+        api = mocker.AsyncMock(spec=MetaDataApi)
+        api.get_root_directory = mocker.Mock(return_value=root)
+        api.on_message_edited.return_value = False
+        return api
+
+    @pytest.fixture
+    def index(self) -> IntegrityIndex:
+        return IntegrityIndex()
+
+    @pytest.fixture
+    def watcher(self, mocker, metadata_api, index) -> ChannelWatcher:
+        message_api = mocker.Mock(spec=MessageApi)
+        message_api.private_file_channel = CHANNEL
+        return ChannelWatcher(message_api, metadata_api, index)
+
+    @pytest.fixture
+    def changes(self, watcher) -> list:
+        changes: list = []
+        watcher.add_listener(changes.append)
+        return changes
+
+    def test_start_subscribes_to_the_file_channel(self, mocker, watcher):
+        tdlib = watcher._message_api.tdlib = mocker.Mock()
+        tdlib.account = None
+
+        watcher.start()
+
+        tdlib.bot.subscribe.assert_called_once_with(CHANNEL, watcher.handle)
+
+    @pytest.mark.asyncio
+    async def test_new_message_clears_searches(self, watcher, changes):
+        cache = channel_cache(CHANNEL)
+        cache.search["q"] = ()
+        cache.id[10] = MessageResp(10, "fd", None)
+
+        await watcher.handle(ChannelUpdate(CHANNEL, UpdateKind.NEW_MESSAGE, (11,)))
+
+        assert "q" not in cache.search
+        assert 10 in cache.id
+        assert changes == []
+
+    @pytest.mark.asyncio
+    async def test_edit_invalidates_the_message(self, watcher, changes, root):
+        generation = root.find_dir("docs").subtree_generation
+        cache = channel_cache(CHANNEL)
+        cache.id[10] = MessageResp(10, "fd", None)
+        cache.id[20] = MessageResp(20, "fd", None)
+
+        await watcher.handle(ChannelUpdate(CHANNEL, UpdateKind.MESSAGE_EDITED, (10,)))
+
+        assert 10 not in cache.id
+        assert 20 in cache.id
+        assert changes == [["/docs/a.txt"]]
+        assert root.find_dir("docs").subtree_generation != generation
+
+    @pytest.mark.asyncio
+    async def test_metadata_edit_resets_everything(
+        self, watcher, metadata_api, changes
+    ):
+        metadata_api.on_message_edited.return_value = True
+
+        await watcher.handle(ChannelUpdate(CHANNEL, UpdateKind.MESSAGE_EDITED, (1,)))
+
+        metadata_api.on_message_edited.assert_awaited_once_with(1)
+        assert changes == [["/"]]
+
+    @pytest.mark.asyncio
+    async def test_deletion_marks_messages_missing(self, watcher, index, changes):
+        cache = channel_cache(CHANNEL)
+        cache.id[20] = MessageResp(20, "fd", None)
+
+        await watcher.handle(
+            ChannelUpdate(CHANNEL, UpdateKind.MESSAGES_DELETED, (20, 30))
+        )
+
+        assert 20 not in cache.id
+        assert cache.id.find_nonexistent([20, 30]) == []
+        assert index.is_missing(20) and index.is_missing(30)
+        assert changes == [["/b.txt"]]
+
+    @pytest.mark.asyncio
+    async def test_unknown_messages_notify_nobody(self, watcher, changes):
+        await watcher.handle(ChannelUpdate(CHANNEL, UpdateKind.MESSAGE_EDITED, (99,)))
+
+        assert changes == []
+
+    @pytest.mark.asyncio
+    async def test_refs_are_found_without_walking(self, mocker, watcher, changes, root):
+        await watcher.handle(ChannelUpdate(CHANNEL, UpdateKind.MESSAGE_EDITED, (10,)))
+        root.create_file_ref("c.txt", 30)
+        walk = mocker.spy(updates, "_loaded_refs")
+
+        await watcher.handle(ChannelUpdate(CHANNEL, UpdateKind.MESSAGE_EDITED, (30,)))
+
+        assert changes[-1] == ["/c.txt"]
+        walk.assert_not_called()
+
+
+class TestFileRefIndex:
+    @pytest.fixture
+    def root(self) -> TGFSDirectory:
+        root = TGFSDirectory.root_dir()
+        docs = root.create_dir("docs", None)
+        docs.create_file_ref("a.txt", 10)
+        docs.create_dir("old", None).create_file_ref("b.txt", 20)
+        root.create_file_ref("c.txt", 10)
+        return root
+
+    @pytest.fixture
+    def index(self, root) -> FileRefIndex:
+        return FileRefIndex(root)
+
+    @staticmethod
+    def names(frs) -> list:
+        return sorted(fr.name for fr in frs)
+
+    def test_find(self, index):
+        assert self.names(index.find([10])) == ["a.txt", "c.txt"]
+        assert self.names(index.find([20, 99])) == ["b.txt"]
+
+    def test_follows_changes(self, index, root):
+        docs = root.find_dir("docs")
+        fr = docs.create_file_ref("d.txt", 40)
+        docs.find_dir("old").delete()
+        fr.move(root, "e.txt")
+
+        assert index.find([20]) == []
+        assert index.find([40]) == [fr]
+        assert not index.stale
+
+    def test_repoint(self, index, root):
+        fr = root.find_file("c.txt")
+
+        fr.repoint(50)
+
+        assert self.names(index.find([10])) == ["a.txt"]
+        assert index.find([50]) == [fr]
+
+    def test_copies_are_indexed_once(self, index, root):
+        root.create_dir("copy", root.find_dir("docs"))
+
+        assert self.names(index.find([10])) == ["a.txt", "c.txt"]
+
+    def test_lazy_directories_are_indexed_when_loaded(self, root):
+        lazy = TGFSDirectory.from_dict(
+            json.loads(json.dumps(root.to_dict())), lazy=True
+        )
+        assert self.names(lazy.files) == ["c.txt"]
+        index = FileRefIndex(lazy)
+        assert self.names(index.find([10])) == ["c.txt"]
+
+        assert self.names(lazy.find_dir("docs").files) == ["a.txt"]
+
+        assert self.names(index.find([10])) == ["a.txt", "c.txt"]
+        assert index.find([20]) == []
+
+    def test_other_trees_are_ignored(self, index):
+        TGFSDirectory.root_dir().create_file_ref("x.txt", 10)
+
+        assert self.names(index.find([10])) == ["a.txt", "c.txt"]
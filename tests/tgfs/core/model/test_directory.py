@@ -1,12 +1,14 @@
 import pytest
+from typing import cast
 from unittest.mock import Mock
 
-from tgfs.core.model import TGFSFileRefSerialized
+from tgfs.core.model import TGFSDirectorySerialized, TGFSFileRefSerialized
 from tgfs.core.model.directory import TGFSDirectory, TGFSFileRef
 from tgfs.errors import (
     FileOrDirectoryAlreadyExists,
     FileOrDirectoryDoesNotExist,
     InvalidName,
+    MoveIntoItself,
 )
 from tgfs.utils.time import FIRST_DAY_OF_EPOCH, ts
 
@@ -45,6 +47,46 @@ class TestTGFSFileRef:
 
         assert file_ref not in parent_dir.files
 
+    def test_move(self):
+        # Test moving a file reference keeps its descriptor
+        root = TGFSDirectory.root_dir()
+        dest = root.create_dir("dest", None)
+        file_ref = root.create_file_ref("test.txt", 123)
+
+        file_ref.move(dest, "renamed.txt")
+
+        assert root.files == []
+        assert dest.files == [file_ref]
+        assert file_ref.location is dest
+        assert file_ref.name == "renamed.txt"
+        assert file_ref.message_id == 123
+
+    def test_move_keeps_name(self):
+        root = TGFSDirectory.root_dir()
+        dest = root.create_dir("dest", None)
+        file_ref = root.create_file_ref("test.txt", 123)
+
+        file_ref.move(dest)
+
+        assert dest.find_file("test.txt") is file_ref
+
+    def test_move_conflict(self):
+        root = TGFSDirectory.root_dir()
+        file_ref = root.create_file_ref("a.txt", 1)
+        root.create_file_ref("b.txt", 2)
+
+        with pytest.raises(FileOrDirectoryAlreadyExists):
+            file_ref.move(root, "b.txt")
+        assert file_ref.name == "a.txt"
+
+    def test_move_to_same_name(self):
+        root = TGFSDirectory.root_dir()
+        file_ref = root.create_file_ref("a.txt", 1)
+
+        file_ref.move(root, "a.txt")
+
+        assert root.files == [file_ref]
+
 
 class TestTGFSDirectory:
     def test_init_minimal(self):
@@ -104,6 +146,10 @@ class TestTGFSDirectory:
             "name": "empty",
             "children": [],
             "files": [],
+            "size": 0,
+            "fileCount": 0,
+            "dirCount": 0,
+            "unsizedCount": 0,
         }
 
         assert result == expected
@@ -434,6 +480,71 @@ class TestTGFSDirectory:
 
         assert file_ref not in parent.files
 
+    def test_move(self):
+        root = TGFSDirectory.root_dir()
+        src = root.create_dir("src", None)
+        dest = root.create_dir("dest", None)
+        moved = src.create_dir("moved", None)
+        moved.create_file_ref("file.txt", 1)
+
+        moved.move(dest, "renamed")
+
+        assert src.children == []
+        assert dest.children == [moved]
+        assert moved.parent is dest
+        assert moved.absolute_path == "/dest/renamed"
+        assert moved.find_file("file.txt").location is moved
+
+    def test_move_rename_in_place(self):
+        root = TGFSDirectory.root_dir()
+        d = root.create_dir("old", None)
+
+        d.move(root, "new")
+
+        assert root.find_dir("new") is d
+        assert root.find_dirs(["old"]) == []
+
+    def test_move_conflict(self):
+        root = TGFSDirectory.root_dir()
+        d = root.create_dir("a", None)
+        root.create_dir("b", None)
+
+        with pytest.raises(FileOrDirectoryAlreadyExists):
+            d.move(root, "b")
+        assert d.name == "a"
+
+    def test_move_invalid_name(self):
+        root = TGFSDirectory.root_dir()
+        d = root.create_dir("a", None)
+
+        with pytest.raises(InvalidName):
+            d.move(root, "b/c")
+
+    def test_move_into_itself(self):
+        root = TGFSDirectory.root_dir()
+        d = root.create_dir("a", None)
+        descendant = d.create_dir("b", None).create_dir("c", None)
+
+        with pytest.raises(MoveIntoItself):
+            d.move(descendant)
+        with pytest.raises(MoveIntoItself):
+            d.move(d, "a2")
+        assert d.parent is root
+
+    def test_generation_bumped_on_changes(self):
+        root = TGFSDirectory.root_dir()
+        generations = [TGFSDirectory.generation]
+
+        d = root.create_dir("a", None)
+        fr = d.create_file_ref("f", 1)
+        fr.move(root, "g")
+        d.move(root, "b")
+        fr.delete()
+        d.delete()
+        generations.append(TGFSDirectory.generation)
+
+        assert generations[1] - generations[0] == 6
+
     def test_delete_with_parent(self):
         # Test deleting directory with parent
         parent = TGFSDirectory(name="parent", parent=None)
@@ -502,3 +613,264 @@ class TestTGFSDirectory:
         assert projects.absolute_path == "/Documents/Projects"
         assert myproject.absolute_path == "/Documents/Projects/MyProject"
         assert src.absolute_path == "/Documents/Projects/MyProject/src"
+
+
+class TestTGFSDirectoryLazy:
+    @pytest.fixture
+    def serialized(self):
+        return {
+            "type": "D",
+            "name": "root",
+            "children": [
+                {
+                    "type": "D",
+                    "name": "videos",
+                    "children": [
+                        {"type": "D", "name": "2024", "children": [], "files": []}
+                    ],
+                    "files": [{"type": "FR", "messageId": 1, "name": "a.mp4"}],
+                }
+            ],
+            "files": [{"type": "FR", "messageId": 2, "name": "readme.md"}],
+        }
+
+    def test_from_dict_lazy_does_not_build_children(self, serialized):
+        root = TGFSDirectory.from_dict(serialized, lazy=True)
+
+        assert not root.is_materialized
+
+    def test_access_materializes_one_level(self, serialized):
+        root = TGFSDirectory.from_dict(serialized, lazy=True)
+
+        videos = root.find_dir("videos")
+
+        assert root.is_materialized
+        assert not videos.is_materialized
+        assert videos.parent is root
+        assert root.find_file("readme.md").message_id == 2
+        assert videos.find_file("a.mp4").location is videos
+
+    def test_to_dict_reuses_untouched_payload(self, serialized):
+        root = TGFSDirectory.from_dict(serialized, lazy=True)
+        root.find_dir("videos")
+
+        result = root.to_dict()
+
+        assert result == serialized
+        assert (
+            result["children"][0]["children"] is serialized["children"][0]["children"]
+        )
+
+    def test_to_dict_reflects_changes(self, serialized):
+        root = TGFSDirectory.from_dict(serialized, lazy=True)
+        root.find_dir("videos").create_file_ref("b.mp4", 3)
+
+        result = root.to_dict()
+
+        assert result["children"][0]["files"] == [
+            {"type": "FR", "messageId": 1, "name": "a.mp4"},
+            {"type": "FR", "messageId": 3, "name": "b.mp4"},
+        ]
+
+    def test_eager_and_lazy_serialize_identically(self, serialized):
+        eager = TGFSDirectory.from_dict(serialized)
+        lazy = TGFSDirectory.from_dict(serialized, lazy=True)
+
+        assert eager.is_materialized
+        assert eager.find_dir("videos").is_materialized
+        assert eager.to_dict() == lazy.to_dict() == serialized
+
+    def test_move_keeps_payload(self, serialized):
+        root = TGFSDirectory.from_dict(serialized, lazy=True)
+        videos = root.find_dir("videos")
+
+        videos.move(root.create_dir("media", None), "clips")
+
+        # the moved subtree is still untouched and serializes from its payload
+        assert not videos.is_materialized
+        result = root.to_dict()
+        assert result["children"][0]["children"][0] == dict(
+            serialized["children"][0], name="clips"
+        )
+
+    def test_from_dict_counts_legacy_payload(self, serialized):
+        root = TGFSDirectory.from_dict(serialized, lazy=True)
+
+        assert (root.file_count, root.dir_count, root.total_size) == (2, 2, 0)
+        assert serialized["children"][0]["fileCount"] == 1
+
+        videos = root.find_dir("videos")
+        assert (videos.file_count, videos.dir_count) == (1, 1)
+        assert not videos.is_materialized
+        # none of them knows its size
+        assert (root.unsized_count, videos.unsized_count) == (2, 1)
+
+
+class TestTGFSDirectoryAggregates:
+    def stats(self, d: TGFSDirectory) -> tuple[int, int, int]:
+        return d.total_size, d.file_count, d.dir_count
+
+    def test_create_and_delete(self):
+        root = TGFSDirectory.root_dir()
+        a = root.create_dir("a", None)
+        b = a.create_dir("b", None)
+        b.create_file_ref("f", 1, size=100)
+        fr = a.create_file_ref("g", 2, size=20)
+
+        assert self.stats(root) == (120, 2, 2)
+        assert self.stats(a) == (120, 2, 1)
+        assert self.stats(b) == (100, 1, 0)
+
+        fr.delete()
+        assert self.stats(root) == (100, 1, 2)
+
+        b.delete()
+        assert self.stats(root) == (0, 0, 1)
+
+    def test_move(self):
+        root = TGFSDirectory.root_dir()
+        a = root.create_dir("a", None)
+        x = root.create_dir("x", None)
+        b = a.create_dir("b", None)
+        b.create_file_ref("f", 1, size=100)
+        fr = a.create_file_ref("g", 2, size=20)
+
+        b.move(x)
+        fr.move(x)
+
+        assert self.stats(a) == (0, 0, 0)
+        assert self.stats(x) == (120, 2, 1)
+        assert self.stats(root) == (120, 2, 3)
+
+    def test_resize(self):
+        root = TGFSDirectory.root_dir()
+        fr = root.create_dir("a", None).create_file_ref("f", 1)
+
+        assert root.unsized_count == 1
+        assert fr.resize(50)
+        assert not fr.resize(50)
+        assert self.stats(root) == (50, 1, 1)
+        assert root.unsized_count == 0
+
+    def test_unsized(self):
+        root = TGFSDirectory.root_dir()
+        a = root.create_dir("a", None)
+        x = root.create_dir("x", None)
+        fr = a.create_file_ref("f", 1)
+        a.create_file_ref("g", 2, size=10)
+
+        assert (root.unsized_count, a.unsized_count) == (1, 1)
+        copy = root.create_dir("copy", a)
+        assert (root.unsized_count, copy.unsized_count) == (2, 1)
+        fr.move(x)
+        assert (a.unsized_count, x.unsized_count) == (0, 1)
+        x.delete()
+        assert root.unsized_count == 1
+
+    def test_copy(self):
+        root = TGFSDirectory.root_dir()
+        a = root.create_dir("a", None)
+        a.create_file_ref("f", 1, size=10)
+        a.create_dir("b", None)
+
+        copy = root.create_dir("copy", a)
+
+        assert self.stats(copy) == (10, 1, 1)
+        assert self.stats(root) == (20, 2, 4)
+
+    def test_serialized(self):
+        root = TGFSDirectory.root_dir()
+        root.create_dir("a", None).create_file_ref("f", 1, size=10)
+        data = root.to_dict()
+
+        assert data["files"] == []
+        assert data["children"][0]["files"] == [
+            {"type": "FR", "messageId": 1, "name": "f", "size": 10}
+        ]
+        assert (data["size"], data["fileCount"], data["dirCount"]) == (10, 1, 1)
+        assert data["unsizedCount"] == 0
+
+        loaded = TGFSDirectory.from_dict(cast(TGFSDirectorySerialized, data), lazy=True)
+        assert self.stats(loaded) == (10, 1, 1)
+        assert loaded.find_dir("a").find_file("f").size == 10
+
+
+class TestReplace:
+    def test_takes_over_the_contents(self):
+        root = TGFSDirectory.root_dir()
+        root.create_dir("old", None)
+        loaded = TGFSDirectory.root_dir()
+        loaded.create_dir("a", None).create_file_ref("f", 1, size=10)
+        loaded.create_file_ref("g", 2)
+        generation = (root.subtree_generation, TGFSDirectory.generation)
+
+        root.replace(loaded)
+
+        assert [d.name for d in root.children] == ["a"]
+        assert root.find_dir("a").parent is root
+        assert root.find_file("g").location is root
+        assert (root.total_size, root.file_count, root.dir_count) == (10, 2, 1)
+        assert root.unsized_count == 1
+        assert root.subtree_generation != generation[0]
+        assert TGFSDirectory.generation != generation[1]
+
+    def test_lazy_tree(self):
+        root = TGFSDirectory.root_dir()
+        loaded = TGFSDirectory.root_dir()
+        loaded.create_dir("a", None).create_dir("b", None)
+        data = cast(TGFSDirectorySerialized, loaded.to_dict())
+
+        root.replace(TGFSDirectory.from_dict(data, lazy=True))
+
+        assert root.find_dir("a").parent is root
+        assert root.find_dir("a").find_dir("b").parent is root.find_dir("a")
+        assert root.dir_count == 2
+
+
+class TestSubtreeGeneration:
+    def test_changes_bump_the_ancestors(self):
+        root = TGFSDirectory.root_dir()
+        a = root.create_dir("a", None)
+        b = a.create_dir("b", None)
+        other = root.create_dir("other", None)
+        before = (
+            root.subtree_generation,
+            a.subtree_generation,
+            other.subtree_generation,
+        )
+
+        b.create_file_ref("f", 1)
+
+        assert root.subtree_generation != before[0]
+        assert a.subtree_generation != before[1]
+        assert other.subtree_generation == before[2]
+
+    def test_move_bumps_both_locations(self):
+        root = TGFSDirectory.root_dir()
+        src = root.create_dir("src", None)
+        dst = root.create_dir("dst", None)
+        fr = src.create_file_ref("f", 1)
+        before = (src.subtree_generation, dst.subtree_generation)
+
+        fr.move(dst)
+
+        assert src.subtree_generation != before[0]
+        assert dst.subtree_generation != before[1]
+
+    def test_resize_bumps_the_ancestors(self):
+        root = TGFSDirectory.root_dir()
+        fr = root.create_dir("a", None).create_file_ref("f", 1)
+        before = (root.subtree_generation, TGFSDirectory.generation)
+
+        fr.resize(10)
+
+        assert root.subtree_generation != before[0]
+        assert TGFSDirectory.generation != before[1]
+
+    def test_recreated_directory_gets_a_new_generation(self):
+        root = TGFSDirectory.root_dir()
+        old = root.create_dir("a", None)
+        generation = old.subtree_generation
+        old.delete()
+
+        assert root.create_dir("a", None).subtree_generation != generation
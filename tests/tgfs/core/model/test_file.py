@@ -92,6 +92,7 @@ class TestTGFSFileVersion:
             "id": "test-id",
             "updatedAt": ts(test_dt),
             "messageIds": [123, 456],
+            "partSizes": [512, 512],
             "size": 1024,
         }
 
@@ -176,6 +177,43 @@ class TestTGFSFileVersion:
         assert version.updated_at == FIRST_DAY_OF_EPOCH
         assert version.message_ids == [123]
 
+    def test_from_dict_part_sizes(self):
+        # Test that serialized part sizes are read back
+        version = TGFSFileVersion.from_dict(
+            {
+                "type": "FV",
+                "id": "test-id",
+                "size": 1024,
+                "messageIds": [123, 456],
+                "partSizes": [1000, 24],
+            }
+        )
+
+        assert version.part_sizes == [1000, 24]
+        assert version.size == 1024
+        assert version.has_part_sizes()
+
+    def test_from_dict_single_part_without_part_sizes(self):
+        # Test that the size of a single part file is its part size
+        version = TGFSFileVersion.from_dict(
+            {"type": "FV", "id": "test-id", "size": 1024, "messageIds": [123]}
+        )
+
+        assert version.part_sizes == [1024]
+        assert version.has_part_sizes()
+
+    def test_from_dict_round_trip(self):
+        version = TGFSFileVersion(
+            id="test-id",
+            updated_at=datetime.datetime(2023, 1, 1, 12, 0, 0),
+            message_ids=[123, 456],
+            part_sizes=[512, 256],
+        )
+
+        result = TGFSFileVersion.from_dict(json.loads(json.dumps(version.to_dict())))
+
+        assert result == version
+
     def test_from_dict_legacy_message_id(self):
         # Test deserialization with legacy messageId field
         version = TGFSFileVersion.from_dict(
@@ -1,13 +1,17 @@
+import asyncio
 import datetime
 import json
 import pytest
 from unittest.mock import Mock, AsyncMock
 
 from tgfs.core.api import MessageApi
+from tgfs.core.api.integrity import IntegrityIndex
 from tgfs.core.model import TGFSFileDesc, TGFSFileRef, TGFSFileVersion
 from tgfs.core.repository.impl.fd.tg_msg import TGMsgFDRepository
 from tgfs.core.repository.interface import FDRepositoryResp
 from tgfs.errors import MessageNotFound
+from tgfs.reqres import SentFileMessage
+from tgfs.utils.message_cache import global_message_cache
 
 
 # Global fixtures for all test classes
@@ -18,9 +22,18 @@ def mock_message_api():
     api.send_text = AsyncMock()
     api.edit_message_text = AsyncMock()
     api.get_messages = AsyncMock()
+    api.private_file_channel = 12345
     return api
 
 
+@pytest.fixture(autouse=True)
+def clear_message_cache():
+    """File descriptors are cached process-wide"""
+    global_message_cache.clear()
+    yield
+    global_message_cache.clear()
+
+
 @pytest.fixture
 def repository(mock_message_api):
     """Create repository instance with mocked API"""
@@ -165,8 +178,8 @@ class TestGetMethod:
                         "updatedAt": int(
                             datetime.datetime(2023, 1, 1).timestamp() * 1000
                         ),
+                        # written without its part sizes
                         "messageIds": [12345],
-                        "size": 1000,
                     }
                 ],
             }
@@ -194,6 +207,34 @@ class TestGetMethod:
         assert result.name == "test_file.txt"
         assert len(result.versions) == 1
 
+    @pytest.mark.asyncio
+    async def test_get_with_part_sizes(
+        self, repository, mock_message_api, sample_file_ref
+    ):
+        """Test that versions with part sizes are not checked against the channel"""
+        mock_message = Mock()
+        mock_message.text = json.dumps(
+            {
+                "name": "test_file.txt",
+                "versions": [
+                    {
+                        "id": "v1",
+                        "updatedAt": 1672531200000,
+                        "messageIds": [12345, 12346],
+                        "partSizes": [1000, 500],
+                        "size": 1500,
+                    }
+                ],
+            }
+        )
+        mock_message_api.get_messages.return_value = [mock_message]
+
+        result = await repository.get(sample_file_ref)
+
+        mock_message_api.get_messages.assert_called_once_with([999])
+        assert result.get_latest_version().part_sizes == [1000, 500]
+        assert result.get_latest_version().size == 1500
+
     @pytest.mark.asyncio
     async def test_get_missing_message(
         self, repository, mock_message_api, sample_file_ref
@@ -477,14 +518,259 @@ class TestValidateFvMethod:
 
         result = await repository._validate_fv(fd, include_all_versions=False)
 
-        # get_messages is called but with empty list
-        mock_message_api.get_messages.assert_called_once_with([])
+        # there is nothing to check
+        mock_message_api.get_messages.assert_not_called()
 
         # Should return empty file descriptor since no valid versions found
         assert result.name == "empty_versions.txt"
         assert len(result.versions) == 0
 
 
+class TestFileDescCache:
+    """Test caching of validated file descriptors"""
+
+    @pytest.fixture
+    def descriptor_message(self):
+        message = Mock()
+        message.text = json.dumps(
+            {
+                "name": "test_file.txt",
+                "versions": [
+                    {
+                        "id": "v1",
+                        "updatedAt": 1672531200000,
+                        "messageIds": [12345],
+                    }
+                ],
+            }
+        )
+        return message
+
+    @pytest.fixture
+    def file_message(self):
+        message = Mock()
+        message.message_id = 12345
+        message.document = Mock()
+        message.document.size = 1000
+        return message
+
+    @pytest.fixture
+    def messages(self, mock_message_api, descriptor_message, file_message):
+        async def get_messages(ids):
+            await asyncio.sleep(0)
+            return [descriptor_message] if ids == [999] else [file_message]
+
+        mock_message_api.get_messages.side_effect = get_messages
+        return mock_message_api.get_messages
+
+    @pytest.mark.asyncio
+    async def test_get_is_cached(self, repository, messages, sample_file_ref):
+        """Test that a descriptor is only fetched and validated once"""
+        first = await repository.get(sample_file_ref)
+        second = await repository.get(sample_file_ref)
+
+        assert second is first
+        assert first.get_latest_version().part_sizes == [1000]
+        assert messages.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(
+        self, repository, messages, sample_file_ref
+    ):
+        """Test single-flight loading of concurrent misses"""
+        results = await asyncio.gather(
+            *(repository.get(sample_file_ref) for _ in range(10))
+        )
+
+        assert all(fd is results[0] for fd in results)
+        assert messages.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_save_replaces_entry(
+        self, repository, messages, mock_message_api, sample_file_ref
+    ):
+        """Test that a saved descriptor takes the place of its cache entry"""
+        await repository.get(sample_file_ref)
+        saved = TGFSFileDesc(name="test_file.txt")
+        saved.add_version_from_sent_file_message(SentFileMessage(777, 10))
+        mock_message_api.edit_message_text.return_value = 999
+
+        await repository.save(saved, sample_file_ref)
+
+        assert await repository.get(sample_file_ref) is saved
+        assert messages.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_save_drops_entry(
+        self, repository, messages, mock_message_api, sample_file_ref
+    ):
+        """Test that a descriptor which could not be written is not cached"""
+        await repository.get(sample_file_ref)
+        saved = TGFSFileDesc(name="test_file.txt")
+        saved.add_version_from_sent_file_message(SentFileMessage(777, 10))
+        mock_message_api.edit_message_text.side_effect = Exception("flood wait")
+
+        with pytest.raises(Exception, match="flood wait"):
+            await repository.save(saved, sample_file_ref)
+
+        fd = await repository.get(sample_file_ref)
+        assert fd.get_latest_version().message_ids == [12345]
+        assert messages.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_save_during_load(self, repository, messages, sample_file_ref):
+        """Test that a load overtaken by a save does not fill the cache"""
+        loading = asyncio.create_task(repository.get(sample_file_ref))
+        await asyncio.sleep(0)
+
+        repository.invalidate(sample_file_ref.message_id)
+        await loading
+        await repository.get(sample_file_ref)
+
+        assert messages.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_missing_descriptor_not_cached(
+        self, repository, mock_message_api, sample_file_ref
+    ):
+        """Test that a missing descriptor is fetched again next time"""
+        mock_message_api.get_messages.return_value = [None]
+
+        await repository.get(sample_file_ref)
+        await repository.get(sample_file_ref)
+
+        assert mock_message_api.get_messages.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_copies_keep_their_name(self, repository, messages, sample_file_ref):
+        """Test that refs sharing a descriptor message get their own name"""
+        await repository.get(sample_file_ref)
+        copy_ref = TGFSFileRef(message_id=999, name="copy.txt", location=Mock())
+
+        fd = await repository.get(copy_ref)
+
+        assert fd.name == "copy.txt"
+        assert messages.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_include_all_versions_bypasses_cache(
+        self, repository, messages, sample_file_ref
+    ):
+        """Test that fully validated descriptors are always loaded"""
+        await repository.get(sample_file_ref)
+        await repository.get(sample_file_ref, include_all_versions=True)
+
+        assert messages.call_count == 4
+
+
+class TestGetMany:
+    """Test loading the descriptors of many files together"""
+
+    @staticmethod
+    def descriptor(part_id: int) -> Mock:
+        message = Mock()
+        message.text = json.dumps(
+            {
+                "name": "f",
+                "versions": [
+                    {"id": "v1", "updatedAt": 1672531200000, "messageIds": [part_id]}
+                ],
+            }
+        )
+        return message
+
+    @staticmethod
+    def part(message_id: int) -> Mock:
+        message = Mock()
+        message.message_id = message_id
+        message.document = Mock()
+        message.document.size = message_id
+        return message
+
+    @pytest.fixture
+    def messages(self, mock_message_api):
+        async def get_messages(ids):
+            return [
+                self.descriptor(i + 10_000) if i < 10_000 else self.part(i) for i in ids
+            ]
+
+        mock_message_api.get_messages.side_effect = get_messages
+        return mock_message_api.get_messages
+
+    @pytest.mark.asyncio
+    async def test_two_requests_for_all_files(self, repository, messages):
+        frs = [
+            TGFSFileRef(message_id=i, name=f"f{i}", location=Mock())
+            for i in range(2000)
+        ]
+
+        fds = await repository.get_many(frs)
+
+        assert messages.call_count == 2
+        assert messages.call_args_list[0].args[0] == list(range(2000))
+        assert [fd.name for fd in fds] == [fr.name for fr in frs]
+        assert fds[7].get_latest_version().part_sizes == [10_007]
+
+    @pytest.mark.asyncio
+    async def test_cached_and_loading_descriptors_are_reused(
+        self, repository, messages
+    ):
+        frs = [TGFSFileRef(message_id=i, name="f", location=Mock()) for i in range(3)]
+        await repository.get(frs[0])
+        loading = asyncio.create_task(repository.get(frs[1]))
+        await asyncio.sleep(0)
+
+        await repository.get_many(frs + [frs[2]])
+        await loading
+
+        assert [c.args[0] for c in messages.call_args_list[::2]] == [[0], [1], [2]]
+        assert messages.call_count == 6
+
+
+class TestIntegrityIndex:
+    """Test that the read path consults the integrity scan results"""
+
+    @pytest.mark.asyncio
+    async def test_missing_descriptor_not_fetched(
+        self, mock_message_api, sample_file_ref
+    ):
+        repository = TGMsgFDRepository(
+            mock_message_api, IntegrityIndex(missing_messages={999})
+        )
+
+        result = await repository.get(sample_file_ref)
+
+        assert result.versions == {}
+        mock_message_api.get_messages.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_missing_parts_invalidate_version(
+        self, mock_message_api, sample_file_desc
+    ):
+        repository = TGMsgFDRepository(
+            mock_message_api, IntegrityIndex(missing_messages={12346})
+        )
+
+        result = await repository._validate_fv(sample_file_desc, False)
+
+        assert result.versions == {}
+        mock_message_api.get_messages.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_recreated_descriptor_is_recorded(
+        self, mock_message_api, sample_file_desc, sample_file_ref
+    ):
+        index = IntegrityIndex()
+        repository = TGMsgFDRepository(mock_message_api, index)
+        mock_message_api.edit_message_text.side_effect = MessageNotFound(999)
+        mock_message_api.send_text.return_value = 6001
+
+        await repository.save(sample_file_desc, fr=sample_file_ref)
+
+        assert index.is_missing(999)
+        assert index.replaced_descriptors == {999: 6001}
+
+
 class TestIntegrationScenarios:
     """Integration tests for complete workflows"""
 
@@ -517,7 +803,6 @@ class TestIntegrationScenarios:
 
         mock_message_api.get_messages.side_effect = [
             [mock_descriptor_message],  # Get descriptor
-            [file_message, file_message2],  # Validate content
         ]
 
         file_ref = TGFSFileRef(message_id=5001, name="test_file.txt", location=Mock())
@@ -525,9 +810,10 @@ class TestIntegrationScenarios:
 
         assert isinstance(get_result, TGFSFileDesc)
         assert get_result.name == "test_file.txt"
+        assert get_result.get_latest_version().part_sizes == [500, 500]
 
-        # Verify validation calls were made
-        assert mock_message_api.get_messages.call_count == 2
+        # The saved descriptor is served from the cache
+        assert mock_message_api.get_messages.call_count == 0
 
     @pytest.mark.asyncio
     async def test_update_workflow_with_fallback(
@@ -0,0 +1,266 @@
+"""
+An in-memory fake of the parts of the GitHub REST API used by the metadata repository.
+
+It is plugged into PyGithub with Requester.injectConnectionClasses, so the real client
+code (URL building, JSON parsing, lazy objects) runs against it.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from github.Requester import Requester
+
+_defer_request = Requester._Requester__deferRequest  # type: ignore[attr-defined]
+
+# path -> (type, sha), only blobs are stored, directories are implied by their paths
+FlatTree = Dict[str, Tuple[str, str]]
+
+
+def _sha(*parts: object) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: object):
+        self.status = status
+        self._body = json.dumps(body)
+
+    def getheaders(self):
+        return [("content-type", "application/json")]
+
+    def read(self):
+        return self._body
+
+
+class FakeGithubServer:
+    def __init__(
+        self,
+        paths: Iterable[str] = (),
+        repo: str = "owner/test-repo",
+        branch: str = "main",
+        truncate_at: Optional[int] = None,
+    ):
+        self.repo = repo
+        self.branch = branch
+        self.truncate_at = truncate_at
+        self.requests: List[Tuple[str, str]] = []
+
+        self.trees: Dict[str, FlatTree] = {}
+        self.commits: Dict[str, dict] = {}
+        self.refs: Dict[str, str] = {}
+        # set to a number to make the next ref updates fail as if someone else pushed
+        self.concurrent_pushes = 0
+
+        tree_sha = self._write_tree({p: ("blob", _sha("blob", "")) for p in paths})
+        self.refs[f"heads/{branch}"] = self._write_commit("init", tree_sha, [])
+
+    # git object store
+
+    def _write_tree(self, flat: FlatTree) -> str:
+        sha = _sha("tree", sorted(flat.items()))
+        self.trees[sha] = dict(flat)
+        return sha
+
+    def _write_commit(self, message: str, tree_sha: str, parents: List[str]) -> str:
+        sha = _sha("commit", message, tree_sha, parents, len(self.commits))
+        self.commits[sha] = {"tree": tree_sha, "parents": parents, "message": message}
+        return sha
+
+    @property
+    def head(self) -> str:
+        return self.refs[f"heads/{self.branch}"]
+
+    def paths(self, ref: Optional[str] = None) -> List[str]:
+        return sorted(self.trees[self._resolve_tree(ref or self.branch)])
+
+    def _resolve_tree(self, sha: str) -> str:
+        if f"heads/{sha}" in self.refs:
+            sha = self.refs[f"heads/{sha}"]
+        if sha in self.commits:
+            sha = self.commits[sha]["tree"]
+        return sha
+
+    def _is_ancestor(self, ancestor: str, commit: str) -> bool:
+        if ancestor == commit:
+            return True
+        return any(
+            self._is_ancestor(ancestor, p) for p in self.commits[commit]["parents"]
+        )
+
+    # REST endpoints
+
+    def _listing(self, tree_sha: str, recursive: bool) -> dict:
+        flat = self.trees[tree_sha]
+        entries: Dict[str, dict] = {}
+        for path, (_, blob_sha) in flat.items():
+            parts = path.split("/")
+            for i in range(1, len(parts)):
+                dir_path = "/".join(parts[:i])
+                entries.setdefault(
+                    dir_path,
+                    {
+                        "path": dir_path,
+                        "mode": "040000",
+                        "type": "tree",
+                        "sha": self._write_tree(
+                            {
+                                p[len(dir_path) + 1 :]: v
+                                for p, v in flat.items()
+                                if p.startswith(f"{dir_path}/")
+                            }
+                        ),
+                    },
+                )
+            entries[path] = {
+                "path": path,
+                "mode": "100644",
+                "type": "blob",
+                "sha": blob_sha,
+            }
+
+        listing = [entries[p] for p in sorted(entries) if recursive or "/" not in p]
+        truncated = bool(
+            recursive
+            and self.truncate_at is not None
+            and len(listing) > self.truncate_at
+        )
+        if truncated:
+            listing = listing[: self.truncate_at]
+        return {"sha": tree_sha, "url": "", "tree": listing, "truncated": truncated}
+
+    def _ref(self, name: str) -> dict:
+        return {
+            "ref": f"refs/{name}",
+            "url": f"{self.repo_url}/git/refs/{name}",
+            "object": {"sha": self.refs[name], "type": "commit", "url": ""},
+        }
+
+    def _commit(self, sha: str) -> dict:
+        commit = self.commits[sha]
+        return {
+            "sha": sha,
+            "url": f"{self.repo_url}/git/commits/{sha}",
+            "message": commit["message"],
+            "tree": {"sha": commit["tree"], "url": ""},
+            "parents": [{"sha": p, "url": ""} for p in commit["parents"]],
+        }
+
+    def _contents(self, path: str, ref: str) -> Tuple[int, object]:
+        flat = self.trees[self._resolve_tree(ref)]
+        if path in flat:
+            return 200, {"type": "file", "path": path, "sha": flat[path][1]}
+        if any(p.startswith(f"{path}/") for p in flat):
+            return 200, []
+        return 404, {"message": "Not Found"}
+
+    def _create_tree(self, body: dict) -> dict:
+        flat: FlatTree = (
+            dict(self.trees[body["base_tree"]]) if "base_tree" in body else {}
+        )
+        for entry in body["tree"]:
+            path = entry["path"]
+            if entry["type"] == "tree":
+                for p in [p for p in flat if p.startswith(f"{path}/")]:
+                    del flat[p]
+                if entry.get("sha") is not None:
+                    for p, v in self.trees[entry["sha"]].items():
+                        flat[f"{path}/{p}"] = v
+            elif "content" in entry:
+                flat[path] = ("blob", _sha("blob", entry["content"]))
+            elif entry.get("sha") is None:
+                if path not in flat:
+                    return {"__status__": 422, "message": "GitRPC::BadObjectState"}
+                del flat[path]
+            else:
+                flat[path] = ("blob", entry["sha"])
+        return self._listing(self._write_tree(flat), recursive=False)
+
+    @property
+    def repo_url(self) -> str:
+        return f"https://api.github.com/repos/{self.repo}"
+
+    def handle(self, verb: str, url: str, body: Optional[dict]) -> Tuple[int, object]:
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+        self.requests.append((verb, path))
+
+        prefix = f"/repos/{self.repo}"
+        if verb == "GET" and path == prefix:
+            return 200, {
+                "url": self.repo_url,
+                "full_name": self.repo,
+                "name": self.repo.split("/")[1],
+            }
+        if not path.startswith(prefix):
+            return 404, {"message": "Not Found"}
+        path = path[len(prefix) :]
+
+        if verb == "GET" and (m := re.fullmatch(r"/git/trees/(.+)", path)):
+            tree_sha = self._resolve_tree(m.group(1))
+            if tree_sha not in self.trees:
+                return 404, {"message": "Not Found"}
+            return 200, self._listing(tree_sha, query.get("recursive") == ["1"])
+        if verb == "GET" and (m := re.fullmatch(r"/contents/(.+)", path)):
+            return self._contents(m.group(1), query.get("ref", [self.branch])[0])
+        if verb == "GET" and (m := re.fullmatch(r"/git/refs?/(.+)", path)):
+            return 200, self._ref(m.group(1))
+        if verb == "GET" and (m := re.fullmatch(r"/git/commits/(.+)", path)):
+            return 200, self._commit(m.group(1))
+        if verb == "POST" and path == "/git/trees" and body is not None:
+            res = self._create_tree(body)
+            return int(res.pop("__status__", 201)), res
+        if verb == "POST" and path == "/git/commits" and body is not None:
+            sha = self._write_commit(body["message"], body["tree"], body["parents"])
+            return 201, self._commit(sha)
+        if verb == "PATCH" and (m := re.fullmatch(r"/git/refs/(.+)", path)) and body:
+            name = m.group(1)
+            if self.concurrent_pushes:
+                self.concurrent_pushes -= 1
+                tree_sha = self.commits[self.refs[name]]["tree"]
+                self.refs[name] = self._write_commit(
+                    "other", tree_sha, [self.refs[name]]
+                )
+            if not body.get("force") and not self._is_ancestor(
+                self.refs[name], body["sha"]
+            ):
+                return 422, {"message": "Update is not a fast forward"}
+            self.refs[name] = body["sha"]
+            return 200, self._ref(name)
+        return 404, {"message": "Not Found"}
+
+    def count(self, verb: str, pattern: str) -> int:
+        return sum(
+            1
+            for v, p in self.requests
+            if v == verb and re.search(pattern, p) is not None
+        )
+
+    def install(self) -> None:
+        server = self
+
+        class Connection:
+            def __init__(self, *args, **kwargs):
+                self._response: Optional[FakeResponse] = None
+
+            def request(self, verb, url, input=None, headers=None, *args, **kwargs):
+                body = json.loads(input) if input else None
+                self._response = FakeResponse(*server.handle(verb, url, body))
+
+            def getresponse(self):
+                return self._response
+
+            def close(self):
+                pass
+
+        Requester.injectConnectionClasses(Connection, Connection)  # type: ignore[arg-type]
+        # PyGithub spaces out requests to stay under GitHub's secondary rate limits
+        Requester._Requester__deferRequest = lambda self, verb: None  # type: ignore[attr-defined]
+
+    @staticmethod
+    def uninstall() -> None:
+        Requester.resetConnectionClasses()
+        Requester._Requester__deferRequest = _defer_request  # type: ignore[attr-defined]
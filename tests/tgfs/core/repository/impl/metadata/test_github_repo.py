@@ -1,7 +1,10 @@
+import asyncio
+import threading
+
 import pytest
 from unittest.mock import Mock, MagicMock, patch
 from typing import List
-from github import Github
+from github import Github, GithubException
 from github.Repository import Repository
 from github.ContentFile import ContentFile
 
@@ -9,9 +12,14 @@ from tgfs.config import GithubRepoConfig
 from tgfs.core.model import TGFSDirectory, TGFSFileRef, TGFSMetadata
 from tgfs.core.repository.impl.metadata.github_repo import GithubRepoMetadataRepository
 from tgfs.core.repository.impl.metadata.github_repo.gh_directory import (
+    GithubChange,
+    GithubChangeType,
     GithubConfig,
     GithubDirectory,
 )
+from tgfs.errors import FileOrDirectoryAlreadyExists
+
+from .github_fake import FakeGithubServer
 
 
 # Global fixtures for all test classes
@@ -68,6 +76,25 @@ def sample_directory_content():
     return content
 
 
+@pytest.fixture
+def github_server():
+    def serve(*paths: str, **kwargs) -> FakeGithubServer:
+        server = FakeGithubServer(paths, **kwargs)
+        server.install()
+        return server
+
+    yield serve
+    FakeGithubServer.uninstall()
+
+
+def load(server: FakeGithubServer, commit: str = "main") -> GithubDirectory:
+    repository = GithubRepoMetadataRepository(
+        GithubRepoConfig(access_token="test_token", repo=server.repo, commit=commit)
+    )
+    server.requests.clear()
+    return repository._build_directory_structure()
+
+
 class TestGithubRepoMetadataRepository:
     """Test the main GithubRepoMetadataRepository class"""
 
@@ -88,207 +115,305 @@ class TestGithubRepoMetadataRepository:
         assert repository._ghc.repo == mock_repo
         assert repository._ghc.gh == mock_github_instance
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
     @pytest.mark.asyncio
-    async def test_get_metadata(self, mock_github_class, mock_github_config):
-        """Test getting metadata structure"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
+    async def test_push_without_changes(self, mock_github_config):
+        """Test that pushing nothing does not talk to GitHub"""
+        with patch(
+            "tgfs.core.repository.impl.metadata.github_repo.Github"
+        ) as mock_github_class:
+            repository = GithubRepoMetadataRepository(mock_github_config)
+            await repository.push()
 
-        # Mock the repo contents
-        mock_repo.get_contents.return_value = []
+        mock_repo = mock_github_class.return_value.get_repo.return_value
+        mock_repo.create_file.assert_not_called()
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
 
-        # Test get method
-        result = await repository.get()
+class TestPush:
+    """Test writing queued changes to GitHub"""
 
-        # Should return TGFSMetadata with GithubDirectory
-        assert isinstance(result, TGFSMetadata)
-        assert isinstance(result.dir, GithubDirectory)
-        assert result.dir.name == "root"
-        assert result.dir.parent is None
+    @staticmethod
+    async def get_root(server: FakeGithubServer) -> tuple:
+        repository = GithubRepoMetadataRepository(
+            GithubRepoConfig(access_token="test", repo=server.repo, commit="main")
+        )
+        root_dir = (await repository.get()).dir
+        server.requests.clear()
+        return repository, root_dir
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
-    def test_build_directory_structure_with_files_and_dirs(
-        self, mock_github_class, mock_github_config
-    ):
-        """Test building directory structure with files and directories"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
+    @pytest.mark.asyncio
+    async def test_push_single_commit(self, github_server):
+        """Test that all queued changes are written as one commit"""
+        server = github_server("existing.1")
+        repository, root_dir = await self.get_root(server)
+        initial_head = server.head
 
-        # Mock content structure: root -> [file1.123, subdir] -> [file2.456]
-        file1 = Mock(spec=ContentFile)
-        file1.name = "document.123"
-        file1.type = "file"
-        file1.path = "document.123"
-
-        subdir = Mock(spec=ContentFile)
-        subdir.name = "subdir"
-        subdir.type = "dir"
-        subdir.path = "subdir"
-
-        file2 = Mock(spec=ContentFile)
-        file2.name = "image.456"
-        file2.type = "file"
-        file2.path = "subdir/image.456"
-
-        # Set up mock returns
-        mock_repo.get_contents.side_effect = [
-            [file1, subdir],  # root contents
-            [file2],  # subdir contents
+        sub_dir = root_dir.create_dir("documents", None)
+        sub_dir.create_file_ref("report", 11111)
+        sub_dir.create_file_ref("presentation", 22222)
+        await repository.push()
+
+        assert server.paths() == [
+            "documents/.gitkeep",
+            "documents/presentation.22222",
+            "documents/report.11111",
+            "existing.1",
         ]
+        assert server.commits[server.head]["parents"] == [initial_head]
+        assert server.count("POST", "/git/commits") == 1
+        assert server.count("PATCH", "/git/refs/heads/main") == 1
+        assert repository._ghc.changes == []
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
-        root_dir = repository._build_directory_structure()
+    @pytest.mark.asyncio
+    async def test_push_recursive_delete(self, github_server):
+        """Test that deleting a large directory takes a constant number of requests"""
+        server = github_server(
+            "keep.1", *[f"videos/{i // 100}/v{i}.{i + 10}" for i in range(2000)]
+        )
+        repository, root_dir = await self.get_root(server)
 
-        # Verify structure
-        assert root_dir.name == "root"
-        assert len(root_dir.files) == 1
-        assert len(root_dir.children) == 1
+        root_dir.find_dir("videos").delete()
+        await repository.push()
 
-        # Check root file
-        assert root_dir.files[0].name == "document"
-        assert root_dir.files[0].message_id == 123
+        assert server.paths() == ["keep.1"]
+        assert len(server.requests) == 5
 
-        # Check subdirectory
-        sub_dir = root_dir.children[0]
-        assert sub_dir.name == "subdir"
-        assert len(sub_dir.files) == 1
-        assert sub_dir.files[0].name == "image"
-        assert sub_dir.files[0].message_id == 456
+    @pytest.mark.asyncio
+    async def test_push_delete_file_ref(self, github_server):
+        """Test deleting a file reference"""
+        server = github_server("a.1", "dir/b.2")
+        repository, root_dir = await self.get_root(server)
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
-    def test_build_directory_structure_with_gitkeep_ignored(
-        self, mock_github_class, mock_github_config
-    ):
-        """Test that .gitkeep files are ignored during structure building"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
+        sub_dir = root_dir.find_dir("dir")
+        sub_dir.delete_file_ref(sub_dir.find_file("b"))
+        await repository.push()
 
-        gitkeep_file = Mock(spec=ContentFile)
-        gitkeep_file.name = ".gitkeep"
-        gitkeep_file.type = "file"
-        gitkeep_file.path = ".gitkeep"
+        assert server.paths() == ["a.1"]
 
-        regular_file = Mock(spec=ContentFile)
-        regular_file.name = "test.789"
-        regular_file.type = "file"
-        regular_file.path = "test.789"
+    @pytest.mark.asyncio
+    async def test_push_move_file(self, github_server):
+        """Test that a rename is a single commit which keeps the message id"""
+        server = github_server("a.1", "dir/.gitkeep")
+        repository, root_dir = await self.get_root(server)
 
-        mock_repo.get_contents.return_value = [gitkeep_file, regular_file]
+        root_dir.find_file("a").move(root_dir.find_dir("dir"), "b")
+        await repository.push()
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
-        root_dir = repository._build_directory_structure()
+        assert server.paths() == ["dir/.gitkeep", "dir/b.1"]
+        assert server.count("POST", "/git/commits") == 1
 
-        # Should only have the regular file, .gitkeep should be ignored
-        assert len(root_dir.files) == 1
-        assert root_dir.files[0].name == "test"
-        assert root_dir.files[0].message_id == 789
+    @pytest.mark.asyncio
+    async def test_push_move_dir(self, github_server):
+        """Test that moving a directory rewrites the tree in one commit"""
+        server = github_server(
+            "keep.1", "src/.gitkeep", "src/a.2", "src/sub/.gitkeep", "src/sub/b.3"
+        )
+        repository, root_dir = await self.get_root(server)
+
+        dest = root_dir.create_dir("dest", None)
+        root_dir.find_dir("src").move(dest, "moved")
+        await repository.push()
+
+        assert server.paths() == [
+            "dest/.gitkeep",
+            "dest/moved/.gitkeep",
+            "dest/moved/a.2",
+            "dest/moved/sub/.gitkeep",
+            "dest/moved/sub/b.3",
+            "keep.1",
+        ]
+        # the new parent, then the move
+        assert server.count("POST", "/git/trees") == 2
+        assert server.count("POST", "/git/commits") == 1
+
+        # the loaded tree matches what was pushed
+        loaded = load(server)
+        assert (
+            loaded.find_dir("dest")
+            .find_dir("moved")
+            .find_dir("sub")
+            .find_file("b")
+            .message_id
+            == 3
+        )
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
-    @patch("tgfs.core.repository.impl.metadata.github_repo.logger")
-    def test_build_directory_structure_handles_invalid_filename(
-        self, mock_logger, mock_github_class, mock_github_config
-    ):
-        """Test handling of invalid filename formats"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
+    @pytest.mark.asyncio
+    async def test_push_move_large_dir(self, github_server):
+        """Test that a moved directory is re-parented instead of written again"""
+        server = github_server(
+            "src/.gitkeep", *[f"src/{i // 100}/f{i}.{i + 10}" for i in range(1000)]
+        )
+        repository, root_dir = await self.get_root(server)
+        trees = []
+        handle = server.handle
 
-        invalid_file = Mock(spec=ContentFile)
-        invalid_file.name = "invalid_filename_no_message_id"
-        invalid_file.type = "file"
-        invalid_file.path = "invalid_filename_no_message_id"
+        def record(verb, url, body):
+            if verb == "POST" and url.endswith("/git/trees"):
+                trees.append(body["tree"])
+            return handle(verb, url, body)
 
-        mock_repo.get_contents.return_value = [invalid_file]
+        server.handle = record  # type: ignore[method-assign]
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
-        root_dir = repository._build_directory_structure()
+        root_dir.find_dir("src").move(root_dir, "dst")
+        await repository.push()
 
-        # Should have no files due to invalid format
-        assert len(root_dir.files) == 0
+        assert [[(e["path"], e["sha"] is None) for e in tree] for tree in trees] == [
+            [("dst", False), ("src", True)]
+        ]
+        assert len(server.paths()) == 1001
+        assert all(p.startswith("dst/") for p in server.paths())
+        assert server.commits[server.head]["message"] == "Move src to dst"
+        assert len(server.requests) <= 6
 
-        # Should log a warning
-        mock_logger.warning.assert_called_once()
-        warning_call = mock_logger.warning.call_args[0][0]
-        assert "Invalid name format" in warning_call
-        assert "invalid_filename_no_message_id" in warning_call
+    @pytest.mark.asyncio
+    async def test_push_changes_around_a_move(self, github_server):
+        """Test that changes before and after a move land where they belong"""
+        server = github_server("a/.gitkeep", "a/x.1")
+        repository, root_dir = await self.get_root(server)
+
+        a = root_dir.find_dir("a")
+        a.create_file_ref("y", 2)
+        a.move(root_dir, "b")
+        a.create_file_ref("z", 3)
+        a.move(root_dir, "c")
+        a.delete_file_ref(a.find_file("x"))
+        await repository.push()
+
+        assert server.paths() == ["c/.gitkeep", "c/y.2", "c/z.3"]
+        assert server.count("POST", "/git/commits") == 1
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
+    @pytest.mark.asyncio
     @patch("tgfs.core.repository.impl.metadata.github_repo.logger")
-    def test_build_directory_structure_handles_repo_errors(
-        self, mock_logger, mock_github_class, mock_github_config
-    ):
-        """Test handling of repository access errors"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
+    async def test_push_create_then_delete(self, mock_logger, github_server):
+        """Test that paths created and deleted again before a push are dropped"""
+        server = github_server("a.1")
+        repository, root_dir = await self.get_root(server)
 
-        # Make get_contents raise an exception
-        mock_repo.get_contents.side_effect = Exception("API rate limit exceeded")
+        fr = root_dir.create_file_ref("b", 2)
+        root_dir.create_file_ref("c", 3)
+        root_dir.delete_file_ref(fr)
+        await repository.push()
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
-        root_dir = repository._build_directory_structure()
+        assert server.paths() == ["a.1", "c.3"]
+        mock_logger.warning.assert_called_once()
+        assert repository._ghc.changes == []
 
-        # Should return empty root directory
-        assert root_dir.name == "root"
-        assert len(root_dir.files) == 0
-        assert len(root_dir.children) == 0
+    @pytest.mark.asyncio
+    async def test_push_delete_then_recreate_dir(self, github_server):
+        """Test that a directory deleted and created again is written in one tree"""
+        server = github_server("keep.1", "docs/.gitkeep", "docs/old.2", "docs/sub/x.3")
+        repository, root_dir = await self.get_root(server)
+
+        root_dir.find_dir("docs").delete()
+        docs = root_dir.create_dir("docs", None)
+        docs.create_file_ref("new", 4)
+        docs.delete_file_ref(docs.create_file_ref("tmp", 5))
+        await repository.push()
+
+        assert server.paths() == ["docs/.gitkeep", "docs/new.4", "keep.1"]
+        assert server.count("POST", "/git/trees") == 1
+        assert server.count("POST", "/git/commits") == 1
+
+    def test_squash_deletes_first(self):
+        tree = GithubRepoMetadataRepository._squash(
+            [
+                GithubChange(GithubChangeType.CREATE, "a/f.1"),
+                GithubChange(GithubChangeType.DELETE_DIR, "b"),
+                GithubChange(GithubChangeType.CREATE, "b/.gitkeep"),
+                GithubChange(GithubChangeType.DELETE, "b/g.2"),
+                GithubChange(GithubChangeType.DELETE, "c/h.3"),
+            ]
+        )
 
-        # Should log error
-        mock_logger.error.assert_called_once()
+        assert list(tree.items()) == [
+            ("b", GithubChangeType.DELETE_DIR),
+            ("c/h.3", GithubChangeType.DELETE),
+            ("a/f.1", GithubChangeType.CREATE),
+            ("b/.gitkeep", GithubChangeType.CREATE),
+        ]
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
-    @patch("tgfs.core.repository.impl.metadata.github_repo.logger")
-    def test_build_directory_structure_handles_subdirectory_errors(
-        self, mock_logger, mock_github_class, mock_github_config
-    ):
-        """Test handling of subdirectory access errors"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
+    @pytest.mark.asyncio
+    async def test_push_retries_non_fast_forward(self, github_server):
+        """Test that the commit is rebuilt when the branch moved during the push"""
+        server = github_server("a.1")
+        repository, root_dir = await self.get_root(server)
+        server.concurrent_pushes = 2
 
-        subdir = Mock(spec=ContentFile)
-        subdir.name = "protected_dir"
-        subdir.type = "dir"
-        subdir.path = "protected_dir"
+        root_dir.create_file_ref("b", 2)
+        await repository.push()
 
-        # Root contents succeed, subdirectory access fails
-        mock_repo.get_contents.side_effect = [
-            [subdir],  # root contents
-            Exception("Access denied"),  # subdirectory contents
-        ]
+        assert server.paths() == ["a.1", "b.2"]
+        assert server.count("PATCH", "/git/refs/heads/main") == 3
+        # the final commit is on top of the concurrent ones
+        parent = server.commits[server.head]["parents"][0]
+        assert server.commits[parent]["message"] == "other"
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
-        root_dir = repository._build_directory_structure()
+    @pytest.mark.asyncio
+    async def test_push_gives_up(self, github_server):
+        """Test that changes stay queued when the branch keeps moving"""
+        server = github_server("a.1")
+        repository, root_dir = await self.get_root(server)
+        server.concurrent_pushes = GithubRepoMetadataRepository.MAX_PUSH_ATTEMPTS
+
+        root_dir.create_file_ref("b", 2)
+        with pytest.raises(GithubException):
+            await repository.push()
 
-        # Should have the directory but it will be empty
-        assert len(root_dir.children) == 1
-        assert root_dir.children[0].name == "protected_dir"
-        assert len(root_dir.children[0].files) == 0
+        assert server.paths() == ["a.1"]
+        assert len(repository._ghc.changes) == 1
 
-        # Should log warning
-        mock_logger.warning.assert_called_once()
-        warning_call = mock_logger.warning.call_args[0][0]
-        assert "Failed to construct directory protected_dir" in warning_call
+        await repository.push()
+
+        assert server.paths() == ["a.1", "b.2"]
+        assert repository._ghc.changes == []
 
     @pytest.mark.asyncio
-    async def test_push_method(self, mock_github_config):
-        """Test push method (currently no-op)"""
-        with patch("tgfs.core.repository.impl.metadata.github_repo.Github"):
-            repository = GithubRepoMetadataRepository(mock_github_config)
-            # Should not raise any exception
+    async def test_failed_push_is_retried(self, github_server):
+        """Test that changes which failed to be written stay queued"""
+        server = github_server()
+        repository, root_dir = await self.get_root(server)
+        handle = server.handle
+        server.handle = lambda verb, url, body: (  # type: ignore[method-assign]
+            (500, {"message": "Server Error"})
+            if verb == "POST"
+            else handle(verb, url, body)
+        )
+
+        root_dir.create_file_ref("a", 1)
+        with pytest.raises(GithubException):
             await repository.push()
+        root_dir.create_file_ref("b", 2)
+
+        assert len(repository._ghc.changes) == 2
+
+        server.handle = handle  # type: ignore[method-assign]
+        await repository.push()
+
+        assert server.paths() == ["a.1", "b.2"]
+        assert repository._ghc.changes == []
+
+    @pytest.mark.asyncio
+    async def test_push_runs_off_the_event_loop(self, github_server):
+        """Test that a slow GitHub request does not block the event loop"""
+        server = github_server()
+        repository, root_dir = await self.get_root(server)
+        released = threading.Event()
+        handle = server.handle
+
+        def slow_handle(verb, url, body):
+            released.wait(5)
+            return handle(verb, url, body)
+
+        server.handle = slow_handle  # type: ignore[method-assign]
+        root_dir.create_file_ref("a", 1)
+
+        push = asyncio.create_task(repository.push())
+        await asyncio.sleep(0.01)
+
+        # the loop is still serving other tasks while the request is in flight
+        assert not push.done()
+        released.set()
+        await push
+        assert server.paths() == ["a.1"]
 
 
 class TestGithubDirectory:
@@ -365,20 +490,16 @@ class TestGithubDirectory:
         assert child_dir in parent_dir.children
         assert child_dir._ghc == mock_ghc
 
-    def test_create_dir_with_github_ops_success(self, mock_ghc):
-        """Test creating directory with successful GitHub operations"""
-        mock_ghc.repo.create_file.return_value = Mock()
-
+    def test_create_dir_queues_placeholder(self, mock_ghc):
+        """Test that creating a directory only queues its placeholder file"""
         parent_dir = GithubDirectory(mock_ghc, "parent", None)
         child_dir = parent_dir.create_dir("child")
 
-        # Verify GitHub API call - parent dir has None parent so path is just "child/.gitkeep"
-        mock_ghc.repo.create_file.assert_called_once_with(
-            path="child/.gitkeep",
-            message="Create directory child",
-            content="",
-            branch="main",
-        )
+        # parent dir has None parent so path is just "child/.gitkeep"
+        assert mock_ghc.changes == [
+            GithubChange(GithubChangeType.CREATE, "child/.gitkeep")
+        ]
+        mock_ghc.repo.create_file.assert_not_called()
 
         # Verify directory structure
         assert isinstance(child_dir, GithubDirectory)
@@ -386,32 +507,45 @@ class TestGithubDirectory:
         assert child_dir.parent == parent_dir
         assert child_dir in parent_dir.children
 
-    def test_create_dir_with_github_ops_failure(self, mock_ghc):
-        """Test creating directory with GitHub operation failure"""
-        mock_ghc.repo.create_file.side_effect = Exception("GitHub API error")
-
+    def test_create_dir_existing(self, mock_ghc):
+        """Test creating a directory that already exists"""
         parent_dir = GithubDirectory(mock_ghc, "parent", None)
+        parent_dir.create_dir("child")
+        mock_ghc.changes.clear()
 
-        with pytest.raises(Exception, match="GitHub API error"):
+        with pytest.raises(FileOrDirectoryAlreadyExists):
             parent_dir.create_dir("child")
 
-        # Verify no directory was added to parent
-        assert len(parent_dir.children) == 0
+        assert len(parent_dir.children) == 1
+        assert mock_ghc.changes == []
 
-    def test_create_file_ref_success(self, mock_ghc):
-        """Test creating file reference with successful GitHub operations"""
-        mock_ghc.repo.create_file.return_value = Mock()
+    def test_create_dir_with_copy(self, mock_ghc):
+        """Test that a copied directory queues its whole subtree"""
+        source = TGFSDirectory.root_dir()
+        source.create_file_ref("a", 1)
+        source.create_dir("sub", None).create_file_ref("b", 2)
+
+        root_dir = GithubDirectory(mock_ghc, "root", None)
+        root_dir.create_dir("copy", source)
+
+        assert [c.path for c in mock_ghc.changes] == [
+            "copy/.gitkeep",
+            "copy/a.1",
+            "copy/sub/.gitkeep",
+            "copy/sub/b.2",
+        ]
+
+    def test_create_file_ref(self, mock_ghc):
+        """Test that creating a file reference queues it"""
+        root_dir = GithubDirectory(mock_ghc, "root", None)
+        directory = root_dir.create_dir_skip_github_ops("testdir")
 
-        directory = GithubDirectory(mock_ghc, "testdir", None)
         file_ref = directory.create_file_ref("testfile", 12345)
 
-        # Verify GitHub API call - directory has None parent so path is just the filename
-        mock_ghc.repo.create_file.assert_called_once_with(
-            path="testfile.12345",
-            message="Create file reference for testfile",
-            content="",
-            branch="main",
-        )
+        assert mock_ghc.changes == [
+            GithubChange(GithubChangeType.CREATE, "testdir/testfile.12345")
+        ]
+        mock_ghc.repo.create_file.assert_not_called()
 
         # Verify file reference
         assert isinstance(file_ref, TGFSFileRef)
@@ -419,137 +553,32 @@ class TestGithubDirectory:
         assert file_ref.message_id == 12345
         assert file_ref in directory.files
 
-    def test_create_file_ref_failure(self, mock_ghc):
-        """Test creating file reference with GitHub operation failure"""
-        mock_ghc.repo.create_file.side_effect = Exception("GitHub API error")
-
+    def test_delete_file_ref(self, mock_ghc):
+        """Test that deleting a file reference queues its removal"""
         directory = GithubDirectory(mock_ghc, "testdir", None)
-
-        with pytest.raises(Exception, match="GitHub API error"):
-            directory.create_file_ref("testfile", 12345)
-
-        # Verify no file was added
-        assert len(directory.files) == 0
-
-    def test_delete_file_ref_success(self, mock_ghc):
-        """Test deleting file reference with successful GitHub operations"""
-        mock_content = Mock()
-        mock_content.sha = "abc123"
-        mock_ghc.repo.get_contents.return_value = mock_content
-        mock_ghc.repo.delete_file.return_value = Mock()
-
-        directory = GithubDirectory(mock_ghc, "testdir", None)
-
-        # Create file ref using parent class method (which creates it properly)
-        from tgfs.core.model import TGFSFileRef
-
         file_ref = TGFSFileRef(message_id=12345, name="testfile", location=directory)
         directory.files.append(file_ref)
 
         directory.delete_file_ref(file_ref)
 
-        # Verify GitHub API calls - directory has None parent so paths are just the filenames
-        mock_ghc.repo.get_contents.assert_called_once_with("testfile.12345", ref="main")
-        mock_ghc.repo.delete_file.assert_called_once_with(
-            path="testfile.12345",
-            message="Delete file reference for testfile",
-            sha="abc123",
-            branch="main",
-        )
-
-        # Verify file was removed
-        assert file_ref not in directory.files
-
-    def test_delete_file_ref_with_list_content(self, mock_ghc):
-        """Test deleting file reference when get_contents returns a list"""
-        mock_content = Mock()
-        mock_content.sha = "abc123"
-        mock_ghc.repo.get_contents.return_value = [
-            mock_content
-        ]  # List instead of single item
-        mock_ghc.repo.delete_file.return_value = Mock()
-
-        directory = GithubDirectory(mock_ghc, "testdir", None)
-        file_ref = TGFSFileRef(message_id=12345, name="testfile", location=directory)
-        directory.files.append(file_ref)
-
-        directory.delete_file_ref(file_ref)
-
-        # Should use first item from the list - directory has None parent
-        mock_ghc.repo.delete_file.assert_called_once_with(
-            path="testfile.12345",
-            message="Delete file reference for testfile",
-            sha="abc123",
-            branch="main",
-        )
-
-    @patch("tgfs.core.repository.impl.metadata.github_repo.gh_directory.logger")
-    def test_delete_file_ref_failure(self, mock_logger, mock_ghc):
-        """Test deleting file reference with GitHub operation failure"""
-        mock_ghc.repo.get_contents.side_effect = Exception("File not found")
-
-        directory = GithubDirectory(mock_ghc, "testdir", None)
-        file_ref = TGFSFileRef(message_id=12345, name="testfile", location=directory)
-        directory.files.append(file_ref)
-
-        directory.delete_file_ref(file_ref)
-
-        # Should log error but continue
-        mock_logger.error.assert_called_once()
-        error_call = mock_logger.error.call_args[0][0]
-        assert "Failed to delete file reference testfile" in error_call
-
-        # File should still be removed from local structure
+        assert mock_ghc.changes == [
+            GithubChange(GithubChangeType.DELETE, "testfile.12345")
+        ]
+        mock_ghc.repo.delete_file.assert_not_called()
         assert file_ref not in directory.files
 
     def test_delete_directory(self, mock_ghc):
-        """Test deleting directory"""
-        mock_content1 = Mock()
-        mock_content1.path = "testdir/file1.txt"
-        mock_content1.sha = "sha1"
-
-        mock_content2 = Mock()
-        mock_content2.path = "testdir/file2.txt"
-        mock_content2.sha = "sha2"
-
-        mock_ghc.repo.get_contents.return_value = [mock_content1, mock_content2]
-        mock_ghc.repo.delete_file.return_value = Mock()
-
-        parent = Mock()
-        parent.children = []
-
-        directory = GithubDirectory(mock_ghc, "testdir", parent)
-        parent.children.append(directory)
-
-        directory.delete()
-
-        # Verify GitHub API calls
-        mock_ghc.repo.get_contents.assert_called_once_with("testdir", ref="main")
-        assert mock_ghc.repo.delete_file.call_count == 2
-
-        # Verify directory was removed from parent
-        assert directory not in parent.children
-
-    @patch("tgfs.core.repository.impl.metadata.github_repo.gh_directory.logger")
-    def test_delete_directory_handles_errors(self, mock_logger, mock_ghc):
-        """Test deleting directory with error handling"""
-        mock_ghc.repo.get_contents.side_effect = Exception("Access denied")
-
-        parent = Mock()
-        parent.children = []
-
-        directory = GithubDirectory(mock_ghc, "testdir", parent)
-        parent.children.append(directory)
+        """Test that deleting a directory queues its removal"""
+        root_dir = GithubDirectory(mock_ghc, "root", None)
+        directory = root_dir.create_dir_skip_github_ops("testdir")
 
         directory.delete()
 
-        # Should log error
-        mock_logger.error.assert_called_once()
-        error_call = mock_logger.error.call_args[0][0]
-        assert "Failed to delete directory testdir" in error_call
-
-        # Directory should still be removed from parent
-        assert directory not in parent.children
+        assert mock_ghc.changes == [
+            GithubChange(GithubChangeType.DELETE_DIR, "testdir")
+        ]
+        mock_ghc.repo.get_contents.assert_not_called()
+        assert directory not in root_dir.children
 
 
 class TestGithubConfig:
@@ -571,31 +600,24 @@ class TestGithubConfig:
 class TestIntegrationScenarios:
     """Integration tests for complete workflows"""
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
     @pytest.mark.asyncio
-    async def test_complete_workflow_file_operations(
-        self, mock_github_class, mock_github_config
-    ):
+    async def test_complete_workflow_file_operations(self, github_server):
         """Test complete workflow of creating and managing files"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
-
-        # Mock initial empty repository
-        mock_repo.get_contents.return_value = []
-
-        repository = GithubRepoMetadataRepository(mock_github_config)
+        server = github_server()
+        repository = GithubRepoMetadataRepository(
+            GithubRepoConfig(access_token="test", repo=server.repo, commit="main")
+        )
         metadata = await repository.get()
         root_dir = metadata.dir
 
         # Create a subdirectory
-        mock_repo.create_file.return_value = Mock()
         sub_dir = root_dir.create_dir("documents", None)
+        await repository.push()
 
         # Create file references
         file_ref1 = sub_dir.create_file_ref("report", 11111)
         file_ref2 = sub_dir.create_file_ref("presentation", 22222)
+        await repository.push()
 
         # Verify structure
         assert len(root_dir.children) == 1
@@ -604,81 +626,22 @@ class TestIntegrationScenarios:
         assert file_ref2.name == "presentation"
 
         # Delete a file
-        mock_content = Mock()
-        mock_content.sha = "abc123"
-        mock_repo.get_contents.return_value = mock_content
         sub_dir.delete_file_ref(file_ref1)
+        await repository.push()
 
         assert len(sub_dir.files) == 1
         assert file_ref1 not in sub_dir.files
 
-    @patch("tgfs.core.repository.impl.metadata.github_repo.Github")
-    def test_complex_directory_structure_building(
-        self, mock_github_class, mock_github_config
-    ):
-        """Test building complex nested directory structures"""
-        mock_github_instance = Mock(spec=Github)
-        mock_repo = Mock(spec=Repository)
-        mock_github_instance.get_repo.return_value = mock_repo
-        mock_github_class.return_value = mock_github_instance
-
-        # Create complex structure: root/docs/2023/reports/ with files
-        docs_dir = Mock(spec=ContentFile)
-        docs_dir.name = "docs"
-        docs_dir.type = "dir"
-        docs_dir.path = "docs"
-
-        year_dir = Mock(spec=ContentFile)
-        year_dir.name = "2023"
-        year_dir.type = "dir"
-        year_dir.path = "docs/2023"
-
-        reports_dir = Mock(spec=ContentFile)
-        reports_dir.name = "reports"
-        reports_dir.type = "dir"
-        reports_dir.path = "docs/2023/reports"
-
-        file1 = Mock(spec=ContentFile)
-        file1.name = "q1_report.111"
-        file1.type = "file"
-        file1.path = "docs/2023/reports/q1_report.111"
-
-        file2 = Mock(spec=ContentFile)
-        file2.name = "q2_report.222"
-        file2.type = "file"
-        file2.path = "docs/2023/reports/q2_report.222"
-
-        # Set up mock returns
-        mock_repo.get_contents.side_effect = [
-            [docs_dir],  # root
-            [year_dir],  # docs/
-            [reports_dir],  # docs/2023/
-            [file1, file2],  # docs/2023/reports/
+        # The repository reloads to the same tree
+        reloaded = (await repository.get()).dir
+        assert reloaded.find_dir("documents").find_file("presentation").message_id == (
+            22222
+        )
+        assert server.paths() == [
+            "documents/.gitkeep",
+            "documents/presentation.22222",
         ]
 
-        repository = GithubRepoMetadataRepository(mock_github_config)
-        root_dir = repository._build_directory_structure()
-
-        # Navigate and verify structure
-        assert len(root_dir.children) == 1
-        docs = root_dir.children[0]
-        assert docs.name == "docs"
-
-        assert len(docs.children) == 1
-        year_2023 = docs.children[0]
-        assert year_2023.name == "2023"
-
-        assert len(year_2023.children) == 1
-        reports = year_2023.children[0]
-        assert reports.name == "reports"
-
-        assert len(reports.files) == 2
-        file_names = {f.name for f in reports.files}
-        assert file_names == {"q1_report", "q2_report"}
-
-        message_ids = {f.message_id for f in reports.files}
-        assert message_ids == {111, 222}
-
 
 class TestErrorHandling:
     """Test error handling scenarios"""
@@ -701,106 +664,183 @@ class TestErrorHandling:
         with pytest.raises(Exception, match="Repository not found"):
             GithubRepoMetadataRepository(mock_github_config)
 
-    def test_file_ref_with_non_numeric_message_id(self, mock_ghc):
-        """Test error handling for non-numeric message IDs in filenames"""
-        mock_content = Mock(spec=ContentFile)
-        mock_content.name = "test.abc"  # Non-numeric message ID
-        mock_content.type = "file"
-        mock_content.path = "test.abc"
 
-        mock_ghc.repo.get_contents.return_value = [mock_content]
+class TestTreeLoading:
+    """Test loading the namespace from the git trees API"""
 
-        with patch("tgfs.core.repository.impl.metadata.github_repo.Github"):
-            repository = GithubRepoMetadataRepository(
-                GithubRepoConfig(access_token="test", repo="test/repo", commit="main")
-            )
-            repository._ghc = mock_ghc
+    @pytest.mark.asyncio
+    async def test_get_metadata(self, github_server):
+        """Test getting metadata structure"""
+        github_server("a.1")
+        repository = GithubRepoMetadataRepository(
+            GithubRepoConfig(access_token="test", repo="owner/test-repo", commit="main")
+        )
 
-            with patch(
-                "tgfs.core.repository.impl.metadata.github_repo.logger"
-            ) as mock_logger:
-                root_dir = repository._build_directory_structure()
+        result = await repository.get()
 
-                # Should have no files due to invalid format
-                assert len(root_dir.files) == 0
+        assert isinstance(result, TGFSMetadata)
+        assert isinstance(result.dir, GithubDirectory)
+        assert result.dir.name == "root"
+        assert result.dir.parent is None
+        assert result.dir.find_file("a").message_id == 1
 
-                # Should log warning about invalid format
-                mock_logger.warning.assert_called_once()
+    @pytest.mark.asyncio
+    async def test_built_without_notifications(self, github_server):
+        """Test that the tree is built quietly and published once on the loop"""
+        github_server("a.1", "dir/b.2", "dir/sub/c.3")
+        repository = GithubRepoMetadataRepository(
+            GithubRepoConfig(access_token="test", repo="owner/test-repo", commit="main")
+        )
+        observer = Mock()
+        TGFSDirectory.observers.add(observer)
+        generations = []
+        original = repository._build_directory_structure
+
+        def build():
+            root = original()
+            generations.append(TGFSDirectory.generation)
+            return root
+
+        before = TGFSDirectory.generation
+
+        with patch.object(repository, "_build_directory_structure", build):
+            root_dir = (await repository.get()).dir
+
+        TGFSDirectory.observers.discard(observer)
+        assert generations == [before]
+        observer.added.assert_not_called()
+        observer.reset.assert_called_once()
+        assert (root_dir.file_count, root_dir.dir_count) == (3, 2)
+        assert root_dir.unsized_count == 3
+        assert root_dir.find_dir("dir").file_count == 2
+
+    def test_files_and_dirs(self, github_server):
+        """Test building directory structure with files and directories"""
+        root_dir = load(github_server("document.123", "subdir/image.456"))
+
+        assert len(root_dir.files) == 1
+        assert root_dir.files[0].name == "document"
+        assert root_dir.files[0].message_id == 123
 
+        assert len(root_dir.children) == 1
+        sub_dir = root_dir.children[0]
+        assert isinstance(sub_dir, GithubDirectory)
+        assert sub_dir.name == "subdir"
+        assert sub_dir.parent is root_dir
+        assert sub_dir.files[0].name == "image"
+        assert sub_dir.files[0].message_id == 456
 
-class TestEdgeCases:
-    """Test edge cases and boundary conditions"""
+    def test_single_recursive_request(self, github_server):
+        """Test that the whole namespace is loaded with one request"""
+        server = github_server(
+            *[
+                f"dir{i}/sub{j}/file{k}.{i * 100 + j * 10 + k}"
+                for i in range(5)
+                for j in range(5)
+                for k in range(3)
+            ]
+        )
 
-    def test_empty_repository(self, mock_ghc):
-        """Test handling of completely empty repository"""
-        mock_ghc.repo.get_contents.return_value = []
+        root_dir = load(server)
 
-        with patch("tgfs.core.repository.impl.metadata.github_repo.Github"):
-            repository = GithubRepoMetadataRepository(
-                GithubRepoConfig(access_token="test", repo="test/repo", commit="main")
-            )
-            repository._ghc = mock_ghc
-
-            root_dir = repository._build_directory_structure()
-
-            assert root_dir.name == "root"
-            assert len(root_dir.files) == 0
-            assert len(root_dir.children) == 0
-
-    def test_directory_with_only_gitkeep(self, mock_ghc):
-        """Test directory containing only .gitkeep files"""
-        gitkeep1 = Mock(spec=ContentFile)
-        gitkeep1.name = ".gitkeep"
-        gitkeep1.type = "file"
-        gitkeep1.path = ".gitkeep"
-
-        gitkeep2 = Mock(spec=ContentFile)
-        gitkeep2.name = ".gitkeep"
-        gitkeep2.type = "file"
-        gitkeep2.path = "subdir/.gitkeep"
-
-        subdir = Mock(spec=ContentFile)
-        subdir.name = "subdir"
-        subdir.type = "dir"
-        subdir.path = "subdir"
-
-        mock_ghc.repo.get_contents.side_effect = [
-            [gitkeep1, subdir],  # root
-            [gitkeep2],  # subdir
-        ]
+        assert server.requests == [("GET", "/repos/owner/test-repo/git/trees/main")]
+        assert len(root_dir.children) == 5
+        assert all(len(d.children) == 5 for d in root_dir.children)
+        sub_dir = root_dir.find_dir("dir4").find_dir("sub3")
+        assert sub_dir.find_file("file2").message_id == 432
 
-        with patch("tgfs.core.repository.impl.metadata.github_repo.Github"):
-            repository = GithubRepoMetadataRepository(
-                GithubRepoConfig(access_token="test", repo="test/repo", commit="main")
+    def test_nested_directories(self, github_server):
+        """Test building complex nested directory structures"""
+        root_dir = load(
+            github_server(
+                "docs/2023/reports/q1_report.111",
+                "docs/2023/reports/q2_report.222",
             )
-            repository._ghc = mock_ghc
+        )
 
-            root_dir = repository._build_directory_structure()
+        reports = root_dir.find_dir("docs").find_dir("2023").find_dir("reports")
+        assert reports.absolute_path == "/docs/2023/reports"
+        assert {f.name for f in reports.files} == {"q1_report", "q2_report"}
+        assert {f.message_id for f in reports.files} == {111, 222}
 
-            # Should have subdirectory but no files
-            assert len(root_dir.files) == 0
-            assert len(root_dir.children) == 1
-            assert root_dir.children[0].name == "subdir"
-            assert len(root_dir.children[0].files) == 0
+    def test_gitkeep_ignored(self, github_server):
+        """Test that .gitkeep files are ignored, but keep their directory"""
+        root_dir = load(github_server(".gitkeep", "test.789", "subdir/.gitkeep"))
 
-    def test_single_content_item_not_in_list(self, mock_ghc):
-        """Test handling when get_contents returns single item instead of list"""
-        single_file = Mock(spec=ContentFile)
-        single_file.name = "single.123"
-        single_file.type = "file"
-        single_file.path = "single.123"
+        assert len(root_dir.files) == 1
+        assert root_dir.files[0].name == "test"
+        assert root_dir.files[0].message_id == 789
+        assert root_dir.find_dir("subdir").files == []
 
-        mock_ghc.repo.get_contents.return_value = single_file  # Single item, not list
+    @patch("tgfs.core.repository.impl.metadata.github_repo.logger")
+    def test_invalid_filename(self, mock_logger, github_server):
+        """Test handling of invalid filename formats"""
+        root_dir = load(github_server("invalid_filename_no_message_id", "test.abc"))
 
-        with patch("tgfs.core.repository.impl.metadata.github_repo.Github"):
-            repository = GithubRepoMetadataRepository(
-                GithubRepoConfig(access_token="test", repo="test/repo", commit="main")
-            )
-            repository._ghc = mock_ghc
+        assert len(root_dir.files) == 0
+        assert mock_logger.warning.call_count == 2
+        warning_call = mock_logger.warning.call_args_list[0][0][0]
+        assert "Invalid name format" in warning_call
+        assert "invalid_filename_no_message_id" in warning_call
+
+    @patch("tgfs.core.repository.impl.metadata.github_repo.logger")
+    def test_duplicated_file_ref(self, mock_logger, github_server):
+        """Test that two references with the same name keep the first one"""
+        root_dir = load(github_server("movie.1", "movie.2"))
+
+        assert [(f.name, f.message_id) for f in root_dir.files] == [("movie", 1)]
+        mock_logger.warning.assert_called_once()
+
+    def test_empty_repository(self, github_server):
+        """Test handling of completely empty repository"""
+        root_dir = load(github_server())
+
+        assert root_dir.name == "root"
+        assert len(root_dir.files) == 0
+        assert len(root_dir.children) == 0
+
+    @patch("tgfs.core.repository.impl.metadata.github_repo.logger")
+    def test_repo_errors(self, mock_logger, github_server):
+        """Test handling of repository access errors"""
+        root_dir = load(github_server("a.1"), commit="missing")
+
+        assert root_dir.name == "root"
+        assert len(root_dir.files) == 0
+        assert len(root_dir.children) == 0
+        mock_logger.error.assert_called_once()
+
+    def test_truncated_listing_falls_back_to_subtrees(self, github_server):
+        """Test that a truncated listing is loaded level by level"""
+        # the whole tree has 1 + 3 + 9 + 9 entries, each top level subtree 3 + 3
+        server = github_server(
+            "top.99",
+            *[
+                f"dir{i}/sub{j}/file{j}.{i * 10 + j}"
+                for i in range(3)
+                for j in range(3)
+            ],
+            truncate_at=8,
+        )
+
+        root_dir = load(server)
+
+        assert root_dir.find_file("top").message_id == 99
+        for i in range(3):
+            for j in range(3):
+                sub_dir = root_dir.find_dir(f"dir{i}").find_dir(f"sub{j}")
+                assert sub_dir.find_file(f"file{j}").message_id == i * 10 + j
+        # the truncated root listing, its first level, one recursive call per subtree
+        assert server.count("GET", "/git/trees/") == 2 + 3
+
+    def test_deeply_truncated_listing(self, github_server):
+        """Test that subtrees which are still too large are split again"""
+        server = github_server(
+            *[f"a/b{i}/c{j}.{i * 10 + j}" for i in range(4) for j in range(4)],
+            truncate_at=6,
+        )
 
-            root_dir = repository._build_directory_structure()
+        root_dir = load(server)
 
-            # Should handle single item correctly
-            assert len(root_dir.files) == 1
-            assert root_dir.files[0].name == "single"
-            assert root_dir.files[0].message_id == 123
+        a = root_dir.find_dir("a")
+        assert len(a.children) == 4
+        assert sum(len(b.files) for b in a.children) == 16
@@ -300,3 +300,83 @@ class TestTGMsgMetadataRepository:
         )
         mock_fc_repo.save.assert_not_called()
         mock_message_api.pin_message.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_on_message_edited_reloads_metadata(
+        self,
+        repository,
+        mock_message_api,
+        mock_fc_repo,
+        sample_pinned_message,
+        sample_metadata,
+    ):
+        repository.metadata = sample_metadata
+        repository._message_id = 123
+        mock_message_api.get_pinned_message.return_value = sample_pinned_message
+
+        changed = TGFSDirectory.root_dir()
+        changed.create_dir("from_elsewhere", None)
+
+        async def mock_content_iterator():
+            yield json.dumps(TGFSMetadata(changed).to_dict()).encode()
+
+        mock_fc_repo.get.return_value = mock_content_iterator()
+
+        root = repository.metadata.dir
+        generation = TGFSDirectory.generation
+
+        assert not await repository.on_message_edited(124)
+        assert await repository.on_message_edited(123)
+        # the contents are replaced in place, holders of the root see them
+        assert repository.metadata.dir is root
+        assert root.find_dir("from_elsewhere").parent is root
+        assert TGFSDirectory.generation != generation
+
+    @pytest.mark.asyncio
+    async def test_on_message_edited_ignores_own_pushes(
+        self,
+        repository,
+        mock_message_api,
+        mock_fc_repo,
+        sample_pinned_message,
+        sample_metadata,
+    ):
+        repository.metadata = sample_metadata
+        repository._message_id = 123
+        mock_message_api.get_pinned_message.return_value = sample_pinned_message
+
+        await repository.push()
+        pushed = mock_fc_repo.update.call_args.args[1]
+
+        async def mock_content_iterator():
+            yield pushed
+
+        mock_fc_repo.get.return_value = mock_content_iterator()
+
+        assert not await repository.on_message_edited(123)
+        assert repository.metadata is sample_metadata
+
+    @pytest.mark.asyncio
+    async def test_on_message_edited_right_after_a_push(
+        self,
+        repository,
+        mock_message_api,
+        mock_fc_repo,
+        sample_pinned_message,
+        sample_metadata,
+    ):
+        repository.metadata = sample_metadata
+        repository._message_id = 123
+        mock_message_api.get_pinned_message.return_value = sample_pinned_message
+        await repository.push()
+
+        changed = TGFSDirectory.root_dir()
+        changed.create_dir("from_elsewhere", None)
+
+        async def mock_content_iterator():
+            yield json.dumps(TGFSMetadata(changed).to_dict()).encode()
+
+        mock_fc_repo.get.return_value = mock_content_iterator()
+
+        assert await repository.on_message_edited(123)
+        assert repository.metadata.dir.find_dir("from_elsewhere")
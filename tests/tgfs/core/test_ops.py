@@ -27,6 +27,7 @@ class TestOps:
     @pytest.fixture
     def ops(self, mock_client, mock_root_directory) -> Ops:
         mock_client.dir_api.root = mock_root_directory
+        mock_client.dir_api.resolve.return_value = mock_root_directory
         return Ops(mock_client)
 
     @pytest.fixture
@@ -59,61 +60,13 @@ class TestOps:
         result = ops.cd("/")
         assert result == mock_root_directory
 
-    def test_cd_single_directory(self, ops, mock_root_directory, mocker):
+    def test_cd_resolves_with_dir_api(self, ops, mocker):
         mock_subdir = mocker.Mock(spec=TGFSDirectory)
-        mock_root_directory.find_dir.return_value = mock_subdir
-
-        result = ops.cd("/subdir")
-
-        mock_root_directory.find_dir.assert_called_once_with("subdir")
-        assert result == mock_subdir
-
-    def test_cd_nested_directories(self, ops, mock_root_directory, mocker):
-        mock_subdir1 = mocker.Mock(spec=TGFSDirectory)
-        mock_subdir2 = mocker.Mock(spec=TGFSDirectory)
-
-        mock_root_directory.find_dir.return_value = mock_subdir1
-        mock_subdir1.find_dir.return_value = mock_subdir2
+        ops._client.dir_api.resolve.return_value = mock_subdir
 
         result = ops.cd("/dir1/dir2")
 
-        mock_root_directory.find_dir.assert_called_with("dir1")
-        mock_subdir1.find_dir.assert_called_with("dir2")
-        assert result == mock_subdir2
-
-    def test_cd_with_parent_directory(self, ops, mock_root_directory, mocker):
-        mock_subdir1 = mocker.Mock(spec=TGFSDirectory)
-        mock_subdir2 = mocker.Mock(spec=TGFSDirectory)
-        mock_parent = mocker.Mock(spec=TGFSDirectory)
-
-        # Set up proper parent chain
-        mock_subdir2.parent = mock_parent
-        mock_subdir1.parent = mock_root_directory
-
-        # Configure find_dir to return the correct subdirectories in sequence
-        def find_dir_side_effect(name):
-            if name == "dir1":
-                return mock_subdir1
-            elif name == "dir2":
-                return mock_subdir2
-            else:
-                raise FileOrDirectoryDoesNotExist(name)
-
-        mock_root_directory.find_dir.side_effect = find_dir_side_effect
-        mock_subdir1.find_dir.side_effect = find_dir_side_effect
-
-        result = ops.cd("/dir1/dir2/..")
-
-        # Should navigate to dir1/dir2 then go back to parent
-        assert result == mock_parent
-
-    def test_cd_with_current_directory(self, ops, mock_root_directory, mocker):
-        mock_subdir = mocker.Mock(spec=TGFSDirectory)
-        mock_root_directory.find_dir.return_value = mock_subdir
-
-        result = ops.cd("/subdir/.")
-
-        mock_root_directory.find_dir.assert_called_once_with("subdir")
+        ops._client.dir_api.resolve.assert_called_once_with("/dir1/dir2")
         assert result == mock_subdir
 
     def test_stat_file(self, ops, mock_root_directory, mocker):
@@ -297,31 +250,44 @@ class TestOps:
     async def test_mv_dir(self, ops, mocker):
         mock_source_dir = mocker.Mock(spec=TGFSDirectory)
         mock_dest_dir = mocker.Mock(spec=TGFSDirectory)
+        mock_dir = mocker.Mock(spec=TGFSDirectory)
+        mock_source_dir.find_dir.return_value = mock_dir
 
+        ops._client.dir_api.move = mocker.AsyncMock(return_value=mock_dir)
         ops._client.dir_api.rm_dangerously = mocker.AsyncMock()
 
-        mocker.patch.object(
-            ops, "cp_dir", return_value=(mock_source_dir, mock_dest_dir)
-        )
-        result = await ops.mv_dir("/src/dir", "/dest/dir")
+        mock_cd = mocker.Mock(side_effect=[mock_source_dir, mock_dest_dir])
+        mocker.patch.object(ops, "cd", mock_cd)
+        result = await ops.mv_dir("/src/dir", "/dest/renamed")
 
-        ops._client.dir_api.rm_dangerously.assert_called_once_with(mock_source_dir)
-        assert result == mock_dest_dir
+        mock_source_dir.find_dir.assert_called_once_with("dir")
+        ops._client.dir_api.move.assert_called_once_with(
+            mock_dir, mock_dest_dir, "renamed"
+        )
+        # moved in place, not copied and deleted
+        ops._client.dir_api.rm_dangerously.assert_not_called()
+        assert result == mock_dir
 
     @pytest.mark.asyncio
     async def test_mv_file(self, ops, mocker):
-        mock_source_file = mocker.Mock(spec=TGFSFileRef)
-        mock_dest_file = mocker.Mock(spec=TGFSFileRef)
+        mock_source_dir = mocker.Mock(spec=TGFSDirectory)
+        mock_dest_dir = mocker.Mock(spec=TGFSDirectory)
+        mock_file = mocker.Mock(spec=TGFSFileRef)
+        mock_source_dir.find_file.return_value = mock_file
 
+        ops._client.file_api.move = mocker.AsyncMock(return_value=mock_file)
         ops._client.file_api.rm = mocker.AsyncMock()
 
-        mocker.patch.object(
-            ops, "cp_file", return_value=(mock_source_file, mock_dest_file)
-        )
+        mock_cd = mocker.Mock(side_effect=[mock_source_dir, mock_dest_dir])
+        mocker.patch.object(ops, "cd", mock_cd)
         result = await ops.mv_file("/src/file.txt", "/dest/file.txt")
 
-        ops._client.file_api.rm.assert_called_once_with(mock_source_file)
-        assert result == mock_dest_file
+        mock_source_dir.find_file.assert_called_once_with("file.txt")
+        ops._client.file_api.move.assert_called_once_with(
+            mock_file, mock_dest_dir, "file.txt"
+        )
+        ops._client.file_api.rm.assert_not_called()
+        assert result == mock_file
 
     @pytest.mark.asyncio
     async def test_rm_dir_recursive(self, ops, mocker):
@@ -108,6 +108,7 @@ class TestTelethonAPI:
         req = GetMessagesReq(chat=mock_chat, message_ids=(12345,))
 
         mock_cache = mocker.Mock()
+        mock_cache.load = mocker.AsyncMock()
         mock_cache.find_nonexistent.return_value = [12345]
         mock_cache.__setitem__ = mocker.Mock()
         mock_cache.gets.return_value = []
@@ -124,6 +125,27 @@ class TestTelethonAPI:
         )
         assert isinstance(result, list)
 
+    @pytest.mark.asyncio
+    async def test_get_messages_marks_deleted_messages(
+        self, telethon_api, mock_chat, mock_message, mocker
+    ):
+        mock_message.id = 1
+        telethon_api._client.get_messages.return_value = TotalList([mock_message, None])
+        mock_cache = mocker.MagicMock()
+        mock_cache.load = mocker.AsyncMock()
+        mock_cache.find_nonexistent.return_value = [1, 2]
+        mock_cache.gets.return_value = []
+        mocker.patch("tgfs.telegram.impl.telethon.channel_cache").return_value.id = (
+            mock_cache
+        )
+
+        await telethon_api.get_messages(
+            GetMessagesReq(chat=mock_chat, message_ids=(1, 2))
+        )
+
+        mock_cache.__setitem__.assert_called_once()
+        mock_cache.mark_deleted.assert_called_once_with(2)
+
     @pytest.mark.asyncio
     async def test_get_messages_with_cached_messages(
         self, telethon_api, mock_chat, mocker
@@ -131,6 +153,7 @@ class TestTelethonAPI:
         req = GetMessagesReq(chat=mock_chat, message_ids=(12345,))
 
         mock_cache = mocker.Mock()
+        mock_cache.load = mocker.AsyncMock()
         mock_cache.find_nonexistent.return_value = []  # All messages cached
         mock_cache.gets.return_value = [
             MessageResp(message_id=12345, text="cached", document=None)
@@ -236,7 +259,7 @@ class TestTelethonAPI:
         telethon_api._client.edit_message.assert_called_once_with(
             entity=tlt.PeerChannel(mock_chat), message=12345, text="Updated text"
         )
-        mock_cache.__setitem__.assert_called_once_with(12345, None)
+        mock_cache_instance.invalidate.assert_called_once_with(12345)
         assert result.message_id == 88888
 
     @pytest.mark.asyncio
@@ -262,7 +285,7 @@ class TestTelethonAPI:
         assert call_args[1]["entity"] == tlt.PeerChannel(mock_chat)
         assert call_args[1]["message"] == 12345
         assert isinstance(call_args[1]["file"], tlt.InputFile)
-        mock_cache.__setitem__.assert_called_once_with(12345, None)
+        mock_cache_instance.invalidate.assert_called_once_with(12345)
         assert result.message_id == 77777
 
     @pytest.mark.asyncio
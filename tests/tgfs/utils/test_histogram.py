@@ -0,0 +1,13 @@
+from tgfs.utils.histogram import Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((10, 1, 5))
+    for value in (0.5, 1, 3, 7, 50):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {
+        "count": 5,
+        "sum": 61.5,
+        "buckets": {"1": 2, "5": 3, "10": 4, "+Inf": 5},
+    }
@@ -1,4 +1,19 @@
-from tgfs.utils.message_cache import MessageCache
+import threading
+
+import pytest
+
+from tgfs.config import MessageCacheConfig
+from tgfs.reqres import Document, MessageResp
+from tgfs.utils import message_cache
+from tgfs.utils.message_cache import (
+    EntryState,
+    MessageCache,
+    PersistentMessageCache,
+    channel_cache,
+    configure_message_cache,
+    global_message_cache,
+)
+from tgfs.utils.message_store import MessageStore
 
 
 class TestMessageCache:
@@ -32,6 +47,15 @@ class TestMessageCache:
         assert "exists" in cache
         assert "not_exists" not in cache
 
+    def test_invalidate(self):
+        cache = MessageCache[str, int]()
+        cache["exists"] = 1
+
+        cache.invalidate("exists")
+        cache.invalidate("not_exists")
+
+        assert "exists" not in cache
+
     def test_gets_multiple_keys(self):
         cache = MessageCache[str, int]()
         cache["a"] = 1
@@ -78,3 +102,234 @@ class TestMessageCache:
 
         for i in range(10):
             assert cache[i] == f"value_{i}"
+
+    def test_max_bytes(self):
+        cache = MessageCache[int, str](max_bytes=10, sizeof=len)
+        cache[1] = "aaaa"
+        cache[2] = "bbbb"
+        cache[3] = "cccc"
+
+        assert 1 not in cache
+        assert cache.size_bytes == 8
+        assert cache.evictions == 1
+
+        cache[2] = "bb"
+        cache.invalidate(3)
+        assert cache.size_bytes == 2
+
+    def test_max_entries_eviction_is_counted(self):
+        cache = MessageCache[int, str](max_entries=2, sizeof=len)
+        for i in range(3):
+            cache[i] = "x"
+
+        assert cache.stats() == {
+            "entries": 2,
+            "bytes": 2,
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "evictions": 1,
+        }
+
+    def test_states(self):
+        cache = MessageCache[int, str]()
+        cache[1] = "a"
+        cache.mark_deleted(2)
+
+        assert cache.state(1) == EntryState.PRESENT
+        assert cache.state(2) == EntryState.DELETED
+        assert cache.state(3) == EntryState.MISSING
+        assert cache.gets([1, 2, 3]) == ["a", None, None]
+        # deleted messages are not fetched again
+        assert cache.find_nonexistent([1, 2, 3]) == [3]
+        assert (cache.hits, cache.negative_hits, cache.misses) == (1, 1, 1)
+
+        cache.invalidate(1)
+        assert cache.state(1) == EntryState.MISSING
+
+    def test_deleted_entries_expire(self, mocker):
+        monotonic = mocker.patch("tgfs.utils.message_cache.time.monotonic")
+        monotonic.return_value = 100
+        cache = MessageCache[int, str](deleted_ttl=10)
+        cache.mark_deleted(1)
+
+        monotonic.return_value = 109
+        assert cache.find_nonexistent([1]) == []
+        monotonic.return_value = 110
+        assert cache.find_nonexistent([1]) == [1]
+
+    def test_getitem_missing(self):
+        cache = MessageCache[int, str]()
+        cache.mark_deleted(1)
+
+        with pytest.raises(KeyError):
+            cache[1]
+
+    def test_hits_and_misses(self):
+        cache = MessageCache[str, int]()
+        cache["a"] = 1
+
+        cache.gets(["a", "b", "a"])
+        assert (cache.hits, cache.misses) == (2, 1)
+
+
+class TestPersistentMessageCache:
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = MessageStore(
+            str(tmp_path / "cache.sqlite"), max_bytes=1024 * 1024, max_age=60
+        )
+        yield store
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_text_messages_survive_a_restart(self, store):
+        cache = PersistentMessageCache(store.channel(1))
+        cache[1] = MessageResp(1, "descriptor", None)
+        cache[2] = MessageResp(2, "", Document(10, 1, 1, b"ref", None))
+
+        restarted = PersistentMessageCache(store.channel(1))
+        assert restarted.stats()["entries"] == 0
+        await restarted.load([])
+        assert restarted.stats()["entries"] == 1
+        assert restarted.get(1) == MessageResp(1, "descriptor", None)
+        # file references expire, documents are not kept
+        assert restarted.get(2) is None
+        # channels do not share messages
+        other = PersistentMessageCache(store.channel(2))
+        await other.load([1])
+        assert other.get(1) is None
+
+    @pytest.mark.asyncio
+    async def test_misses_are_looked_up_in_the_store(self, store):
+        PersistentMessageCache(store.channel(1))[1] = MessageResp(1, "a", None)
+        cache = PersistentMessageCache(store.channel(1), max_entries=1)
+        await cache.load([])
+        cache[3] = MessageResp(3, "c", None)
+
+        await cache.load([1, 3])
+        assert cache.get(1) == MessageResp(1, "a", None)
+        assert cache.store_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_the_store(self, store):
+        cache = PersistentMessageCache(store.channel(1))
+        cache[1] = MessageResp(1, "a", None)
+        cache[2] = MessageResp(2, "b", None)
+
+        cache.mark_deleted(1)
+        cache.invalidate(2)
+
+        restarted = PersistentMessageCache(store.channel(1))
+        await restarted.load([1, 2])
+        assert restarted.gets([1, 2]) == [None, None]
+
+    @pytest.mark.asyncio
+    async def test_invalidated_while_loading(self, store, mocker):
+        PersistentMessageCache(store.channel(1))[1] = MessageResp(1, "a", None)
+        cache = PersistentMessageCache(store.channel(1))
+        recent = store.recent
+
+        async def invalidate_during_read(*args):
+            res = await recent(*args)
+            cache.invalidate(1)
+            return res
+
+        mocker.patch.object(store, "recent", side_effect=invalidate_during_read)
+        await cache.load([1])
+
+        assert cache.get(1) is None
+
+    @pytest.mark.asyncio
+    async def test_old_messages_are_not_trusted(self, store, mocker):
+        now = mocker.patch("tgfs.utils.message_store.time.time", return_value=1000.0)
+        PersistentMessageCache(store.channel(1))[1] = MessageResp(1, "a", None)
+
+        now.return_value = 1061.0
+        cache = PersistentMessageCache(store.channel(1))
+        await cache.load([1])
+
+        assert cache.get(1) is None
+
+    @pytest.mark.asyncio
+    async def test_store_is_bounded_by_size(self, tmp_path, mocker):
+        mocker.patch("tgfs.utils.message_store.PRUNE_EVERY", 1)
+        store = MessageStore(str(tmp_path / "cache.sqlite"), max_bytes=25, max_age=60)
+        cache = PersistentMessageCache(store.channel(1))
+        for i in range(5):
+            cache[i] = MessageResp(i, "x" * 10, None)
+
+        assert sorted(await store.get_many(1, range(5))) == [3, 4]
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_database_is_used_off_the_event_loop(self, store):
+        cache = PersistentMessageCache(store.channel(1))
+        threads = []
+        get_many = store._get_many
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return get_many(*args)
+
+        store._get_many = record_thread
+        await cache.load([1])
+
+        assert threads == ["message-store_0"]
+
+
+class TestChannelMessageCache:
+    def test_invalidate(self):
+        cache = channel_cache(7)
+        cache.id[1] = MessageResp(1, "a", None)
+        cache.search["a"] = (MessageResp(1, "a", None),)
+        cache.search["b"] = ()
+
+        cache.invalidate(1)
+
+        assert cache.id.state(1) == EntryState.MISSING
+        assert "a" not in cache.search and "b" not in cache.search
+        global_message_cache.clear()
+
+
+class TestConfigureMessageCache:
+    @pytest.fixture(autouse=True)
+    def reset(self):
+        yield
+        if message_cache._store is not None:
+            message_cache._store.close()
+        message_cache._config = None
+        message_cache._store = None
+        global_message_cache.clear()
+
+    def test_configured_caches(self, tmp_path):
+        configure_message_cache(
+            MessageCacheConfig(
+                max_entries=10,
+                max_size_mb=1,
+                persistent=True,
+                path=str(tmp_path / "cache.sqlite"),
+                store_max_size_mb=1,
+                store_max_age=60,
+                deleted_ttl=60,
+            )
+        )
+
+        cache = channel_cache(1)
+        assert isinstance(cache.id, PersistentMessageCache)
+        assert cache.fd._lru.get_size() == 10
+
+    def test_not_persistent(self, tmp_path):
+        configure_message_cache(
+            MessageCacheConfig(
+                max_entries=10,
+                max_size_mb=1,
+                persistent=False,
+                path="",
+                store_max_size_mb=1,
+                store_max_age=60,
+                deleted_ttl=60,
+            )
+        )
+
+        assert not isinstance(channel_cache(1).id, PersistentMessageCache)
@@ -0,0 +1,87 @@
+from tgfs.utils import path_trie
+from tgfs.utils.path_trie import PathTrie
+
+
+def node_count(trie: PathTrie) -> int:
+    return sum(1 for _ in trie._walk(trie._root))
+
+
+def test_lookups_do_not_create_nodes():
+    trie = PathTrie[str]()
+    trie.set("/a/b", "b")
+    nodes = node_count(trie)
+
+    for i in range(100):
+        assert trie.get(f"/probe-{i}/x/y") is None
+        assert trie.get(f"/a/b/probe-{i}") is None
+        trie.discard(f"/probe-{i}")
+        trie.reset(f"/probe-{i}")
+
+    assert node_count(trie) == nodes
+    assert trie.stats()["misses"] == 200
+
+
+def test_least_recently_used_is_evicted():
+    trie = PathTrie[str](max_entries=2)
+    trie.set("/a", "a")
+    trie.set("/b", "b")
+    trie.get("/a")
+    trie.set("/c/d", "d")
+
+    assert trie.get("/a") == "a"
+    assert trie.get("/b") is None
+    assert trie.get("/c/d") == "d"
+    assert len(trie) == 2
+    assert trie.stats()["evictions"] == 1
+
+
+def test_evicted_paths_are_pruned():
+    trie = PathTrie[str](max_entries=1)
+    trie.set("/a/b/c", "c")
+    trie.set("/x", "x")
+
+    # root, "" and "x"
+    assert node_count(trie) == 3
+
+
+def test_reset_drops_the_subtree():
+    trie = PathTrie[str]()
+    for path in ["/", "/a", "/a/b", "/a/b/c", "/ab"]:
+        trie.set(path, path)
+
+    trie.reset("/a")
+
+    assert [trie.get(p) for p in ["/", "/a", "/a/b", "/a/b/c", "/ab"]] == [
+        "/",
+        None,
+        None,
+        None,
+        "/ab",
+    ]
+    assert len(trie) == 2
+
+
+def test_discard_keeps_the_subtree():
+    trie = PathTrie[str]()
+    trie.set("/a", "a")
+    trie.set("/a/b", "b")
+
+    trie.discard("/a")
+
+    assert trie.get("/a") is None
+    assert trie.get("/a/b") == "b"
+    assert len(trie) == 1
+
+
+def test_values_expire(mocker):
+    now = mocker.patch.object(path_trie.time, "monotonic", return_value=100.0)
+    trie = PathTrie[str](ttl=10)
+    trie.set("/a", "a")
+
+    now.return_value = 109.0
+    assert trie.get("/a") == "a"
+
+    now.return_value = 110.0
+    assert trie.get("/a") is None
+    assert len(trie) == 0
+    assert node_count(trie) == 1
@@ -98,7 +98,7 @@ def create_app(clients: Clients, config: Config) -> FastAPI:
     manager_app = cors(create_manager_app(clients, config))
     app.mount("/api", manager_app)
 
-    webdav_app = cors(create_webdav_app(clients, "/webdav"))
+    webdav_app = cors(create_webdav_app(clients, "/webdav", config.tgfs.propfind))
     app.mount("/webdav", webdav_app)
 
     return app
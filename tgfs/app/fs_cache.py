@@ -1,47 +1,80 @@
-from collections import defaultdict
-from typing import Dict, List, Optional
+from typing import Callable, Dict
 
 from asgidav.member import Member
+from tgfs.core.model import TGFSDirectory, TGFSFileRef
+from tgfs.core.model.directory import TGFSNode
+from tgfs.utils.path_trie import PathTrie
 
-MaybeMember = Optional[Member]
 
+class FSCache(PathTrie[Member]):
+    """WebDAV members by path, relative to the client they belong to"""
 
-class FSCache:
-    def __init__(self, value: MaybeMember = None):
-        self._cache: Dict[str, FSCache] = defaultdict(FSCache)
-        self._value: MaybeMember = value
 
-    @staticmethod
-    def split_path(path: str) -> List[str]:
-        path = path.strip("/")
-        if path == "":
-            return [""]
-        return ["", *path.split("/")]
+def _root_of(node: TGFSNode) -> TGFSDirectory:
+    d = node.location if isinstance(node, TGFSFileRef) else node
+    while d.parent is not None:
+        d = d.parent
+    return d
 
-    def __get(self, parts: List[str]) -> "FSCache":
-        if not parts:
-            return self
-        return self._cache[parts[0]].__get(parts[1:])
 
-    def get(self, parts: str) -> MaybeMember:
-        return self.__get(self.split_path(parts))._value
+def _path_of(node: TGFSNode) -> str:
+    if isinstance(node, TGFSFileRef):
+        return f"{node.location.absolute_path}/{node.name}"
+    return node.absolute_path
 
-    def __set(self, path: List[str], value: MaybeMember):
-        if len(path) == 1:
-            self._cache[path[0]] = FSCache(value)
-        else:
-            self._cache[path[0]].__set(path[1:], value)
 
-    def set(self, path: str, value: MaybeMember):
-        self.__set(self.split_path(path), value)
+def _parent_of(node: TGFSNode) -> TGFSDirectory:
+    if isinstance(node, TGFSFileRef):
+        return node.location
+    return node.parent or node
 
-    def reset(self, path: str):
-        parts = self.split_path(path)
-        self.__set(parts, None)
 
-    def reset_parent(self, path: str):
-        parts = self.split_path(path)
-        self.__set(parts[:-1], None)
+class FSCacheInvalidator:
+    """
+    Follows the changes of the directory tree of a client and drops the members
+    they make stale: the changed node with everything below it, and the directory
+    listing it appeared in or disappeared from.
+    """
+
+    def __init__(self, cache: FSCache, root: Callable[[], TGFSDirectory]):
+        self._cache = cache
+        self._root = root
+        TGFSDirectory.observers.add(self)
+
+    def _ours(self, node: TGFSNode) -> bool:
+        return _root_of(node) is self._root()
+
+    def _drop(self, path: str, parent: TGFSDirectory) -> None:
+        self._cache.reset(path)
+        self._cache.discard(parent.absolute_path)
+
+    # TreeObserver
+
+    def added(self, node: TGFSNode) -> None:
+        if self._ours(node):
+            self._drop(_path_of(node), _parent_of(node))
+
+    def removed(self, node: TGFSNode) -> None:
+        if self._ours(node):
+            self._drop(_path_of(node), _parent_of(node))
+
+    def moved(self, node: TGFSNode, old_location: TGFSDirectory, old_name: str) -> None:
+        if self._ours(node):
+            self._drop(f"{old_location.absolute_path}/{old_name}", old_location)
+            self._drop(_path_of(node), _parent_of(node))
+
+    def repointed(self, fr: TGFSFileRef, old_message_id: int) -> None:
+        if self._ours(fr):
+            # the member holds the descriptor it read from the old message
+            self._cache.reset(_path_of(fr))
+
+    def loaded(self, directory: TGFSDirectory) -> None:
+        pass
+
+    def reset(self) -> None:
+        self._cache.clear()
 
 
 gfc: Dict[str, FSCache] = {}
+# keep the invalidators alive, the tree only holds weak references to observers
+gfi: Dict[str, FSCacheInvalidator] = {}
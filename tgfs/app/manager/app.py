@@ -9,9 +9,12 @@ from tgfs.app.fs_cache import gfc
 from tgfs.app.utils import split_global_path
 from tgfs.config import Config
 from tgfs.core import Clients
+from tgfs.core.api.search import SearchMode
 from tgfs.core.ops import Ops
+from tgfs.errors import FileOrDirectoryDoesNotExist
 from tgfs.reqres import MessageRespWithDocument
 from tgfs.tasks import task_store
+from tgfs.utils.message_cache import channel_cache
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +53,69 @@ def create_manager_app(clients: Clients, config: Config) -> FastAPI:
             raise HTTPException(status_code=404, detail="Task not found")
         return {"message": "Task deleted successfully"}
 
+    @app.get("/search")
+    async def search(
+        q: str = Query(..., min_length=1, description="Name or pattern to look for"),
+        mode: SearchMode = Query(SearchMode.SUBSTRING),
+        client: Optional[str] = Query(
+            None, description="Only search the files managed by this client"
+        ),
+        offset: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1, le=1000),
+    ):
+        """Find files and directories by name, without crawling the tree over WebDAV"""
+        if client is not None and client not in clients:
+            raise HTTPException(status_code=404, detail=f"Unknown client {client}")
+
+        hits = [
+            {
+                "path": f"/{name}{hit.path}",
+                "type": "directory" if hit.is_dir else "file",
+            }
+            for name, c in clients.items()
+            if client is None or name == client
+            for hit in c.dir_api.search(q, mode)
+        ]
+        return {"total": len(hits), "items": hits[offset : offset + limit]}
+
+    @app.get("/stats")
+    async def get_stats(
+        path: str = Query(..., description="Directory path, starting with the client")
+    ):
+        """
+        Total size, file count and directory count of everything under a directory.
+        The size leaves out the files whose size is not known yet, their count is
+        returned alongside.
+        """
+        client_name, sub_path = split_global_path(path.rstrip("/") or "/")
+        if client_name not in ops:
+            raise HTTPException(status_code=404, detail=f"Unknown client {client_name}")
+        try:
+            d = ops[client_name].cd(f"/{sub_path}")
+        except FileOrDirectoryDoesNotExist:
+            raise HTTPException(status_code=404, detail=f"{path} does not exist")
+        return {
+            "size": d.total_size,
+            "files": d.file_count,
+            "directories": d.dir_count,
+            "unsized_files": d.unsized_count,
+        }
+
+    @app.get("/metrics")
+    async def get_metrics():
+        """Batching and caching of the message and WebDAV lookups of each client"""
+        return {
+            name: {
+                "message_batch_sizes": c.message_api.batch_sizes.snapshot(),
+                "message_wait_seconds": c.message_api.wait_times.snapshot(),
+                "message_cache": channel_cache(
+                    c.message_api.private_file_channel
+                ).stats(),
+                "webdav_cache": gfc[name].stats() if name in gfc else None,
+            }
+            for name, c in clients.items()
+        }
+
     async def get_message(channel_id: int, message_id: int) -> MessageRespWithDocument:
         if str(channel_id) not in config.telegram.private_file_channel:
             raise HTTPException(
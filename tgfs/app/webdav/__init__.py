@@ -1,40 +1,75 @@
-from typing import Optional
+from typing import Callable, List, Optional
 
 from asgidav.app import METHODS, create_app
 from asgidav.member import Member
-from tgfs.app.fs_cache import FSCache, gfc
+from asgidav.propfind_cache import PropfindCache
+from tgfs.app.fs_cache import FSCache, FSCacheInvalidator, gfc, gfi
 from tgfs.app.utils import split_global_path
-from tgfs.core import Clients
+from tgfs.config import PropfindConfig
+from tgfs.core import Client, Clients
+from tgfs.core.model import TGFSDirectory
 
 from .folder import Folder, RootFolder
 
 
+def _root_folder(client: Client) -> Folder:
+    cache = gfc[client.name]
+    if not isinstance(folder := cache.get("/"), Folder):
+        folder = Folder("/", client)
+        cache.set("/", folder)
+    return folder
+
+
 async def _get_member(path: str, clients: Clients) -> Optional[Member]:
     if path == "" or path == "/":
         folders = {
-            client_name: Folder("/", clients[client_name])
-            for client_name in clients.keys()
+            client_name: _root_folder(client) for client_name, client in clients.items()
         }
         return RootFolder(folders)
 
     client_name, sub_path = split_global_path(path)
 
-    root = Folder("/", clients[client_name])
+    root = _root_folder(clients[client_name])
 
+    # most requests are for paths which were resolved before
+    if res := gfc[client_name].get(sub_path):
+        return res
     if res := await root.member(sub_path.lstrip("/")):
         return res
     return None
 
 
-def create_webdav_app(clients: Clients, base_path: str = ""):
+def _root_of(client: Client) -> Callable[[], TGFSDirectory]:
+    return lambda: client.dir_api.root
+
+
+def _reset_paths(cache: FSCache) -> Callable[[List[str]], None]:
+    def reset(paths: List[str]) -> None:
+        for path in paths:
+            cache.reset(path)
+
+    return reset
+
+
+def create_webdav_app(
+    clients: Clients, base_path: str = "", propfind: Optional[PropfindConfig] = None
+):
+    if propfind is None:
+        propfind = PropfindConfig.from_dict({})
+
     for name, client in clients.items():
         cache = FSCache()
-        cache.set("/", Folder("/", client))
         gfc[name] = cache
+        gfi[name] = FSCacheInvalidator(cache, _root_of(client))
+        if client.watcher is not None:
+            client.watcher.add_listener(_reset_paths(cache))
 
     return create_app(
         get_member=lambda path: _get_member(path, clients),
         base_path=base_path,
+        propfind_cache=PropfindCache(),
+        allow_infinite_depth=propfind.allow_infinite_depth,
+        max_infinite_depth_responses=propfind.max_infinite_depth_responses,
     )
 
 
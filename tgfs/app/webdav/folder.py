@@ -1,4 +1,5 @@
-from typing import Mapping, Tuple
+import secrets
+from typing import Iterable, List, Mapping, Optional, Tuple, Type, TypeVar, Union
 
 from asgidav.folder import Folder as _Folder
 from asgidav.member import Member
@@ -8,6 +9,11 @@ from tgfs.utils.time import FIRST_DAY_OF_EPOCH, ts
 
 from .resource import Resource
 
+M = TypeVar("M", bound=Union["Folder", Resource])
+
+# subtree generations start over with the process, the tags made of them must not
+_ETAG_PREFIX = secrets.token_hex(4)
+
 
 class Folder(_Folder):
     def __init__(self, path: str, client: Client):
@@ -27,6 +33,13 @@ class Folder(_Folder):
     async def display_name(self) -> str:
         return self.__folder.name
 
+    def generation(self) -> int:
+        return self.__folder.subtree_generation
+
+    async def etag(self) -> Optional[str]:
+        # weak, a folder has no content of its own to compare byte by byte
+        return f'W/"{_ETAG_PREFIX}-{self.generation()}"'
+
     async def member_names(self):
         return self.__sub_folders.union(self.__sub_files)
 
@@ -36,17 +49,37 @@ class Folder(_Folder):
             return self
 
         if path_parts[0] in self.__sub_files:
-            return Resource(self._sub_path(path_parts[0]), self.__client)
+            return self.__cached(Resource, self._sub_path(path_parts[0]))
 
         if path_parts[0] in self.__sub_folders:
+            folder = self.__cached(Folder, f"{self._sub_path(path_parts[0])}/")
             if len(path_parts) > 1:
-                return await Folder(
-                    f"{self._sub_path(path_parts[0])}/", self.__client
-                ).member(path_parts[1])
-            return Folder(f"{self._sub_path(path_parts[0])}/", self.__client)
+                return await folder.member(path_parts[1])
+            return folder
 
         return None
 
+    async def members(self, names: Iterable[str]) -> List[Optional[Member]]:
+        members = [await self.member(name) for name in names]
+        # listing a folder reads the descriptors of all of its files, load them in
+        # two round trips instead of two per file
+        if to_load := [m for m in members if isinstance(m, Resource) and not m.has_fd]:
+            generations = [r.generation() for r in to_load]
+            fds = await self.__client.file_api.descs([r.file_ref for r in to_load])
+            for resource, fd, generation in zip(to_load, fds, generations):
+                resource.preload(fd, generation)
+        return members
+
+    def __cached(self, cls: Type[M], path: str) -> M:
+        """
+        Members are reused across requests, together with whatever they loaded. The
+        cache is invalidated along with the directory tree.
+        """
+        if not isinstance(member := self.fs_cache.get(path), cls):
+            member = cls(path, self.__client)
+            self.fs_cache.set(path, member)
+        return member
+
     def _sub_path(self, name: str):
         return f"{self.__relative_path}{name}"
 
@@ -72,6 +105,12 @@ class Folder(_Folder):
         self.fs_cache.reset(self.__relative_path)
         return await self.__ops.mkdir(self._sub_path(name), False)
 
+    async def quota_used_bytes(self) -> Optional[int]:
+        # not reported until the size of every file below is known
+        if self.__folder.unsized_count:
+            return None
+        return self.__folder.total_size
+
     async def creation_date(self) -> int:
         return self.__folder.created_at_timestamp
 
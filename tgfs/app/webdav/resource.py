@@ -23,14 +23,45 @@ class Resource(_Resource):
             raise TechnicalError(f"Resource {path} does not exist")
 
         self.__fr: TGFSFileRef = fr
+        # the descriptor and the generation it was loaded at, every new version of
+        # the file moves the generation on
         self.__fd_value: Optional[TGFSFileDesc] = None
+        self.__fd_generation = 0
         self.__lock = asyncio.Lock()
 
+    @property
+    def file_ref(self) -> TGFSFileRef:
+        return self.__fr
+
+    @property
+    def has_fd(self) -> bool:
+        return self.__fd_value is not None and self.__fd_generation == self.generation()
+
+    def preload(self, fd: TGFSFileDesc, generation: int) -> None:
+        """
+        Take the descriptor loaded together with the ones of other resources, which
+        started loading at the given generation
+        """
+        if not self.has_fd:
+            self.__fd_value, self.__fd_generation = fd, generation
+
     async def __fd(self) -> TGFSFileDesc:
         async with self.__lock:
-            if self.__fd_value is None:
-                self.__fd_value = await self.__ops.desc(self.__relative_path)
-        return self.__fd_value
+            generation = self.generation()
+            if (fd := self.__fd_value) is None or self.__fd_generation != generation:
+                fd = self.__fd_value = await self.__ops.desc(self.__relative_path)
+                self.__fd_generation = generation
+            return fd
+
+    def generation(self) -> int:
+        # bumped with every new version of the file as well
+        return self.__fr.location.subtree_generation
+
+    async def etag(self) -> Optional[str]:
+        # every upload is a new version with a new id, the id names the content
+        if not (version_id := (await self.__fd()).latest_version_id):
+            return None
+        return f'"{version_id}"'
 
     async def creation_date(self) -> int:
         return int((await self.__fd()).created_at.timestamp())
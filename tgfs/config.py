@@ -123,6 +123,65 @@ class MetadataConfig:
         )
 
 
+@dataclass
+class IntegrityConfig:
+    enabled: bool
+    interval: int  # seconds between two scans of the namespace
+    requests_per_second: float
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        return cls(
+            enabled=data.get("enabled", True),
+            interval=data.get("interval", 24 * 60 * 60),
+            requests_per_second=data.get("requests_per_second", 1),
+        )
+
+
+@dataclass
+class MessageCacheConfig:
+    max_entries: int  # per channel
+    max_size_mb: int  # per channel
+    # keep the text messages (file descriptors) in a local database across restarts
+    persistent: bool
+    path: str
+    store_max_size_mb: int
+    # seconds a stored message is trusted, edits made while TGFS is not running are
+    # only picked up once it expired
+    store_max_age: int
+    # seconds to remember that a message was deleted
+    deleted_ttl: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        return cls(
+            max_entries=data.get("max_entries", 100_000),
+            max_size_mb=data.get("max_size_mb", 64),
+            persistent=data.get("persistent", False),
+            path=expand_path(data.get("path", "message_cache.sqlite")),
+            store_max_size_mb=data.get("store_max_size_mb", 256),
+            store_max_age=data.get("store_max_age", 24 * 60 * 60),
+            deleted_ttl=data.get("deleted_ttl", 600),
+        )
+
+
+@dataclass
+class PropfindConfig:
+    # Depth: infinity, which is also what a PROPFIND without a Depth header asks for
+    allow_infinite_depth: bool
+    # responses of a PROPFIND of infinite depth, a bigger listing is cut off
+    max_infinite_depth_responses: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        return cls(
+            allow_infinite_depth=data.get("allow_infinite_depth", True),
+            max_infinite_depth_responses=data.get(
+                "max_infinite_depth_responses", 10_000
+            ),
+        )
+
+
 @dataclass
 class ServerConfig:
     host: str
@@ -140,6 +199,9 @@ class TGFSConfig:
     jwt: JWTConfig
     metadata: Dict[str, MetadataConfig]
     server: ServerConfig
+    integrity: IntegrityConfig
+    message_cache: MessageCacheConfig
+    propfind: PropfindConfig
 
     @classmethod
     def from_dict(cls, data: Dict) -> Self:
@@ -160,6 +222,9 @@ class TGFSConfig:
                 k: MetadataConfig.from_dict(v) for k, v in metadata_config.items()
             },
             server=ServerConfig.from_dict(data["server"]),
+            integrity=IntegrityConfig.from_dict(data.get("integrity") or {}),
+            message_cache=MessageCacheConfig.from_dict(data.get("message_cache") or {}),
+            propfind=PropfindConfig.from_dict(data.get("propfind") or {}),
         )
 
 
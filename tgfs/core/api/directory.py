@@ -1,19 +1,81 @@
 from typing import List, Optional
 
+from lru import LRU  # type: ignore
+
 from tgfs.core.model import TGFSDirectory, TGFSFileRef
 from tgfs.errors import DirectoryIsNotEmpty, FileOrDirectoryDoesNotExist
 
 from .metadata import MetaDataApi
+from .search import NameIndex, SearchHit, SearchMode
 
 
 class DirectoryApi:
+    PATH_INDEX_SIZE = 4096
+
     def __init__(self, metadata_api: MetaDataApi):
         self.__metadata_api = metadata_api
 
+        # "a/b/c" -> directory, valid for one root and one generation of the tree
+        self.__paths = LRU(self.PATH_INDEX_SIZE)  # type: LRU[str, TGFSDirectory]
+        self.__indexed_root: Optional[TGFSDirectory] = None
+        self.__generation = -1
+        # built on the first search, the trees are loaded lazily
+        self.__name_index: Optional[NameIndex] = None
+
     @property
     def root(self):
         return self.__metadata_api.get_root_directory()
 
+    def resolve(self, path: str) -> TGFSDirectory:
+        """
+        Find the directory at an absolute path. Resolved paths are indexed until the
+        tree changes, so a lookup only walks down from the deepest known ancestor.
+        """
+        root = self.root
+        if (
+            root is not self.__indexed_root
+            or self.__generation != TGFSDirectory.generation
+        ):
+            self.__paths.clear()
+            self.__indexed_root = root
+            self.__generation = TGFSDirectory.generation
+
+        parts: List[str] = []
+        for part in path.split("/"):
+            if part == "..":
+                if parts:
+                    parts.pop()
+            elif part and part != ".":
+                parts.append(part)
+
+        key = "/".join(parts)
+        if (d := self.__paths.get(key)) is not None:
+            return d
+
+        depth, d = len(parts), root
+        prefix = key
+        while depth > 0:
+            depth -= 1
+            prefix = prefix.rpartition("/")[0]
+            if depth > 0 and (ancestor := self.__paths.get(prefix)) is not None:
+                d = ancestor
+                break
+
+        for i in range(depth, len(parts)):
+            d = d.find_dir(parts[i])
+            self.__paths["/".join(parts[: i + 1])] = d
+        return d
+
+    def search(
+        self, query: str, mode: SearchMode = SearchMode.SUBSTRING
+    ) -> List[SearchHit]:
+        """Files and directories whose name matches the query, sorted by path"""
+        root = self.root
+        index = self.__name_index
+        if index is None or index.root is not root or index.stale:
+            index = self.__name_index = NameIndex(root)
+        return index.find(query, mode)
+
     async def create(
         self,
         name: str,
@@ -24,6 +86,13 @@ class DirectoryApi:
         await self.__metadata_api.push()
         return new_dir
 
+    async def move(
+        self, directory: TGFSDirectory, under: TGFSDirectory, name: Optional[str] = None
+    ) -> TGFSDirectory:
+        directory.move(under, name)
+        await self.__metadata_api.push()
+        return directory
+
     @staticmethod
     def ls(directory: TGFSDirectory) -> List[TGFSDirectory | TGFSFileRef]:
         return directory.find_dirs() + directory.find_files()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional, Sequence
 
 from tgfs.core.model import TGFSDirectory, TGFSFileDesc, TGFSFileRef, TGFSFileVersion
 from tgfs.errors import FileOrDirectoryDoesNotExist
@@ -12,6 +12,10 @@ from .file_desc import FileDescApi
 from .metadata import MetaDataApi
 
 
+def _size_of(fd: TGFSFileDesc) -> int:
+    return max(0, fd.get_latest_version().size)
+
+
 class FileApi:
     def __init__(self, metadata_api: MetaDataApi, file_desc_api: FileDescApi):
         self._metadata_api = metadata_api
@@ -20,27 +24,39 @@ class FileApi:
     async def copy(
         self, where: TGFSDirectory, fr: TGFSFileRef, name: Optional[str] = None
     ) -> TGFSFileRef:
-        copied_fr = where.create_file_ref(name or fr.name, fr.message_id)
+        copied_fr = where.create_file_ref(name or fr.name, fr.message_id, fr.size)
         await self._metadata_api.push()
         return copied_fr
 
+    async def move(
+        self, fr: TGFSFileRef, where: TGFSDirectory, name: Optional[str] = None
+    ) -> TGFSFileRef:
+        fr.move(where, name)
+        await self._metadata_api.push()
+        return fr
+
     async def _create_new_file(
         self, where: TGFSDirectory, file_msg: FileMessage
     ) -> TGFSFileDesc:
         resp = await self._file_desc_api.create_file_desc(file_msg)
-        where.create_file_ref(file_msg.name, resp.message_id)
+        where.create_file_ref(file_msg.name, resp.message_id, _size_of(resp.fd))
         await self._metadata_api.push()
         return resp.fd
 
-    async def _update_file_ref_message_id_if_necessary(
-        self, fr: TGFSFileRef, message_id: int
+    async def _update_file_ref_if_necessary(
+        self, fr: TGFSFileRef, message_id: int, size: Optional[int] = None
     ) -> None:
         """
         This method is called to update the message_id if the original message of the
-        message_id marked in the metadata is missing (e.g. the message was manually deleted).
+        message_id marked in the metadata is missing (e.g. the message was manually deleted),
+        and the size if the latest version changed.
         """
-        if fr.message_id != message_id:
-            fr.message_id = message_id
+        # the versions of the file changed, whatever was cached about the listings
+        # it appears in is stale
+        fr.location.touch()
+        changed = size is not None and fr.resize(size)
+        changed |= fr.repoint(message_id)
+        if changed:
             await self._metadata_api.push()
 
     async def _update_existing_file(
@@ -52,7 +68,7 @@ class FileApi:
             )
         else:
             resp = await self._file_desc_api.append_file_version(file_msg, fr)
-        await self._update_file_ref_message_id_if_necessary(fr, resp.message_id)
+        await self._update_file_ref_if_necessary(fr, resp.message_id, _size_of(resp.fd))
         return resp.fd
 
     async def rm(self, fr: TGFSFileRef, version_id: Optional[str] = None) -> None:
@@ -61,7 +77,9 @@ class FileApi:
             await self._metadata_api.push()
         else:
             resp = await self._file_desc_api.delete_file_version(fr, version_id)
-            await self._update_file_ref_message_id_if_necessary(fr, resp.message_id)
+            await self._update_file_ref_if_necessary(
+                fr, resp.message_id, _size_of(resp.fd)
+            )
 
     async def upload(
         self,
@@ -75,8 +93,24 @@ class FileApi:
         except FileOrDirectoryDoesNotExist:
             return await self._create_new_file(under, file_msg)
 
+    @staticmethod
+    def _learn_size(fr: TGFSFileRef, fd: TGFSFileDesc) -> None:
+        # references written before sizes were kept learn them as they are read, they
+        # are persisted with the next change of the metadata
+        if fr.size is None and isinstance(fd, TGFSFileDesc):
+            fr.resize(_size_of(fd))
+
     async def desc(self, fr: TGFSFileRef) -> TGFSFileDesc:
-        return await self._file_desc_api.get_file_desc(fr)
+        fd = await self._file_desc_api.get_file_desc(fr)
+        self._learn_size(fr, fd)
+        return fd
+
+    async def descs(self, frs: Sequence[TGFSFileRef]) -> List[TGFSFileDesc]:
+        """Descriptors of many files, loaded together"""
+        fds = await self._file_desc_api.get_file_descs(frs)
+        for fr, fd in zip(frs, fds):
+            self._learn_size(fr, fd)
+        return fds
 
     async def retrieve(
         self,
@@ -1,4 +1,5 @@
-from typing import List, Optional
+import copy
+from typing import List, Optional, Sequence
 
 from tgfs.core.model import TGFSFileDesc, TGFSFileRef, TGFSFileVersion
 from tgfs.core.repository.interface import (
@@ -26,6 +27,14 @@ class FileDescApi:
     async def get_file_desc(self, fr: TGFSFileRef) -> TGFSFileDesc:
         return await self.__fd_repo.get(fr)
 
+    async def get_file_descs(self, frs: Sequence[TGFSFileRef]) -> List[TGFSFileDesc]:
+        return await self.__fd_repo.get_many(frs)
+
+    async def _file_desc_to_edit(self, fr: TGFSFileRef) -> TGFSFileDesc:
+        # descriptors are shared with everyone who read them, until the edited one is
+        # saved they must keep seeing the old one
+        return copy.deepcopy(await self.get_file_desc(fr))
+
     async def download_file_at_version(
         self, fv: TGFSFileVersion, begin: int, end: int, as_name: str
     ) -> FileContent:
@@ -46,7 +55,7 @@ class FileDescApi:
     async def append_file_version(
         self, file_msg: FileMessage, fr: Optional[TGFSFileRef] = None
     ) -> FDRepositoryResp:
-        fd = await self.get_file_desc(fr) if fr else TGFSFileDesc(name=file_msg.name)
+        fd = await self._file_desc_to_edit(fr) if fr else TGFSFileDesc(file_msg.name)
 
         if isinstance(file_msg, UploadableFileMessage | FileMessageImported):
             sent_file_msg = await self.get_sent_file_message(file_msg)
@@ -59,7 +68,7 @@ class FileDescApi:
     async def update_file_version(
         self, fr: TGFSFileRef, file_msg: FileMessage, version_id: str
     ) -> FDRepositoryResp:
-        fd = await self.get_file_desc(fr)
+        fd = await self._file_desc_to_edit(fr)
         if isinstance(file_msg, UploadableFileMessage | FileMessageImported):
             sent_file_msg = await self.get_sent_file_message(file_msg)
             fv = TGFSFileVersion.from_sent_file_message(*sent_file_msg)
@@ -75,6 +84,6 @@ class FileDescApi:
     async def delete_file_version(
         self, fr: TGFSFileRef, version_id: str
     ) -> FDRepositoryResp:
-        fd = await self.get_file_desc(fr)
+        fd = await self._file_desc_to_edit(fr)
         fd.delete_version(version_id)
         return await self.__fd_repo.save(fd, fr)
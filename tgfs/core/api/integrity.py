@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Dict, Iterator, List, Set
+
+from tgfs.config import IntegrityConfig
+from tgfs.core.model import TGFSDirectory, TGFSFileDesc, TGFSFileRef
+from tgfs.utils.message_cache import channel_cache
+
+from .message import MessageApi
+from .metadata import MetaDataApi
+
+logger = logging.getLogger(__name__)
+
+# ids per get_messages request
+BATCH_SIZE = 100
+
+
+@dataclass
+class IntegrityIndex:
+    """
+    What is known to be gone from the channel, consulted by the read path instead of
+    checking every message on every read. Message ids are never reused, so entries
+    never go stale.
+    """
+
+    missing_messages: Set[int] = field(default_factory=set)
+    # descriptor messages which were recreated under a new id because the old one was
+    # deleted, copies of the file may still point to the old one. Only kept in memory,
+    # copies the scan did not get to before a restart are reported missing instead.
+    replaced_descriptors: Dict[int, int] = field(default_factory=dict)
+
+    def is_missing(self, message_id: int) -> bool:
+        return message_id in self.missing_messages
+
+
+@dataclass
+class ScanReport:
+    files: int = 0
+    missing_descriptors: int = 0
+    invalid_versions: int = 0
+    repaired_refs: int = 0
+
+
+class IntegrityScanner:
+    """
+    Walks the namespace in the background and checks that the descriptor and part
+    messages of every file still exist, at most `requests_per_second` message
+    requests at a time.
+
+    Only the directories which are already loaded are walked, the scan never loads a
+    lazy subtree itself. The first scan runs one interval after startup, so that it
+    does not compete with the requests of a fresh mount.
+    """
+
+    def __init__(
+        self,
+        metadata_api: MetaDataApi,
+        message_api: MessageApi,
+        index: IntegrityIndex,
+        config: IntegrityConfig,
+    ):
+        self._metadata_api = metadata_api
+        self._message_api = message_api
+        self._index = index
+        self._config = config
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._config.interval)
+            try:
+                report = await self.scan()
+                logger.info(f"Integrity scan finished: {report}")
+            except Exception as ex:
+                logger.error(f"Integrity scan failed: {ex}")
+
+    @staticmethod
+    def _walk(directory: TGFSDirectory) -> Iterator[TGFSFileRef]:
+        if not directory.is_materialized:
+            return
+        yield from directory.files
+        for child in directory.children:
+            yield from IntegrityScanner._walk(child)
+
+    async def _get_messages(self, ids: List[int]) -> list:
+        res = []
+        for i in range(0, len(ids), BATCH_SIZE):
+            # stay well under the rate limit the user facing requests share
+            await asyncio.sleep(1 / self._config.requests_per_second)
+            res.extend(await self._message_api.get_messages(ids[i : i + BATCH_SIZE]))
+        return res
+
+    async def scan(self) -> ScanReport:
+        report = ScanReport()
+        # snapshot, the namespace may change while scanning
+        refs = list(self._walk(self._metadata_api.get_root_directory()))
+
+        for i in range(0, len(refs), BATCH_SIZE):
+            batch = refs[i : i + BATCH_SIZE]
+            report.files += len(batch)
+            await self._scan_batch(batch, report)
+
+        if report.repaired_refs:
+            await self._metadata_api.push()
+        return report
+
+    async def _scan_batch(self, refs: List[TGFSFileRef], report: ScanReport) -> None:
+        report.repaired_refs += sum(self._repair(fr) for fr in refs)
+
+        refs = [fr for fr in refs if not self._index.is_missing(fr.message_id)]
+        descriptors = await self._get_messages([fr.message_id for fr in refs])
+
+        fds: Dict[int, TGFSFileDesc] = {}
+        # copies of a file share its descriptor
+        refs_of: Dict[int, List[TGFSFileRef]] = {}
+        for fr, message in zip(refs, descriptors):
+            if message is None or not message.text:
+                logger.warning(
+                    f"File descriptor (message_id: {fr.message_id}) for {fr.name} is missing"
+                )
+                self._index.missing_messages.add(fr.message_id)
+                report.missing_descriptors += 1
+                # the listings showing the file are stale
+                fr.location.touch()
+                continue
+            refs_of.setdefault(fr.message_id, []).append(fr)
+            try:
+                fds[fr.message_id] = TGFSFileDesc.from_dict(
+                    json.loads(message.text), name=fr.name
+                )
+            except (ValueError, KeyError) as ex:
+                logger.warning(f"Malformed file descriptor of {fr.name}: {ex}")
+
+        part_ids = sorted(
+            set(
+                chain.from_iterable(
+                    version.message_ids
+                    for fd in fds.values()
+                    for version in fd.get_versions(exclude_invalid=True)
+                )
+            )
+            - self._index.missing_messages
+        )
+        parts = await self._get_messages(part_ids)
+        missing = {
+            message_id
+            for message_id, message in zip(part_ids, parts)
+            if message is None or message.document is None
+        }
+        if not missing:
+            return
+
+        self._index.missing_messages |= missing
+        cache = channel_cache(self._message_api.private_file_channel).fd
+        for message_id, fd in fds.items():
+            invalid = [
+                version
+                for version in fd.get_versions(exclude_invalid=True)
+                if missing.intersection(version.message_ids)
+            ]
+            if invalid:
+                logger.warning(
+                    f"{len(invalid)} versions of {fd.name} have missing file messages"
+                )
+                report.invalid_versions += len(invalid)
+                cache.invalidate(message_id)
+                for fr in refs_of[message_id]:
+                    fr.location.touch()
+
+    def _repair(self, fr: TGFSFileRef) -> bool:
+        """Point a copy whose descriptor was recreated to the new descriptor"""
+        message_id = fr.message_id
+        while message_id in self._index.replaced_descriptors:
+            message_id = self._index.replaced_descriptors[message_id]
+        if message_id == fr.message_id:
+            return False
+
+        logger.info(
+            f"Repointing {fr.name} from descriptor {fr.message_id} to {message_id}"
+        )
+        return fr.repoint(message_id)
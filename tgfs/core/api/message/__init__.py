@@ -1,7 +1,6 @@
 import asyncio
-from typing import Iterator
+from typing import Awaitable, Callable, Iterator, TypeVar
 
-from pyrate_limiter import Duration, InMemoryBucket, Limiter, Rate
 from telethon.errors import MessageNotModifiedError, RPCError
 
 from tgfs.config import get_config
@@ -22,43 +21,54 @@ from tgfs.reqres import (
     SearchMessageReq,
     SendTextReq,
 )
-from tgfs.telegram.interface import TDLibApi
+from tgfs.telegram.interface import ITDLibClient, TDLibApi
 from tgfs.utils.chained_async_iterator import ChainedAsyncIterator
 from tgfs.utils.others import exclude_none, is_big_file
 
 from .message_broker import MessageBroker
+from .rate_limiter import MethodClass
 
-rate = Rate(20, Duration.SECOND)
-bucket = InMemoryBucket([rate])
-limiter = Limiter(bucket, max_delay=60 * 1000)  # 60 seconds max delay
+T = TypeVar("T")
 
 
 class MessageApi(MessageBroker):
     def __init__(self, tdlib: TDLibApi, private_file_channel: int):
         super().__init__(tdlib, private_file_channel)
 
-    @staticmethod
-    def __try_acquire(name: str):
-        limiter.try_acquire(name)
+    async def __limited(
+        self,
+        client: ITDLibClient,
+        method: MethodClass,
+        call: Callable[[ITDLibClient], Awaitable[T]],
+    ) -> T:
+        return await self.rate_limiter.run(
+            client, self.private_file_channel, method, lambda: call(client)
+        )
 
     async def send_text(self, message: str) -> int:
-        self.__try_acquire("MessageApi.send_text")
         return (
-            await self.tdlib.next_bot.send_text(
-                SendTextReq(chat=self.private_file_channel, text=message)
+            await self.__limited(
+                self.tdlib.next_bot,
+                MethodClass.WRITE,
+                lambda bot: bot.send_text(
+                    SendTextReq(chat=self.private_file_channel, text=message)
+                ),
             )
         ).message_id
 
     async def edit_message_text(self, message_id: int, message: str) -> int:
-        self.__try_acquire("MessageApi.edit_message_text")
         try:
             return (
-                await self.tdlib.next_bot.edit_message_text(
-                    EditMessageTextReq(
-                        chat=self.private_file_channel,
-                        message_id=message_id,
-                        text=message,
-                    )
+                await self.__limited(
+                    self.tdlib.next_bot,
+                    MethodClass.WRITE,
+                    lambda bot: bot.edit_message_text(
+                        EditMessageTextReq(
+                            chat=self.private_file_channel,
+                            message_id=message_id,
+                            text=message,
+                        )
+                    ),
                 )
             ).message_id
         except MessageNotModifiedError:
@@ -71,12 +81,14 @@ class MessageApi(MessageBroker):
             raise e
 
     async def get_pinned_message(self) -> MessageRespWithDocument:
-        self.__try_acquire("MessageApi.get_pinned_message")
-
         if not self.tdlib.account:
             raise PinnedMessageNotSupported()
-        messages = await self.tdlib.account.get_pinned_messages(
-            GetPinnedMessageReq(chat=self.private_file_channel)
+        messages = await self.__limited(
+            self.tdlib.account,
+            MethodClass.READ,
+            lambda account: account.get_pinned_messages(
+                GetPinnedMessageReq(chat=self.private_file_channel)
+            ),
         )
 
         if len(messages) == 0:
@@ -92,18 +104,26 @@ class MessageApi(MessageBroker):
         )
 
     async def pin_message(self, message_id: int):
-        self.__try_acquire("MessageApi.pin_message")
-        return await self.tdlib.next_bot.pin_message(
-            PinMessageReq(chat=self.private_file_channel, message_id=message_id)
+        return await self.__limited(
+            self.tdlib.next_bot,
+            MethodClass.WRITE,
+            lambda bot: bot.pin_message(
+                PinMessageReq(chat=self.private_file_channel, message_id=message_id)
+            ),
         )
 
     async def search_messages(self, search: str) -> list[MessageResp]:
-        self.__try_acquire("MessageApi.search_messages")
         if self.tdlib.account:
             return list(
                 exclude_none(
-                    await self.tdlib.account.search_messages(
-                        SearchMessageReq(chat=self.private_file_channel, search=search)
+                    await self.__limited(
+                        self.tdlib.account,
+                        MethodClass.READ,
+                        lambda account: account.search_messages(
+                            SearchMessageReq(
+                                chat=self.private_file_channel, search=search
+                            )
+                        ),
                     )
                 )
             )
@@ -1,69 +1,140 @@
 import asyncio
-from dataclasses import dataclass
-from functools import reduce
-from typing import List, Optional, Set
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
 
 from tgfs.reqres import GetMessagesReq, GetMessagesResp, MessageResp
 from tgfs.telegram.interface import TDLibApi
+from tgfs.utils.histogram import Histogram
 from tgfs.utils.message_cache import channel_cache
 
-DELAY = 0.5
+from .rate_limiter import MethodClass, RateLimiter
+
+# Telegram returns at most 100 messages per request
+MAX_BATCH_SIZE = 100
+# flush once no new request arrived for this long
+IDLE_GAP = 0.005
+# flush at the latest this long after the first request of a batch arrived
+MAX_DELAY = 0.05
 
 
 @dataclass
 class Request:
     ids: list[int]
     future: asyncio.Future[GetMessagesResp]
+    arrived_at: float = field(default_factory=time.monotonic)
 
 
 class MessageBroker:
+    """
+    Coalesces the get_messages calls which arrive close together into as few
+    Telegram requests as possible. A batch is flushed when it reaches
+    MAX_BATCH_SIZE ids, when no request arrived for IDLE_GAP seconds, or
+    MAX_DELAY seconds after its first request, whichever comes first.
+    """
+
     def __init__(self, tdlib: TDLibApi, private_file_channel: int):
         self.tdlib = tdlib
-        self.__requests: List[Request] = []
-        self.__lock = asyncio.Lock()
-        self.__task: Optional[asyncio.Task] = None
         self.private_file_channel = private_file_channel
+        self.rate_limiter = RateLimiter()
+
+        self.__requests: List[Request] = []
+        self.__ids: Set[int] = set()
+        self.__arrived = asyncio.Event()
+        self.__timer: Optional[asyncio.Task] = None
+        self.__flushes: Set[asyncio.Task] = set()
+
+        # ids per Telegram request
+        self.batch_sizes = Histogram((1, 2, 5, 10, 20, 50, 100))
+        # seconds a request waited before its batch was sent
+        self.wait_times = Histogram((0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
 
     async def get_messages(self, ids: list[int]) -> list[Optional[MessageResp]]:
-        if cached_messages := channel_cache(self.private_file_channel).id.gets(ids):
-            if all(msg is not None for msg in cached_messages):
-                return cached_messages
-
-        loop = asyncio.get_running_loop()
-        future = loop.create_future()
-
-        async with self.__lock:
-            self.__requests.append(Request(ids, future))
-            if self.__task and not self.__task.done():
-                self.__task.cancel()
-            self.__task = loop.create_task(self.process_requests())
+        cache = channel_cache(self.private_file_channel).id
+        await cache.load(ids)
+        # known deleted messages are answered from the cache as well
+        if not cache.find_nonexistent(ids):
+            return cache.gets(ids)
+
+        future = asyncio.get_running_loop().create_future()
+        self.__requests.append(Request(ids, future))
+        self.__ids.update(ids)
+
+        if len(self.__ids) >= MAX_BATCH_SIZE:
+            self.__flush()
+        elif self.__timer is None:
+            self.__timer = asyncio.create_task(self.__wait_and_flush())
+        else:
+            self.__arrived.set()
         return await future
 
-    async def process_requests(self):
-        try:
-            await asyncio.sleep(DELAY)
+    async def __wait_and_flush(self) -> None:
+        deadline = time.monotonic() + MAX_DELAY
+        while (remaining := deadline - time.monotonic()) > 0:
+            self.__arrived.clear()
+            try:
+                await asyncio.wait_for(
+                    self.__arrived.wait(), timeout=min(IDLE_GAP, remaining)
+                )
+            except TimeoutError:
+                break
+        self.__timer = None
+        self.__flush()
 
-            async with self.__lock:
-                requests, self.__requests = self.__requests, []
+    def __flush(self) -> None:
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+        requests, self.__requests = self.__requests, []
+        ids, self.__ids = self.__ids, set()
+        if not requests:
+            return
 
-            if not requests:
-                return
+        now = time.monotonic()
+        for r in requests:
+            self.wait_times.observe(now - r.arrived_at)
 
-            ids: Set[int] = reduce(
-                lambda full, req: full.union(req.ids), requests, set()
-            )
-            messages = await self.tdlib.next_bot.get_messages(
+        # the requests are sent from a separate task so that the next batch can
+        # start filling up in the meantime
+        task = asyncio.create_task(self.__process(requests, sorted(ids)))
+        self.__flushes.add(task)
+        task.add_done_callback(self.__flushes.discard)
+
+    async def __fetch(self, ids: List[int]) -> GetMessagesResp:
+        self.batch_sizes.observe(len(ids))
+        bot = self.tdlib.next_bot
+        return await self.rate_limiter.run(
+            bot,
+            self.private_file_channel,
+            MethodClass.READ,
+            lambda: bot.get_messages(
                 GetMessagesReq(chat=self.private_file_channel, message_ids=tuple(ids))
+            ),
+        )
+
+    async def __process(self, requests: List[Request], ids: List[int]) -> None:
+        chunks = [
+            ids[i : i + MAX_BATCH_SIZE] for i in range(0, len(ids), MAX_BATCH_SIZE)
+        ]
+        # each chunk goes to the next bot, so they are fetched in parallel
+        results = await asyncio.gather(
+            *(self.__fetch(chunk) for chunk in chunks), return_exceptions=True
+        )
+
+        messages_map: Dict[int, Optional[MessageResp]] = {}
+        errors: Dict[int, BaseException] = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                errors.update((msg_id, result) for msg_id in chunk)
+                continue
+            messages_map.update(
+                (msg.message_id, msg) for msg in result if msg is not None
             )
 
-            messages_map = {msg.message_id: msg for msg in messages if msg is not None}
-
-            for r in requests:
-                if not r.future.done():
-                    r.future.set_result([messages_map.get(msg_id) for msg_id in r.ids])
-        except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            for request in requests:
-                if not request.future.done():
-                    request.future.set_exception(e)
+        for r in requests:
+            if r.future.done():
+                continue
+            if error := next((errors[i] for i in r.ids if i in errors), None):
+                r.future.set_exception(error)
+            else:
+                r.future.set_result([messages_map.get(msg_id) for msg_id in r.ids])
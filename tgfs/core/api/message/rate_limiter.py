@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from pyrogram.errors import FloodWait as PyrogramFloodWait
+from telethon.errors import FloodWaitError as TelethonFloodWait
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# a FloodWait means the request was not executed, so it is safe to send it again
+MAX_RETRIES = 2
+# the rate never drops below this share of the configured one
+MIN_RATE_FACTOR = 0.1
+
+
+class MethodClass(Enum):
+    # requests which create or change messages
+    WRITE = "write"
+    # requests which only read messages
+    READ = "read"
+
+
+# requests per second and burst size, per bot and chat
+RATES: Dict[MethodClass, Tuple[float, int]] = {
+    MethodClass.WRITE: (20, 20),
+    MethodClass.READ: (20, 20),
+}
+
+
+def flood_wait_seconds(e: BaseException) -> Optional[float]:
+    if isinstance(e, TelethonFloodWait):
+        return e.seconds
+    if isinstance(e, PyrogramFloodWait):
+        return float(e.value)  # type: ignore[arg-type]
+    return None
+
+
+class TokenBucket:
+    """
+    Requests take a token each, tokens come back at `rate` per second up to
+    `capacity`. The balance may go negative: a request which finds no token
+    reserves the next one and waits for it, so waiters are served in order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+        # a FloodWait may have come in while waiting
+        while (delay := self._blocked_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def flood_wait(self, seconds: float) -> None:
+        """Telegram asked to wait, stop for that long and slow down afterwards"""
+        now = time.monotonic()
+        self._refill(now)
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self.rate = max(self.max_rate * MIN_RATE_FACTOR, self.rate / 2)
+        self._tokens = min(self._tokens, 0)
+
+    def succeeded(self) -> None:
+        # recover slowly from a FloodWait
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by (bot, chat, method class), since Telegram limits each
+    bot per chat. Callers await their turn instead of blocking the event loop.
+    """
+
+    def __init__(self, rates: Optional[Dict[MethodClass, Tuple[float, int]]] = None):
+        self._rates = rates or RATES
+        self._buckets: Dict[Tuple[Hashable, int, MethodClass], TokenBucket] = {}
+
+    def bucket(self, bot: Hashable, chat: int, method: MethodClass) -> TokenBucket:
+        key = (bot, chat, method)
+        if (bucket := self._buckets.get(key)) is None:
+            bucket = self._buckets[key] = TokenBucket(*self._rates[method])
+        return bucket
+
+    async def run(
+        self,
+        bot: Hashable,
+        chat: int,
+        method: MethodClass,
+        call: Callable[[], Awaitable[T]],
+    ) -> T:
+        bucket = self.bucket(bot, chat, method)
+        retries = 0
+        while True:
+            await bucket.acquire()
+            try:
+                res = await call()
+            except Exception as e:
+                if (seconds := flood_wait_seconds(e)) is None or retries == MAX_RETRIES:
+                    raise
+                logger.warning(
+                    f"FloodWait of {seconds} s for {method.value} requests in {chat}"
+                )
+                bucket.flood_wait(seconds)
+                retries += 1
+            else:
+                bucket.succeeded()
+                return res
@@ -12,6 +12,11 @@ class MetaDataApi:
     def reset(self) -> None:
         self.__metadata_repo.metadata = TGFSMetadata(dir=TGFSDirectory.root_dir())
 
+    async def on_message_edited(self, message_id: int) -> bool:
+        # the reloaded tree replaces the contents of the root, which resets whatever
+        # was cached against the old one
+        return await self.__metadata_repo.on_message_edited(message_id)
+
     async def push(self) -> None:
         await self.__metadata_repo.push()
 
@@ -0,0 +1,188 @@
+import fnmatch
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Set
+
+from tgfs.core.model import TGFSDirectory, TGFSFileRef, TGFSNode
+
+
+class SearchMode(Enum):
+    SUBSTRING = "substring"
+    PREFIX = "prefix"
+    GLOB = "glob"
+
+
+@dataclass
+class SearchHit:
+    path: str
+    is_dir: bool
+
+
+def _trigrams(s: str) -> Set[str]:
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+def _glob_literals(pattern: str) -> List[str]:
+    """The runs of plain characters of a glob pattern, "*.mp[34]" -> [".mp"]"""
+    literals: List[str] = []
+    current: List[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c in "*?[":
+            literals.append("".join(current))
+            current = []
+            if c == "[" and (end := pattern.find("]", i + 2)) != -1:
+                i = end
+        else:
+            current.append(c)
+        i += 1
+    literals.append("".join(current))
+    return [literal for literal in literals if literal]
+
+
+def _walk(directory: TGFSDirectory) -> Iterator[TGFSNode]:
+    yield directory
+    # copied directories share the contents of the original, which are indexed
+    # (and removed) with the original only
+    yield from (fr for fr in directory.files if fr.location is directory)
+    for child in directory.children:
+        if child.parent is directory:
+            yield from _walk(child)
+
+
+def _root_of(node: TGFSNode) -> TGFSDirectory:
+    d = node.location if isinstance(node, TGFSFileRef) else node
+    while d.parent is not None:
+        d = d.parent
+    return d
+
+
+class NameIndex:
+    """
+    Case-insensitive index of the names of all files and directories under a root,
+    kept up to date with the changes of the tree instead of walking it per query.
+    Names are looked up by their trigrams, nodes by their (lowercased) name.
+    """
+
+    def __init__(self, root: TGFSDirectory):
+        self._root = root
+        self._nodes: Dict[str, Dict[int, TGFSNode]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._stale = False
+
+        for node in _walk(root):
+            if node is not root:
+                self._add(node, node.name)
+        TGFSDirectory.observers.add(self)
+
+    @property
+    def root(self) -> TGFSDirectory:
+        return self._root
+
+    @property
+    def stale(self) -> bool:
+        """The tree changed in a way the index could not follow, rebuild it"""
+        return self._stale
+
+    def _add(self, node: TGFSNode, name: str) -> None:
+        key = name.lower()
+        if (nodes := self._nodes.get(key)) is None:
+            nodes = self._nodes[key] = {}
+            for trigram in _trigrams(key):
+                self._trigrams.setdefault(trigram, set()).add(key)
+        nodes[id(node)] = node
+
+    def _remove(self, node: TGFSNode, name: str) -> None:
+        key = name.lower()
+        if (nodes := self._nodes.get(key)) is None:
+            return
+        nodes.pop(id(node), None)
+        if nodes:
+            return
+        del self._nodes[key]
+        for trigram in _trigrams(key):
+            names = self._trigrams[trigram]
+            names.discard(key)
+            if not names:
+                del self._trigrams[trigram]
+
+    # TreeObserver
+
+    def added(self, node: TGFSNode) -> None:
+        if _root_of(node) is not self._root:
+            return
+        if isinstance(node, TGFSDirectory):
+            for n in _walk(node):
+                self._add(n, n.name)
+        else:
+            self._add(node, node.name)
+
+    def removed(self, node: TGFSNode) -> None:
+        if _root_of(node) is not self._root:
+            return
+        if isinstance(node, TGFSDirectory):
+            for n in _walk(node):
+                self._remove(n, n.name)
+        else:
+            self._remove(node, node.name)
+
+    def moved(self, node: TGFSNode, old_location: TGFSDirectory, old_name: str) -> None:
+        # moves within a tree only change the name, the index does not keep paths
+        if old_name != node.name and _root_of(node) is self._root:
+            self._remove(node, old_name)
+            self._add(node, node.name)
+
+    def repointed(self, fr: TGFSFileRef, old_message_id: int) -> None:
+        pass
+
+    def loaded(self, directory: TGFSDirectory) -> None:
+        # the whole tree was loaded to build the index
+        pass
+
+    def reset(self) -> None:
+        self._stale = True
+
+    # queries
+
+    def _candidates(self, literals: Iterable[str]) -> Iterable[str]:
+        """Names which contain all trigrams of the given literals"""
+        trigrams = set().union(*(_trigrams(literal) for literal in literals))
+        if not trigrams:
+            return self._nodes.keys()
+        sets = sorted(
+            (self._trigrams.get(trigram, set()) for trigram in trigrams), key=len
+        )
+        return sets[0].intersection(*sets[1:])
+
+    def search(self, query: str, mode: SearchMode = SearchMode.SUBSTRING) -> List[str]:
+        """The matching names, lowercased"""
+        query = query.lower()
+        if mode == SearchMode.GLOB:
+            return [
+                name
+                for name in self._candidates(_glob_literals(query))
+                if fnmatch.fnmatchcase(name, query)
+            ]
+        if mode == SearchMode.PREFIX:
+            return [
+                name for name in self._candidates([query]) if name.startswith(query)
+            ]
+        return [name for name in self._candidates([query]) if query in name]
+
+    def find(
+        self, query: str, mode: SearchMode = SearchMode.SUBSTRING
+    ) -> List[SearchHit]:
+        hits = [
+            (
+                SearchHit(path=node.absolute_path, is_dir=True)
+                if isinstance(node, TGFSDirectory)
+                else SearchHit(
+                    path=f"{node.location.absolute_path}/{node.name}", is_dir=False
+                )
+            )
+            for name in self.search(query, mode)
+            for node in self._nodes[name].values()
+        ]
+        hits.sort(key=lambda hit: hit.path)
+        return hits
@@ -0,0 +1,180 @@
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from tgfs.core.model import TGFSDirectory, TGFSFileRef, TGFSNode
+from tgfs.reqres import ChannelUpdate, UpdateKind
+from tgfs.utils.message_cache import channel_cache
+
+from .integrity import IntegrityIndex
+from .message import MessageApi
+from .metadata import MetaDataApi
+
+logger = logging.getLogger(__name__)
+
+# called with the paths whose cached state is stale, "/" meaning everything
+ChangeListener = Callable[[List[str]], None]
+
+
+def _root_of(node: TGFSNode) -> TGFSDirectory:
+    d = node.location if isinstance(node, TGFSFileRef) else node
+    while d.parent is not None:
+        d = d.parent
+    return d
+
+
+def _loaded_refs(node: TGFSNode) -> Iterator[TGFSFileRef]:
+    """The file refs at and below a node, without loading lazy directories"""
+    if isinstance(node, TGFSFileRef):
+        yield node
+        return
+    if not node.is_materialized:
+        return
+    # copied directories share the contents of the original, which are indexed
+    # (and removed) with the original only
+    yield from (fr for fr in node.files if fr.location is node)
+    for child in node.children:
+        if child.parent is node:
+            yield from _loaded_refs(child)
+
+
+class FileRefIndex:
+    """
+    The loaded file refs under a root by their descriptor message id, kept up to date
+    with the changes of the tree instead of walking it per update. The refs of a lazy
+    directory are indexed once it is loaded.
+    """
+
+    def __init__(self, root: TGFSDirectory):
+        self._root = root
+        self._refs: Dict[int, Dict[int, TGFSFileRef]] = {}
+        self._stale = False
+
+        for fr in _loaded_refs(root):
+            self._add(fr)
+        TGFSDirectory.observers.add(self)
+
+    @property
+    def root(self) -> TGFSDirectory:
+        return self._root
+
+    @property
+    def stale(self) -> bool:
+        """The tree changed in a way the index could not follow, rebuild it"""
+        return self._stale
+
+    def _add(self, fr: TGFSFileRef) -> None:
+        self._refs.setdefault(fr.message_id, {})[id(fr)] = fr
+
+    def _remove(self, fr: TGFSFileRef, message_id: int) -> None:
+        if (refs := self._refs.get(message_id)) is None:
+            return
+        refs.pop(id(fr), None)
+        if not refs:
+            del self._refs[message_id]
+
+    def find(self, message_ids: Iterable[int]) -> List[TGFSFileRef]:
+        return [
+            fr
+            for message_id in message_ids
+            for fr in self._refs.get(message_id, {}).values()
+        ]
+
+    # TreeObserver
+
+    def added(self, node: TGFSNode) -> None:
+        if _root_of(node) is self._root:
+            for fr in _loaded_refs(node):
+                self._add(fr)
+
+    def removed(self, node: TGFSNode) -> None:
+        if _root_of(node) is self._root:
+            for fr in _loaded_refs(node):
+                self._remove(fr, fr.message_id)
+
+    def moved(self, node: TGFSNode, old_location: TGFSDirectory, old_name: str) -> None:
+        pass
+
+    def repointed(self, fr: TGFSFileRef, old_message_id: int) -> None:
+        if _root_of(fr) is self._root:
+            self._remove(fr, old_message_id)
+            self._add(fr)
+
+    def loaded(self, directory: TGFSDirectory) -> None:
+        if _root_of(directory) is self._root:
+            for fr in directory.files:
+                if fr.location is directory:
+                    self._add(fr)
+
+    def reset(self) -> None:
+        self._stale = True
+
+
+class ChannelWatcher:
+    """
+    Listens to the updates of the file channel and drops whatever was cached about
+    the messages which changed, so that changes made outside of this server show up
+    without waiting for the caches to expire.
+    """
+
+    def __init__(
+        self,
+        message_api: MessageApi,
+        metadata_api: MetaDataApi,
+        integrity_index: IntegrityIndex,
+    ):
+        self._message_api = message_api
+        self._metadata_api = metadata_api
+        self._integrity_index = integrity_index
+        self._listeners: List[ChangeListener] = []
+        # built on the first update which needs it
+        self._refs: Optional[FileRefIndex] = None
+
+    def start(self) -> None:
+        tdlib = self._message_api.tdlib
+        # bots only receive the updates of channels they are admin of, which is a
+        # requirement anyway; the account sees everything it can read
+        client = tdlib.account or tdlib.bot
+        client.subscribe(self._message_api.private_file_channel, self.handle)
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        self._listeners.append(listener)
+
+    async def handle(self, update: ChannelUpdate) -> None:
+        cache = channel_cache(update.chat)
+        reloaded = False
+
+        if update.kind == UpdateKind.NEW_MESSAGE:
+            cache.search.clear()
+        elif update.kind == UpdateKind.MESSAGE_EDITED:
+            for message_id in update.message_ids:
+                cache.invalidate(message_id)
+                reloaded |= await self._metadata_api.on_message_edited(message_id)
+        elif update.kind == UpdateKind.MESSAGES_DELETED:
+            for message_id in update.message_ids:
+                cache.invalidate(message_id)
+                cache.id.mark_deleted(message_id)
+                self._integrity_index.missing_messages.add(message_id)
+
+        if update.kind == UpdateKind.NEW_MESSAGE:
+            return
+
+        if reloaded:
+            paths = ["/"]
+        else:
+            frs = self._affected(set(update.message_ids))
+            for fr in frs:
+                # the listings of the files are stale as well
+                fr.location.touch()
+            paths = [f"{fr.location.absolute_path}/{fr.name}" for fr in frs]
+        if not paths or not self._listeners:
+            return
+        logger.info(f"{update.kind.value} {update.message_ids}: resetting {paths}")
+        for listener in self._listeners:
+            listener(paths)
+
+    def _affected(self, message_ids: Set[int]) -> List[TGFSFileRef]:
+        root: TGFSDirectory = self._metadata_api.get_root_directory()
+        index = self._refs
+        if index is None or index.root is not root or index.stale:
+            index = self._refs = FileRefIndex(root)
+        return index.find(message_ids)
@@ -1,7 +1,9 @@
-from typing import Dict
+from typing import Dict, Optional
 
-from tgfs.config import MetadataConfig, MetadataType
+from tgfs.config import IntegrityConfig, MetadataConfig, MetadataType
 from tgfs.core.api import DirectoryApi, FileApi, FileDescApi, MessageApi, MetaDataApi
+from tgfs.core.api.integrity import IntegrityIndex, IntegrityScanner
+from tgfs.core.api.updates import ChannelWatcher
 from tgfs.core.repository.impl import (
     TGMsgFDRepository,
     TGMsgFileContentRepository,
@@ -20,11 +22,15 @@ class Client:
         message_api: MessageApi,
         file_api: FileApi,
         dir_api: DirectoryApi,
+        integrity_scanner: Optional[IntegrityScanner] = None,
+        watcher: Optional[ChannelWatcher] = None,
     ):
         self.name = name
         self.message_api = message_api
         self.file_api = file_api
         self.dir_api = dir_api
+        self.integrity_scanner = integrity_scanner
+        self.watcher = watcher
 
     @classmethod
     async def create(
@@ -33,6 +39,7 @@ class Client:
         metadata_cfg: MetadataConfig,
         tdlib_api: TDLibApi,
         use_account_api_to_upload: bool = False,
+        integrity_cfg: Optional[IntegrityConfig] = None,
     ) -> "Client":
         channel = await tdlib_api.next_bot.resolve_channel_id(channel_id)
         message_api = MessageApi(tdlib_api, channel)
@@ -43,7 +50,8 @@ class Client:
             and tdlib_api.account is not None
             and (await tdlib_api.account.get_me()).is_premium,
         )
-        fd_repo = TGMsgFDRepository(message_api)
+        integrity_index = IntegrityIndex()
+        fd_repo = TGMsgFDRepository(message_api, integrity_index)
 
         if metadata_cfg.type == MetadataType.PINNED_MESSAGE:
             metadata_repo: IMetaDataRepository = TGMsgMetadataRepository(
@@ -68,11 +76,22 @@ class Client:
         file_api = FileApi(metadata_api, fd_api)
         dir_api = DirectoryApi(metadata_api)
 
+        integrity_scanner = (
+            IntegrityScanner(metadata_api, message_api, integrity_index, integrity_cfg)
+            if integrity_cfg and integrity_cfg.enabled
+            else None
+        )
+
+        watcher = ChannelWatcher(message_api, metadata_api, integrity_index)
+        watcher.start()
+
         return cls(
             name=metadata_cfg.name,
             message_api=message_api,
             file_api=file_api,
             dir_api=dir_api,
+            integrity_scanner=integrity_scanner,
+            watcher=watcher,
         )
 
 
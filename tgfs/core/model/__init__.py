@@ -1,4 +1,4 @@
-from .directory import TGFSDirectory, TGFSFileRef
+from .directory import TGFSDirectory, TGFSFileRef, TGFSNode, TreeObserver
 from .file import EMPTY_FILE_MESSAGE, TGFSFileDesc, TGFSFileVersion
 from .metadata import TGFSMetadata
 from .serialized import (
@@ -14,6 +14,8 @@ __all__ = [
     "TGFSFileDesc",
     "TGFSFileVersion",
     "TGFSFileRef",
+    "TGFSNode",
+    "TreeObserver",
     "TGFSFileDescSerialized",
     "TGFSFileVersionSerialized",
     "TGFSFileRefSerialized",
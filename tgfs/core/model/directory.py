@@ -1,71 +1,357 @@
+import itertools
+import sys
+import weakref
 from dataclasses import dataclass, field
-from typing import Iterable, List, Optional, Self
+from typing import ClassVar, Iterable, Iterator, List, Optional, Protocol, Self, Union
 
-from tgfs.errors import FileOrDirectoryAlreadyExists, FileOrDirectoryDoesNotExist
+from tgfs.errors import (
+    FileOrDirectoryAlreadyExists,
+    FileOrDirectoryDoesNotExist,
+    MoveIntoItself,
+)
 from tgfs.utils.time import FIRST_DAY_OF_EPOCH, ts
 
 from .common import validate_name
 from .serialized import TGFSDirectorySerialized
 
 
-@dataclass
+@dataclass(slots=True)
 class TGFSFileRef:
     message_id: int
     name: str
     location: "TGFSDirectory" = field(repr=False)
+    # size of the latest version, unknown for references written before sizes were kept
+    size: Optional[int] = None
+
+    def __post_init__(self):
+        # names repeat a lot across large trees (e.g. "cover.jpg", "index.md")
+        self.name = sys.intern(self.name)
 
     def to_dict(self) -> dict:
-        return dict(
+        res = dict(
             type="FR",
             messageId=self.message_id,
             name=self.name,
         )
+        if self.size is not None:
+            res["size"] = self.size
+        return res
+
+    def resize(self, size: int) -> bool:
+        """Set the size of the file, returns whether it changed"""
+        if size == self.size:
+            return False
+        self.location._count(size - (self.size or 0), 0, 0, -(self.size is None))
+        self.size = size
+        TGFSDirectory._resized(self)
+        return True
+
+    def repoint(self, message_id: int) -> bool:
+        """Refer to another descriptor message, returns whether it changed"""
+        if message_id == self.message_id:
+            return False
+        old_message_id, self.message_id = self.message_id, message_id
+        TGFSDirectory._repointed(self, old_message_id)
+        return True
 
     def delete(self) -> None:
         self.location.delete_file_ref(self)
 
+    def move(self, to: "TGFSDirectory", name: Optional[str] = None) -> None:
+        self.location.move_file_ref(self, to, name or self.name)
+
+
+class TreeObserver(Protocol):
+    """
+    Notified of every change to a directory tree, after the change was made. Removed
+    nodes keep their parent pointers, so observers can still tell which tree they
+    were in.
+    """
+
+    def added(self, node: "TGFSNode") -> None: ...
+
+    def removed(self, node: "TGFSNode") -> None: ...
+
+    def moved(
+        self, node: "TGFSNode", old_location: "TGFSDirectory", old_name: str
+    ) -> None: ...
+
+    def repointed(self, fr: TGFSFileRef, old_message_id: int) -> None: ...
+
+    # a lazily loaded directory built its children and files, nothing changed
+    def loaded(self, directory: "TGFSDirectory") -> None: ...
+
+    # the tree was changed in a way the other events do not describe
+    def reset(self) -> None: ...
+
 
-@dataclass
 class TGFSDirectory:
-    name: str
-    parent: Optional["TGFSDirectory"]
-    children: list["TGFSDirectory"] = field(default_factory=list)
-    files: list[TGFSFileRef] = field(default_factory=list)
+    """
+    Directories loaded with lazy=True keep their serialized payload and only build
+    children and files on first access. Untouched subtrees serialize back to that payload.
 
-    def __post_init__(self):
-        validate_name(self.name)
+    Every directory keeps the total size, file count and directory count of everything
+    below it. They are updated along the ancestors on every change and serialized with
+    the directory, so they are known without materializing the subtree. Files of unknown
+    size are counted as well, the total size is only exact once there are none.
+
+    Every directory also keeps a subtree generation, which is replaced by a fresh
+    number whenever anything at or below it changes. No two states of any directory
+    share a number, so a response cached against it is valid as long as it matches.
+    """
+
+    __slots__ = (
+        "name",
+        "parent",
+        "_children",
+        "_files",
+        "_serialized",
+        "total_size",
+        "file_count",
+        "dir_count",
+        "unsized_count",
+        "subtree_generation",
+    )
+
+    # bumped on every change to a directory tree, lookups cached outside of the tree
+    # (e.g. the path index of DirectoryApi) are stale once it moves on
+    generation: ClassVar[int] = 0
+    # indexes maintained alongside the trees, they unregister by going away
+    observers: ClassVar["weakref.WeakSet[TreeObserver]"] = weakref.WeakSet()
+    _subtree_generations: ClassVar[Iterator[int]] = itertools.count(1)
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["TGFSDirectory"],
+        children: Optional[list["TGFSDirectory"]] = None,
+        files: Optional[list[TGFSFileRef]] = None,
+    ):
+        validate_name(name)
+        self.name = sys.intern(name)
+        self.parent = parent
+        self._children: list[TGFSDirectory] = children if children is not None else []
+        self._files: list[TGFSFileRef] = files if files is not None else []
+        self._serialized: Optional[TGFSDirectorySerialized] = None
+
+        self.total_size = self.file_count = self.dir_count = self.unsized_count = 0
+        self.subtree_generation = next(TGFSDirectory._subtree_generations)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self.name!r}, path={self.absolute_path!r})"
+
+    def _materialize(self, recursive: bool = False) -> None:
+        if (data := self._serialized) is not None:
+            self._serialized = None
+            self._files = [
+                TGFSFileRef(
+                    message_id=file["messageId"],
+                    name=file["name"],
+                    location=self,
+                    size=file.get("size"),
+                )
+                for file in data["files"] or ()
+                if file["name"] and file["messageId"]
+            ]
+            self._children = [
+                TGFSDirectory.from_dict(child, self, lazy=True)
+                for child in data["children"]
+            ]
+            for observer in list(TGFSDirectory.observers):
+                observer.loaded(self)
+        if recursive:
+            for child in self._children:
+                child._materialize(recursive=True)
+
+    @staticmethod
+    def _totals(
+        children: list["TGFSDirectory"], files: list[TGFSFileRef]
+    ) -> tuple[int, int, int, int]:
+        return (
+            sum(fr.size or 0 for fr in files)
+            + sum(child.total_size for child in children),
+            len(files) + sum(child.file_count for child in children),
+            len(children) + sum(child.dir_count for child in children),
+            sum(fr.size is None for fr in files)
+            + sum(child.unsized_count for child in children),
+        )
+
+    def _count(self, size: int, files: int, dirs: int, unsized: int = 0) -> None:
+        d: Optional[TGFSDirectory] = self
+        while d is not None:
+            d.total_size += size
+            d.file_count += files
+            d.dir_count += dirs
+            d.unsized_count += unsized
+            d = d.parent
+
+    def _recount(self) -> None:
+        # after the contents were replaced wholesale
+        size, files, dirs, unsized = self._totals(self._children, self._files)
+        self._count(
+            size - self.total_size,
+            files - self.file_count,
+            dirs - self.dir_count,
+            unsized - self.unsized_count,
+        )
+
+    def touch(self) -> None:
+        """
+        Mark the directory and its ancestors as changed, for changes the tree does not
+        see itself (e.g. a new version of one of its files)
+        """
+        generation = next(TGFSDirectory._subtree_generations)
+        d: Optional[TGFSDirectory] = self
+        while d is not None:
+            d.subtree_generation = generation
+            d = d.parent
+
+    @staticmethod
+    def _touch(node: "TGFSNode") -> None:
+        (node.location if isinstance(node, TGFSFileRef) else node).touch()
+
+    @staticmethod
+    def _changed() -> None:
+        TGFSDirectory.generation += 1
+        for observer in list(TGFSDirectory.observers):
+            observer.reset()
+
+    @staticmethod
+    def _added(node: "TGFSNode") -> None:
+        TGFSDirectory.generation += 1
+        TGFSDirectory._touch(node)
+        for observer in list(TGFSDirectory.observers):
+            observer.added(node)
+
+    @staticmethod
+    def _removed(node: "TGFSNode") -> None:
+        TGFSDirectory.generation += 1
+        # removed nodes keep their parent pointers
+        TGFSDirectory._touch(node)
+        for observer in list(TGFSDirectory.observers):
+            observer.removed(node)
+
+    @staticmethod
+    def _moved(node: "TGFSNode", old_location: "TGFSDirectory", old_name: str) -> None:
+        TGFSDirectory.generation += 1
+        old_location.touch()
+        TGFSDirectory._touch(node)
+        for observer in list(TGFSDirectory.observers):
+            observer.moved(node, old_location, old_name)
+
+    @staticmethod
+    def _resized(fr: TGFSFileRef) -> None:
+        # only the totals changed, nothing the observers index
+        TGFSDirectory.generation += 1
+        fr.location.touch()
+
+    @staticmethod
+    def _repointed(fr: TGFSFileRef, old_message_id: int) -> None:
+        TGFSDirectory.generation += 1
+        fr.location.touch()
+        for observer in list(TGFSDirectory.observers):
+            observer.repointed(fr, old_message_id)
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._serialized is None
+
+    @property
+    def children(self) -> list["TGFSDirectory"]:
+        self._materialize()
+        return self._children
+
+    @children.setter
+    def children(self, children: list["TGFSDirectory"]) -> None:
+        self._materialize()
+        self._children = children
+        self._recount()
+        self.touch()
+        self._changed()
+
+    @property
+    def files(self) -> list[TGFSFileRef]:
+        self._materialize()
+        return self._files
+
+    @files.setter
+    def files(self, files: list[TGFSFileRef]) -> None:
+        self._materialize()
+        self._files = files
+        self._recount()
+        self.touch()
+        self._changed()
+
+    def replace(self, other: "TGFSDirectory") -> None:
+        """
+        Take over the children and files of another directory, e.g. the same tree
+        loaded again, so that whoever holds this one sees the new contents
+        """
+        children, files = other.children, other.files
+        for child in children:
+            child.parent = self
+        for fr in files:
+            fr.location = self
+        self._materialize()
+        self._children, self._files = children, files
+        self._recount()
+        self.touch()
+        self._changed()
 
     @property
     def created_at_timestamp(self) -> int:
         return ts(FIRST_DAY_OF_EPOCH)
 
     def to_dict(self) -> dict:
+        if (data := self._serialized) is not None:
+            # untouched subtree, reuse the payload it was loaded from
+            return dict(data, name=self.name)
         return dict(
             type="D",
             name=self.name,
-            children=[child.to_dict() for child in self.children],
-            files=[file.to_dict() for file in self.files],
+            children=[child.to_dict() for child in self._children],
+            files=[file.to_dict() for file in self._files],
+            size=self.total_size,
+            fileCount=self.file_count,
+            dirCount=self.dir_count,
+            unsizedCount=self.unsized_count,
         )
 
+    @staticmethod
+    def _count_serialized(data: TGFSDirectorySerialized) -> None:
+        """Fill in the aggregates of a payload written before they were kept"""
+        size = files = dirs = unsized = 0
+        for file in data["files"] or ():
+            if file["name"] and file["messageId"]:
+                size += file.get("size") or 0
+                files += 1
+                unsized += "size" not in file
+        for child in data["children"]:
+            if "unsizedCount" not in child:
+                TGFSDirectory._count_serialized(child)
+            size += child["size"]
+            files += child["fileCount"]
+            dirs += child["dirCount"] + 1
+            unsized += child["unsizedCount"]
+        data["size"], data["fileCount"], data["dirCount"] = size, files, dirs
+        data["unsizedCount"] = unsized
+
     @staticmethod
     def from_dict(
-        data: TGFSDirectorySerialized, parent: Optional["TGFSDirectory"] = None
+        data: TGFSDirectorySerialized,
+        parent: Optional["TGFSDirectory"] = None,
+        lazy: bool = False,
     ) -> "TGFSDirectory":
-        d = TGFSDirectory(
-            name=data["name"],
-            parent=parent,
-            children=[],
-            files=[],
-        )
-
-        if data["files"]:
-            d.files = [
-                TGFSFileRef(message_id=file["messageId"], name=file["name"], location=d)
-                for file in data["files"]
-                if file["name"] and file["messageId"]
-            ]
-
-        d.children = [TGFSDirectory.from_dict(child, d) for child in data["children"]]
+        d = TGFSDirectory(name=data["name"], parent=parent)
+        if "unsizedCount" not in data:
+            TGFSDirectory._count_serialized(data)
+        d.total_size = data["size"]
+        d.file_count = data["fileCount"]
+        d.dir_count = data["dirCount"]
+        d.unsized_count = data["unsizedCount"]
+        d._serialized = data
+        if not lazy:
+            d._materialize(recursive=True)
         return d
 
     def create_dir(
@@ -74,16 +360,33 @@ class TGFSDirectory:
         if len(self.find_dirs([name])) > 0:
             raise FileOrDirectoryAlreadyExists(name)
 
-        child = TGFSDirectory(
-            name=name,
-            parent=self,
+        child = self._new_dir(
+            name,
             children=[] if not dir_to_copy else dir_to_copy.children,
             files=[] if not dir_to_copy else dir_to_copy.files,
         )
 
+        if dir_to_copy:
+            child.total_size = dir_to_copy.total_size
+            child.file_count = dir_to_copy.file_count
+            child.dir_count = dir_to_copy.dir_count
+            child.unsized_count = dir_to_copy.unsized_count
+
         self.children.append(child)
+        self._count(
+            child.total_size,
+            child.file_count,
+            child.dir_count + 1,
+            child.unsized_count,
+        )
+        self._added(child)
         return child
 
+    def _new_dir(
+        self, name: str, children: list["TGFSDirectory"], files: list[TGFSFileRef]
+    ) -> "TGFSDirectory":
+        return TGFSDirectory(name=name, parent=self, children=children, files=files)
+
     @classmethod
     def root_dir(cls) -> Self:
         return cls(name="root", parent=None)
@@ -91,7 +394,8 @@ class TGFSDirectory:
     def find_dirs(self, names: Iterable[str] = tuple()) -> List["TGFSDirectory"]:
         if not names:
             return self.children
-        return [child for child in self.children if child.name in frozenset(names)]
+        names = frozenset(names)
+        return [child for child in self.children if child.name in names]
 
     def find_dir(self, name: str) -> "TGFSDirectory":
         dirs = self.find_dirs([name])
@@ -102,7 +406,8 @@ class TGFSDirectory:
     def find_files(self, names: Iterable[str] = tuple()) -> List[TGFSFileRef]:
         if not names:
             return self.files
-        return [file for file in self.files if file.name in frozenset(names)]
+        names = frozenset(names)
+        return [file for file in self.files if file.name in names]
 
     def find_file(self, name: str) -> TGFSFileRef:
         files = self.find_files([name])
@@ -110,7 +415,9 @@ class TGFSDirectory:
             raise FileOrDirectoryDoesNotExist(name)
         return files[0]
 
-    def create_file_ref(self, name: str, fd_message_id: int) -> TGFSFileRef:
+    def create_file_ref(
+        self, name: str, fd_message_id: int, size: Optional[int] = None
+    ) -> TGFSFileRef:
         if self.find_files([name]):
             raise FileOrDirectoryAlreadyExists(name)
 
@@ -118,20 +425,87 @@ class TGFSDirectory:
             message_id=fd_message_id,
             name=name,
             location=self,
+            size=size,
         )
         self.files.append(fr)
+        self._count(fr.size or 0, 1, 0, fr.size is None)
+        self._added(fr)
         return fr
 
     def delete_file_ref(self, fr: TGFSFileRef) -> None:
         self.files.remove(fr)
+        self._count(-(fr.size or 0), -1, 0, -(fr.size is None))
+        self._removed(fr)
+
+    def move_file_ref(self, fr: TGFSFileRef, to: "TGFSDirectory", name: str) -> None:
+        """Rename and/or re-parent a file reference in place, keeping its descriptor"""
+        if to is self and name == fr.name:
+            return
+        if to.find_files([name]):
+            raise FileOrDirectoryAlreadyExists(name)
+
+        old_name = fr.name
+        self.files.remove(fr)
+        self._count(-(fr.size or 0), -1, 0, -(fr.size is None))
+        fr.name = sys.intern(name)
+        fr.location = to
+        to.files.append(fr)
+        to._count(fr.size or 0, 1, 0, fr.size is None)
+        self._moved(fr, self, old_name)
+
+    def move(self, to: "TGFSDirectory", name: Optional[str] = None) -> None:
+        """Rename and/or re-parent this directory in place, with everything in it"""
+        name = name or self.name
+        if self.parent is None:
+            raise MoveIntoItself(self.absolute_path or "/", to.absolute_path or "/")
+        if to is self.parent and name == self.name:
+            return
+
+        ancestor: Optional[TGFSDirectory] = to
+        while ancestor is not None:
+            if ancestor is self:
+                raise MoveIntoItself(self.absolute_path, f"{to.absolute_path}/{name}")
+            ancestor = ancestor.parent
+
+        validate_name(name)
+        if to.find_dirs([name]):
+            raise FileOrDirectoryAlreadyExists(name)
+
+        old_parent, old_name = self.parent, self.name
+        old_parent.children.remove(self)
+        old_parent._count(
+            -self.total_size,
+            -self.file_count,
+            -self.dir_count - 1,
+            -self.unsized_count,
+        )
+        self.name = sys.intern(name)
+        self.parent = to
+        to.children.append(self)
+        to._count(
+            self.total_size, self.file_count, self.dir_count + 1, self.unsized_count
+        )
+        self._moved(self, old_parent, old_name)
 
     def delete(self) -> None:
         if self.parent:
             self.parent.children.remove(self)
+            self.parent._count(
+                -self.total_size,
+                -self.file_count,
+                -self.dir_count - 1,
+                -self.unsized_count,
+            )
+            self._removed(self)
         else:
             # root directory, just clear its contents
+            removed: list[TGFSNode] = [*self.children, *self.files]
             self.children.clear()
             self.files.clear()
+            self.total_size = self.file_count = self.dir_count = 0
+            self.unsized_count = 0
+            for node in removed:
+                self._removed(node)
 
     @property
     def absolute_path(self) -> str:
@@ -142,3 +516,6 @@ class TGFSDirectory:
             if self.name
             else self.parent.absolute_path
         )
+
+
+TGFSNode = Union[TGFSDirectory, TGFSFileRef]
@@ -41,6 +41,7 @@ class TGFSFileVersion:
             id=self.id,
             updatedAt=self.updated_at_timestamp,
             messageIds=self.message_ids,
+            partSizes=self.part_sizes,
             size=self.size,
         )
 
@@ -73,11 +74,17 @@ class TGFSFileVersion:
                 message_ids = [message_id]
             else:
                 message_ids = []
+        size = data.get("size", INVALID_FILE_SIZE)
+        if (part_sizes := data.get("partSizes")) is None:
+            # written before part sizes were serialized, a single part is the whole file
+            part_sizes = [size] if len(message_ids) == 1 and size > 0 else []
+
         return TGFSFileVersion(
             id=data["id"],
             updated_at=updated_at,
+            _size=size,
             message_ids=message_ids,
-            part_sizes=[],  # part sizes are not serialized
+            part_sizes=part_sizes,
         )
 
     def set_invalid(self):
@@ -88,6 +95,9 @@ class TGFSFileVersion:
     def is_valid(self) -> bool:
         return bool(self.message_ids)
 
+    def has_part_sizes(self) -> bool:
+        return len(self.part_sizes) == len(self.message_ids)
+
 
 @dataclass
 class TGFSFileDesc:
@@ -8,9 +8,9 @@ class TGFSMetadata:
     dir: TGFSDirectory
 
     @staticmethod
-    def from_dict(data: dict) -> "TGFSMetadata":
+    def from_dict(data: dict, lazy: bool = False) -> "TGFSMetadata":
         return TGFSMetadata(
-            dir=TGFSDirectory.from_dict(data["dir"]),
+            dir=TGFSDirectory.from_dict(data["dir"], lazy=lazy),
         )
 
     def to_dict(self) -> dict:
@@ -7,6 +7,7 @@ class TGFSFileVersionSerialized(TypedDict, total=False):
     updatedAt: int
     messageId: int
     messageIds: List[int]
+    partSizes: List[int]
     size: int
 
 
@@ -20,6 +21,7 @@ class TGFSFileRefSerialized(TypedDict, total=False):
     type: Literal["FR"]
     messageId: int
     name: str
+    size: int
 
 
 class TGFSDirectorySerialized(TypedDict, total=False):
@@ -27,3 +29,9 @@ class TGFSDirectorySerialized(TypedDict, total=False):
     name: str
     children: List["TGFSDirectorySerialized"]
     files: List[TGFSFileRefSerialized]
+    # totals of everything below the directory
+    size: int
+    fileCount: int
+    dirCount: int
+    # files of unknown size among them
+    unsizedCount: int
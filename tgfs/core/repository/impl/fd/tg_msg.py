@@ -1,25 +1,66 @@
+import asyncio
+import dataclasses
 import json
 import logging
 from itertools import chain
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from tgfs.core.api import MessageApi
-from tgfs.core.model import TGFSFileDesc, TGFSFileRef
+from tgfs.core.api.integrity import IntegrityIndex
+from tgfs.core.model import TGFSFileDesc, TGFSFileRef, TGFSFileVersion
 from tgfs.core.repository.interface import (
     FDRepositoryResp,
     IFDRepository,
 )
 from tgfs.errors import MessageNotFound
+from tgfs.reqres import MessageResp
+from tgfs.utils.message_cache import MessageCache, channel_cache
 
 logger = logging.getLogger(__name__)
 
 
 class TGMsgFDRepository(IFDRepository):
-    def __init__(self, message_api: MessageApi):
+    """
+    Validated file descriptors are cached per channel by their message id. The
+    cached instances are shared and never edited, changes are made to copies (see
+    FileDescApi). A saved descriptor takes the place of its entry once the write
+    succeeded, an entry is dropped whenever its message is edited elsewhere.
+    """
+
+    def __init__(
+        self, message_api: MessageApi, integrity: Optional[IntegrityIndex] = None
+    ):
         self._message_api = message_api
+        self._integrity = integrity or IntegrityIndex()
+        # concurrent misses of the same descriptor wait for a single load, which may
+        # load other descriptors as well
+        self._loading: Dict[int, asyncio.Task[Dict[int, TGFSFileDesc]]] = {}
+
+    @property
+    def _cache(self) -> MessageCache[int, TGFSFileDesc]:
+        return channel_cache(self._message_api.private_file_channel).fd
+
+    def invalidate(self, message_id: int) -> None:
+        self._cache.invalidate(message_id)
+        # a load which is in flight may have read the old descriptor
+        self._loading.pop(message_id, None)
 
     async def save(
         self, fd: TGFSFileDesc, fr: Optional[TGFSFileRef] = None
+    ) -> FDRepositoryResp:
+        if fr is not None:
+            self.invalidate(fr.message_id)
+
+        resp = await self._write(fd, fr)
+
+        # loads which started during the write may have read the old descriptor
+        self._loading.pop(resp.message_id, None)
+        if any(version.is_valid() for version in fd.versions.values()):
+            self._cache[resp.message_id] = fd
+        return resp
+
+    async def _write(
+        self, fd: TGFSFileDesc, fr: Optional[TGFSFileRef] = None
     ) -> FDRepositoryResp:
         # If file_content referer is None, create a new file_content descriptor message.
         if fr is None:
@@ -38,25 +79,51 @@ class TGMsgFDRepository(IFDRepository):
                 fd=fd,
             )
         except MessageNotFound:
-            return await self.save(fd)
+            resp = await self._write(fd)
+            self._integrity.missing_messages.add(fr.message_id)
+            self._integrity.replaced_descriptors[fr.message_id] = resp.message_id
+            return resp
 
-    async def _validate_fv(
-        self, fd: TGFSFileDesc, include_all_versions: bool
-    ) -> TGFSFileDesc:
+    def _usable_versions(self, fd: TGFSFileDesc) -> List[TGFSFileVersion]:
         versions = fd.get_versions(exclude_invalid=True)
 
-        # Files in the channel may be deleted manually, so we need to check if the messages for the versions exist.
+        for version in versions:
+            if any(map(self._integrity.is_missing, version.message_ids)):
+                logger.warning(f"File messages of {fd.name}@{version.id} are missing")
+                version.set_invalid()
+        return [version for version in versions if version.is_valid()]
 
-        file_messages = await self._message_api.get_messages(
-            list(chain(*(version.message_ids for version in versions)))
+    @staticmethod
+    def _unsized_message_ids(versions: List[TGFSFileVersion]) -> List[int]:
+        # Versions written with their part sizes need no round trip, a part deleted from
+        # the channel manually is found by the integrity scan or noticed when it is
+        # downloaded. Older versions are checked against the channel to learn their
+        # part sizes.
+        return list(
+            chain(
+                *(
+                    version.message_ids
+                    for version in versions
+                    if not version.has_part_sizes()
+                )
+            )
         )
 
-        message_map = {msg.message_id: msg for msg in file_messages if msg}
-
+    @staticmethod
+    def _check_versions(
+        fd: TGFSFileDesc,
+        versions: List[TGFSFileVersion],
+        message_map: Dict[int, MessageResp],
+        include_all_versions: bool,
+    ) -> TGFSFileDesc:
         has_valid_version = False
 
         for i, version in enumerate(versions):
+            if not version.has_part_sizes():
+                version.part_sizes = []
             for j, message_id in enumerate(version.message_ids):
+                if version.has_part_sizes():
+                    break
                 if (
                     not (file_message := message_map.get(message_id, None))
                     or not file_message.document
@@ -75,16 +142,124 @@ class TGMsgFDRepository(IFDRepository):
 
         return fd if has_valid_version else TGFSFileDesc.empty(fd.name)
 
+    async def _get_message_map(self, message_ids: List[int]) -> Dict[int, MessageResp]:
+        if not message_ids:
+            return {}
+        messages = await self._message_api.get_messages(message_ids)
+        return {msg.message_id: msg for msg in messages if msg}
+
+    async def _validate_fv(
+        self, fd: TGFSFileDesc, include_all_versions: bool
+    ) -> TGFSFileDesc:
+        versions = self._usable_versions(fd)
+        message_map = await self._get_message_map(self._unsized_message_ids(versions))
+        return self._check_versions(fd, versions, message_map, include_all_versions)
+
     async def get(
         self, fr: TGFSFileRef, include_all_versions: bool = False
     ) -> TGFSFileDesc:
-        message = (await self._message_api.get_messages([fr.message_id]))[0]
+        if include_all_versions:
+            # cached descriptors are only validated up to their first valid version
+            return (await self._load({fr.message_id: fr}, include_all_versions))[
+                fr.message_id
+            ]
+        return (await self.get_many([fr]))[0]
+
+    async def get_many(self, frs: Sequence[TGFSFileRef]) -> List[TGFSFileDesc]:
+        fds: Dict[int, TGFSFileDesc] = {}
+        loading: Dict[int, asyncio.Task[Dict[int, TGFSFileDesc]]] = {}
+        to_load: Dict[int, TGFSFileRef] = {}
+        for fr in frs:
+            message_id = fr.message_id
+            if message_id in fds or message_id in loading or message_id in to_load:
+                continue
+            if (fd := self._cache.get(message_id)) is not None:
+                fds[message_id] = fd
+            elif (task := self._loading.get(message_id)) is not None:
+                loading[message_id] = task
+            else:
+                to_load[message_id] = fr
 
-        if not message:
-            logging.error(
-                f"File descriptor (message_id: {fr.message_id}) for {fr.name} not found"
+        if to_load:
+            # all the missing descriptors are loaded together
+            task = asyncio.create_task(self._load_and_cache(to_load))
+            for message_id in to_load:
+                self._loading[message_id] = loading[message_id] = task
+
+        for message_id, task in loading.items():
+            fds[message_id] = (await asyncio.shield(task))[message_id]
+
+        # copies of a file share the descriptor message under different names
+        return [
+            (
+                fd
+                if (fd := fds[fr.message_id]).name == fr.name
+                else dataclasses.replace(fd, name=fr.name)
             )
-            return TGFSFileDesc.empty(fr.name)
+            for fr in frs
+        ]
+
+    async def _load_and_cache(
+        self, frs: Dict[int, TGFSFileRef]
+    ) -> Dict[int, TGFSFileDesc]:
+        task = asyncio.current_task()
+        try:
+            fds = await self._load(frs, include_all_versions=False)
+        finally:
+            current = [
+                message_id
+                for message_id in frs
+                if self._loading.get(message_id) is task
+            ]
+            for message_id in current:
+                del self._loading[message_id]
 
-        fd = TGFSFileDesc.from_dict(json.loads(message.text), name=fr.name)
-        return await self._validate_fv(fd, include_all_versions)
+        # neither cache a descriptor invalidated while loading, nor a missing one
+        for message_id in current:
+            if (fd := fds[message_id]).versions:
+                self._cache[message_id] = fd
+        return fds
+
+    async def _load(
+        self, frs: Dict[int, TGFSFileRef], include_all_versions: bool
+    ) -> Dict[int, TGFSFileDesc]:
+        """
+        One request for the descriptor messages, and one for the parts of the versions
+        which have to be checked
+        """
+        ids = [
+            message_id
+            for message_id in frs
+            if not self._integrity.is_missing(message_id)
+        ]
+        messages = (
+            dict(zip(ids, await self._message_api.get_messages(ids))) if ids else {}
+        )
+
+        fds: Dict[int, TGFSFileDesc] = {}
+        to_check: List[Tuple[int, TGFSFileDesc, List[TGFSFileVersion]]] = []
+        for message_id, fr in frs.items():
+            if not (message := messages.get(message_id)):
+                logging.error(
+                    f"File descriptor (message_id: {message_id}) for {fr.name} not found"
+                )
+                fds[message_id] = TGFSFileDesc.empty(fr.name)
+                continue
+            fd = TGFSFileDesc.from_dict(json.loads(message.text), name=fr.name)
+            to_check.append((message_id, fd, self._usable_versions(fd)))
+
+        parts = await self._get_message_map(
+            list(
+                chain(
+                    *(
+                        self._unsized_message_ids(versions)
+                        for _, _, versions in to_check
+                    )
+                )
+            )
+        )
+        for message_id, fd, versions in to_check:
+            fds[message_id] = self._check_versions(
+                fd, versions, parts, include_all_versions
+            )
+        return fds
@@ -1,21 +1,54 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
 
-from github import Github
-from github.ContentFile import ContentFile
+from github import (
+    Github,
+    GithubException,
+    InputGitTreeElement,
+)
+from github.GitTree import GitTree
+from github.GitTreeElement import GitTreeElement
 
 from tgfs.config import GithubRepoConfig
 from tgfs.core.model import TGFSDirectory, TGFSMetadata
 from tgfs.core.repository.interface import IMetaDataRepository
+from tgfs.errors import FileOrDirectoryAlreadyExists
 
-from .gh_directory import GithubConfig, GithubDirectory
+from .gh_directory import (
+    GithubChange,
+    GithubChangeType,
+    GithubConfig,
+    GithubDirectory,
+)
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# entries of the trees listed during a push, by the sha of the tree and their name
+Listings = dict[str, dict[str, GitTreeElement]]
+
 
 class GithubRepoMetadataRepository(IMetaDataRepository):
+    """
+    PyGithub is blocking, so every request to GitHub runs on a small thread pool
+    instead of the event loop. Directory operations only record their changes,
+    push() writes all of them as a single commit with the git data API.
+    """
+
+    MAX_WORKERS = 2
+    MAX_PUSH_ATTEMPTS = 5
+
     def __init__(self, config: GithubRepoConfig):
         super().__init__()
 
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS, thread_name_prefix="github"
+        )
+        self._push_lock = asyncio.Lock()
+
         gh = Github(config.access_token)
 
         self._ghc = GithubConfig(
@@ -25,11 +58,206 @@ class GithubRepoMetadataRepository(IMetaDataRepository):
             commit=config.commit,
         )
 
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
     async def push(self) -> None:
-        pass
+        async with self._push_lock:
+            # changes queued while writing are picked up by the next push
+            changes = list(self._ghc.changes)
+            if changes:
+                await self._run(self._write_changes, changes)
+
+    def _write_changes(self, changes: list[GithubChange]) -> None:
+        segments = self._segments(changes)
+        repo = self._ghc.repo
+        # trees never change, their listings are good for every attempt
+        listings: Listings = {}
+
+        for attempt in range(1, self.MAX_PUSH_ATTEMPTS + 1):
+            ref = repo.get_git_ref(f"heads/{self._ghc.commit}")
+            head = repo.get_git_commit(ref.object.sha)
+
+            git_tree = head.tree
+            written: list[GithubChange] = []
+            for segment in segments:
+                git_tree = self._write_segment(segment, git_tree, written, listings)
+            if not written:
+                break
+
+            commit = repo.create_git_commit(
+                self._commit_message(written), git_tree, [head]
+            )
+            try:
+                ref.edit(commit.sha)
+                logger.info(
+                    f"Pushed {len(written)} changes to {self._ghc.repo_name} as {commit.sha}"
+                )
+                break
+            except GithubException as ex:
+                # someone else moved the branch, rebuild the commit on top of it
+                if ex.status != 422 or attempt == self.MAX_PUSH_ATTEMPTS:
+                    raise
+                logger.info(
+                    f"{self._ghc.repo_name} changed during push, retrying ({attempt})"
+                )
+
+        # the changes are only dropped once they are in the repository, so that a
+        # failed push is retried by the next one
+        del self._ghc.changes[: len(changes)]
+
+    @staticmethod
+    def _segments(changes: list[GithubChange]) -> list[list[GithubChange]]:
+        """
+        The runs of changes between directory moves, and each move on its own. A move
+        takes the tree of the directory as it is after everything before it.
+        """
+        segments: list[list[GithubChange]] = []
+        for change in changes:
+            if (
+                change.op == GithubChangeType.MOVE_DIR
+                or not segments
+                or segments[-1][0].op == GithubChangeType.MOVE_DIR
+            ):
+                segments.append([change])
+            else:
+                segments[-1].append(change)
+        return segments
+
+    def _write_segment(
+        self,
+        segment: list[GithubChange],
+        base: GitTree,
+        written: list[GithubChange],
+        listings: Listings,
+    ) -> GitTree:
+        repo = self._ghc.repo
+        if (move := segment[0]).op == GithubChangeType.MOVE_DIR:
+            if (
+                move.source is None
+                or (entry := self._lookup(base.sha, move.source, listings)) is None
+            ):
+                logger.warning(f"{move.source} does not exist in {self._ghc.repo_name}")
+                return base
+            # the existing tree is re-parented, however big it is
+            written.append(move)
+            return repo.create_git_tree(
+                [
+                    InputGitTreeElement(move.path, "040000", "tree", sha=entry.sha),
+                    InputGitTreeElement(move.source, "040000", "tree", sha=None),
+                ],
+                base,
+            )
+
+        tree = self._squash(segment)
+        try:
+            git_tree = repo.create_git_tree(self._tree_elements(tree), base)
+        except GithubException as ex:
+            # deleting a path which is not in the repository (e.g. created and
+            # deleted again before the push) fails the whole tree
+            if ex.status != 422:
+                raise
+            tree = self._drop_missing(tree, base.sha, listings)
+            if not tree:
+                return base
+            git_tree = repo.create_git_tree(self._tree_elements(tree), base)
+        written.extend(GithubChange(op, path) for path, op in tree.items())
+        return git_tree
+
+    def _lookup(
+        self, tree_sha: str, path: str, listings: Listings
+    ) -> Optional[GitTreeElement]:
+        """The entry at a path below a tree, listing one level at a time"""
+        entry = None
+        for name in path.split("/"):
+            if entry is not None:
+                if entry.type != "tree":
+                    return None
+                tree_sha = entry.sha
+            if (entries := listings.get(tree_sha)) is None:
+                entries = listings[tree_sha] = {
+                    e.path: e for e in self._ghc.repo.get_git_tree(tree_sha).tree
+                }
+            if (entry := entries.get(name)) is None:
+                return None
+        return entry
+
+    @staticmethod
+    def _squash(changes: list[GithubChange]) -> dict[str, GithubChangeType]:
+        """
+        Reduce the changes to the final operation on each path. A directory can be
+        deleted and created again in the same push, so deletions come before the
+        creations which may land under them.
+        """
+        tree: dict[str, GithubChangeType] = {}
+        for change in changes:
+            if change.op == GithubChangeType.DELETE_DIR:
+                prefix = f"{change.path}/"
+                for path in [p for p in tree if p.startswith(prefix)]:
+                    del tree[path]
+            tree.pop(change.path, None)
+
+            if change.op != GithubChangeType.CREATE and any(
+                tree.get(ancestor) == GithubChangeType.DELETE_DIR
+                for ancestor in GithubRepoMetadataRepository._ancestors(change.path)
+            ):
+                # already gone with the deleted directory
+                continue
+            tree[change.path] = change.op
+
+        return dict(
+            sorted(tree.items(), key=lambda item: item[1] == GithubChangeType.CREATE)
+        )
+
+    @staticmethod
+    def _ancestors(path: str) -> list[str]:
+        parts = path.split("/")
+        return ["/".join(parts[:i]) for i in range(1, len(parts))]
+
+    @staticmethod
+    def _tree_elements(tree: dict[str, GithubChangeType]) -> list[InputGitTreeElement]:
+        elements = []
+        for path, op in tree.items():
+            if op == GithubChangeType.CREATE:
+                elements.append(InputGitTreeElement(path, "100644", "blob", content=""))
+            elif op == GithubChangeType.DELETE:
+                elements.append(InputGitTreeElement(path, "100644", "blob", sha=None))
+            else:
+                elements.append(InputGitTreeElement(path, "040000", "tree", sha=None))
+        return elements
+
+    def _drop_missing(
+        self, tree: dict[str, GithubChangeType], tree_sha: str, listings: Listings
+    ) -> dict[str, GithubChangeType]:
+        result = {}
+        for path, op in tree.items():
+            if (
+                op != GithubChangeType.CREATE
+                and self._lookup(tree_sha, path, listings) is None
+            ):
+                logger.warning(f"{path} does not exist in {self._ghc.repo_name}")
+                continue
+            result[path] = op
+        return result
+
+    @staticmethod
+    def _commit_message(changes: list[GithubChange]) -> str:
+        if len(changes) == 1:
+            change = changes[0]
+            if change.op == GithubChangeType.MOVE_DIR:
+                return f"Move {change.source} to {change.path}"
+            if change.op == GithubChangeType.CREATE:
+                return f"Create {change.path}"
+            return f"Delete {change.path}"
+        return f"Update {len(changes)} paths"
 
     async def get(self) -> TGFSMetadata:
-        root_dir = self._build_directory_structure()
+        root_dir = await self._run(self._build_directory_structure)
+        # built without notifications, whatever was indexed against an older tree is
+        # reset here on the event loop
+        TGFSDirectory._changed()
         return TGFSMetadata(dir=root_dir)
 
     def _build_directory_structure(self) -> GithubDirectory:
@@ -38,47 +266,67 @@ class GithubRepoMetadataRepository(IMetaDataRepository):
         )
 
         try:
-            contents = self._ghc.repo.get_contents("", ref=self._ghc.commit)
-            self._process_contents(contents, root)
+            self._load_tree(self._ghc.commit, root)
         except Exception as ex:
             logger.error(ex)
 
         return root
 
-    def _create_child_dir(
-        self, name: str, parent_dir: GithubDirectory
-    ) -> GithubDirectory:
-        child_dir = GithubDirectory(self._ghc, name, parent_dir)
-        parent_dir.children.append(child_dir)
-        return child_dir
-
-    def _process_contents(
-        self, contents: list[ContentFile] | ContentFile, parent_dir: GithubDirectory
-    ) -> None:
-        if not isinstance(contents, list):
-            contents = [contents]
+    def _load_tree(self, sha: str, parent_dir: GithubDirectory) -> None:
+        """
+        Load the whole namespace under a tree with a single recursive git/trees call.
+        GitHub truncates very large listings, in which case the tree is listed one level
+        at a time and each subtree is loaded the same way.
+        """
+        tree = self._ghc.repo.get_git_tree(sha, recursive=True)
+        if not tree.truncated:
+            self._process_tree(tree.tree, parent_dir)
+            return
 
-        for content in contents:
-            if content.type == "dir":
-                child_dir = self._create_child_dir(content.name, parent_dir)
+        logger.info(
+            f"Tree listing of {parent_dir._github_path or '/'} is truncated, loading it level by level"
+        )
+        for element in self._ghc.repo.get_git_tree(sha).tree:
+            if element.type == "tree":
+                child_dir = parent_dir.create_dir_skip_github_ops(element.path)
                 try:
-                    child_contents = self._ghc.repo.get_contents(
-                        content.path, ref=self._ghc.commit
-                    )
-                    self._process_contents(child_contents, child_dir)
+                    self._load_tree(element.sha, child_dir)
                 except Exception as ex:
                     logger.warning(
-                        f"Failed to construct directory {content.name}: {ex}"
-                    )
-            elif content.type == "file":
-                try:
-                    if content.name == ".gitkeep":
-                        continue
-                    file_name, message_id = content.name.rsplit(".", 1)
-                    TGFSDirectory.create_file_ref(
-                        parent_dir, file_name, int(message_id)
-                    )
-                except ValueError:
-                    logger.warning(
-                        f"Invalid name format for {content.name}, expected a format like 'name.message_id'"
+                        f"Failed to construct directory {element.path}: {ex}"
                     )
+            elif element.type == "blob":
+                self._create_file_ref(element.path, parent_dir)
+
+    def _process_tree(
+        self, elements: list[GitTreeElement], root: GithubDirectory
+    ) -> None:
+        dirs = {"": root}
+
+        def dir_at(path: str) -> GithubDirectory:
+            if (d := dirs.get(path)) is None:
+                parent_path, _, name = path.rpartition("/")
+                d = dirs[path] = dir_at(parent_path).create_dir_skip_github_ops(name)
+            return d
+
+        for element in elements:
+            parent_path, _, name = element.path.rpartition("/")
+            if element.type == "tree":
+                dir_at(element.path)
+            elif element.type == "blob":
+                self._create_file_ref(name, dir_at(parent_path))
+
+    @staticmethod
+    def _create_file_ref(name: str, parent_dir: GithubDirectory) -> None:
+        if name == ".gitkeep":
+            return
+        try:
+            file_name, message_id = name.rsplit(".", 1)
+            # the file already exists in the repository
+            parent_dir.create_file_ref_skip_github_ops(file_name, int(message_id))
+        except ValueError:
+            logger.warning(
+                f"Invalid name format for {name}, expected a format like 'name.message_id'"
+            )
+        except FileOrDirectoryAlreadyExists:
+            logger.warning(f"Duplicated file reference {name}, ignored")
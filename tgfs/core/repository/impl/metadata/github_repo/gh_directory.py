@@ -1,13 +1,27 @@
-import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from enum import Enum
 from typing import Optional
 
 from github import Github
 from github.Repository import Repository
 
 from tgfs.core.model import TGFSDirectory, TGFSFileRef
+from tgfs.errors import FileOrDirectoryAlreadyExists
 
-logger = logging.getLogger(__name__)
+
+class GithubChangeType(Enum):
+    CREATE = "create"
+    DELETE = "delete"
+    DELETE_DIR = "delete_dir"
+    MOVE_DIR = "move_dir"
+
+
+@dataclass(frozen=True)
+class GithubChange:
+    op: GithubChangeType
+    path: str
+    # where a moved directory was
+    source: Optional[str] = None
 
 
 @dataclass
@@ -16,9 +30,14 @@ class GithubConfig:
     repo_name: str
     repo: Repository
     commit: str
+    # changes made to the directory tree which are not yet in the repository,
+    # they are written by GithubRepoMetadataRepository.push off the event loop
+    changes: list[GithubChange] = field(default_factory=list)
 
 
 class GithubDirectory(TGFSDirectory):
+    __slots__ = ("_ghc",)
+
     def __init__(
         self,
         ghc: GithubConfig,
@@ -48,123 +67,78 @@ class GithubDirectory(TGFSDirectory):
 
         return self.join_path(parent_path, self.name)
 
+    # The two below build a tree which is loaded from the repository, off the event
+    # loop. Nothing is queued and nobody is notified, the tree is published as a
+    # whole once it is complete.
+
     def create_dir_skip_github_ops(self, name: str) -> "GithubDirectory":
         res = GithubDirectory(self._ghc, name, self)
         self.children.append(res)
+        self._count(0, 0, 1)
         return res
 
-    def create_dir(
-        self, name: str, dir_to_copy: Optional[TGFSDirectory] = None
-    ) -> "GithubDirectory":
-        child = super().create_dir(name, dir_to_copy)
+    def create_file_ref_skip_github_ops(self, name: str, message_id: int) -> None:
+        if self.find_files([name]):
+            raise FileOrDirectoryAlreadyExists(name)
+        # the repository only keeps names and message ids, sizes are not persisted
+        self.files.append(TGFSFileRef(message_id=message_id, name=name, location=self))
+        self._count(0, 1, 0, 1)
 
-        # Create directory in GitHub by creating a placeholder file
-        dir_path = self.join_path(self._github_path, name, ".gitkeep")
-        try:
-            self._ghc.repo.create_file(
-                path=dir_path,
-                message=f"Create directory {name}",
-                content="",
-                branch=self._ghc.commit,
-            )
-            logger.info(f"Created directory {name} in GitHub repository at {dir_path}")
-        except Exception as ex:
-            logger.error(f"Failed to create directory {name} in GitHub: {ex}")
-            self.children.remove(child)
-            raise
-
-        # Convert the child to GithubDirectory
-        github_child = GithubDirectory(
-            ghc=self._ghc,
-            name=child.name,
-            parent=self,
-            children=child.children,
-            files=child.files,
+    def _queue(self, op: GithubChangeType, *parts: str) -> None:
+        self._ghc.changes.append(
+            GithubChange(op, self.join_path(self._github_path, *parts))
         )
 
-        # Replace the child in the parent's children list
-        child_index = self.children.index(child)
-        self.children[child_index] = github_child
+    def _queue_subtree(self, d: TGFSDirectory, *parts: str) -> None:
+        self._queue(GithubChangeType.CREATE, *parts, ".gitkeep")
+        for fr in d.files:
+            self._queue(GithubChangeType.CREATE, *parts, f"{fr.name}.{fr.message_id}")
+        for child in d.children:
+            self._queue_subtree(child, *parts, child.name)
 
-        return github_child
+    def _new_dir(
+        self, name: str, children: list[TGFSDirectory], files: list[TGFSFileRef]
+    ) -> "GithubDirectory":
+        return GithubDirectory(self._ghc, name, self, children, files)
+
+    def create_dir(
+        self, name: str, dir_to_copy: Optional[TGFSDirectory] = None
+    ) -> TGFSDirectory:
+        child = super().create_dir(name, dir_to_copy)
+        # Directories are kept in GitHub with a placeholder file
+        self._queue_subtree(child, name)
+        return child
+
+    def move(self, to: TGFSDirectory, name: Optional[str] = None) -> None:
+        old_path = self._github_path
+        super().move(to, name)
+        if self._github_path != old_path:
+            # the tree of the directory is re-parented as a whole on push
+            self._ghc.changes.append(
+                GithubChange(GithubChangeType.MOVE_DIR, self._github_path, old_path)
+            )
 
     def delete(self) -> None:
         if self.parent:
-            # Remove all files and subdirectories from GitHub
-            self._delete_github_directory()
+            self._queue(GithubChangeType.DELETE_DIR)
         super().delete()
 
-    def create_file_ref(self, name: str, file_message_id: int) -> TGFSFileRef:
-        file_ref = super().create_file_ref(name, file_message_id)
-
-        # Create file reference in GitHub
-        file_path = self.join_path(self._github_path, f"{name}.{file_message_id}")
-        try:
-            self._ghc.repo.create_file(
-                path=file_path,
-                message=f"Create file reference for {name}",
-                content="",
-                branch=self._ghc.commit,
-            )
-            logger.info(
-                f"Created file reference {name} in {self._ghc.repo_name} at {file_path}"
-            )
-        except Exception as ex:
-            logger.error(
-                f"Failed to create file reference {name} in {self._ghc.repo_name}: {ex}"
-            )
-            self.files.remove(file_ref)
-            raise
-
+    def create_file_ref(
+        self, name: str, file_message_id: int, size: Optional[int] = None
+    ) -> TGFSFileRef:
+        # the repository only keeps names and message ids, sizes are not persisted
+        file_ref = super().create_file_ref(name, file_message_id, size)
+        self._queue(GithubChangeType.CREATE, f"{name}.{file_message_id}")
         return file_ref
 
     def delete_file_ref(self, fr: TGFSFileRef) -> None:
-        # Remove file reference from GitHub
-        file_path = self.join_path(self._github_path, f"{fr.name}.{fr.message_id}")
-        try:
-            file_content = self._ghc.repo.get_contents(file_path, ref=self._ghc.commit)
-            if isinstance(file_content, list):
-                file_content = file_content[0]
-            self._ghc.repo.delete_file(
-                path=file_path,
-                message=f"Delete file reference for {fr.name}",
-                sha=file_content.sha,
-                branch=self._ghc.commit,
-            )
-            logger.info(f"Deleted file reference {fr.name} from {self._ghc.repo_name}")
-        except Exception as ex:
-            logger.error(
-                f"Failed to delete file reference {fr.name} from {self._ghc.repo_name}: {ex}"
-            )
-
         super().delete_file_ref(fr)
-
-    def _delete_github_directory(self) -> None:
-        """Delete all contents of this directory from GitHub"""
-        try:
-            # Get all contents in this directory
-            contents = self._ghc.repo.get_contents(
-                self._github_path, ref=self._ghc.commit
-            )
-            if not isinstance(contents, list):
-                contents = [contents]
-
-            # Delete all files and subdirectories
-            for content in contents:
-                try:
-                    self._ghc.repo.delete_file(
-                        path=content.path,
-                        message=f"Delete {content.path}",
-                        sha=content.sha,
-                        branch=self._ghc.commit,
-                    )
-                    logger.info(f"Deleted {content.path} from {self._ghc.repo_name}")
-                except Exception as ex:
-                    logger.error(
-                        f"Failed to delete {content.path} from {self._ghc.repo_name}: {ex}"
-                    )
-
-        except Exception as ex:
-            logger.error(
-                f"Failed to delete directory {self._github_path} from {self._ghc.repo_name}: {ex}"
-            )
+        self._queue(GithubChangeType.DELETE, f"{fr.name}.{fr.message_id}")
+
+    def move_file_ref(self, fr: TGFSFileRef, to: TGFSDirectory, name: str) -> None:
+        old_name = fr.name
+        super().move_file_ref(fr, to, name)
+        if fr.location is not self or fr.name != old_name:
+            self._queue(GithubChangeType.DELETE, f"{old_name}.{fr.message_id}")
+            if isinstance(to, GithubDirectory):
+                to._queue(GithubChangeType.CREATE, f"{fr.name}.{fr.message_id}")
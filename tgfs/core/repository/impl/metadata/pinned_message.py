@@ -1,5 +1,6 @@
+import hashlib
 import json
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, Optional, Tuple
 
 from tgfs.core.api import MessageApi
 from tgfs.core.model import TGFSDirectory, TGFSFileVersion, TGFSMetadata
@@ -25,12 +26,34 @@ class TGMsgMetadataRepository(IMetaDataRepository):
         self._fc_repo = fc_repo
 
         self._message_id: Optional[int] = None
+        # digest of the last metadata written, edits of the metadata message made by
+        # this server come back as updates as well and are told apart by content
+        self._pushed_digest: Optional[bytes] = None
 
     async def push(self) -> None:
         if not self.metadata:
             raise MetadataNotInitialized()
+        await self._push(self.metadata)
 
-        buffer = json.dumps(self.metadata.to_dict()).encode()
+    async def on_message_edited(self, message_id: int) -> bool:
+        if message_id != self._message_id:
+            return False
+        pinned_message, buffer = await self._read()
+        if hashlib.sha256(buffer).digest() == self._pushed_digest:
+            return False
+
+        metadata = self._parse(buffer)
+        self._message_id = pinned_message.message_id
+        if self.metadata is None:
+            self.metadata = metadata
+        else:
+            # operations in flight keep working on the same root
+            self.metadata.dir.replace(metadata.dir)
+        return True
+
+    async def _push(self, metadata: TGFSMetadata) -> None:
+        buffer = json.dumps(metadata.to_dict()).encode()
+        self._pushed_digest = hashlib.sha256(buffer).digest()
         if self._message_id is not None:
             await self._fc_repo.update(
                 self._message_id,
@@ -62,7 +85,7 @@ class TGMsgMetadataRepository(IMetaDataRepository):
         await self.push()
         return await self._message_api.get_pinned_message()
 
-    async def get(self) -> TGFSMetadata:
+    async def _read(self) -> Tuple[MessageRespWithDocument, bytes]:
         try:
             pinned_message = await self._message_api.get_pinned_message()
         except NoPinnedMessage:
@@ -71,19 +94,22 @@ class TGMsgMetadataRepository(IMetaDataRepository):
         temp_fv = TGFSFileVersion.from_sent_file_message(
             SentFileMessage(pinned_message.message_id, pinned_message.document.size)
         )
-
-        metadata = TGFSMetadata.from_dict(
-            json.loads(
-                await self._read_all(
-                    await self._fc_repo.get(
-                        temp_fv,
-                        begin=0,
-                        end=-1,
-                        name=self.METADATA_FILE_NAME,
-                    )
-                )
+        buffer = await self._read_all(
+            await self._fc_repo.get(
+                temp_fv,
+                begin=0,
+                end=-1,
+                name=self.METADATA_FILE_NAME,
             )
         )
+        return pinned_message, buffer
 
+    @staticmethod
+    def _parse(buffer: bytes) -> TGFSMetadata:
+        return TGFSMetadata.from_dict(json.loads(buffer), lazy=True)
+
+    async def get(self) -> TGFSMetadata:
+        pinned_message, buffer = await self._read()
+        metadata = self._parse(buffer)
         self._message_id = pinned_message.message_id
         return metadata
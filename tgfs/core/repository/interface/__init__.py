@@ -1,6 +1,7 @@
+import asyncio
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from tgfs.core.model import (
     TGFSDirectory,
@@ -50,6 +51,9 @@ class IFDRepository(metaclass=ABCMeta):
     async def get(self, fr: TGFSFileRef) -> TGFSFileDesc:
         pass
 
+    async def get_many(self, frs: Sequence[TGFSFileRef]) -> List[TGFSFileDesc]:
+        return list(await asyncio.gather(*(self.get(fr) for fr in frs)))
+
 
 class IMetaDataRepository(metaclass=ABCMeta):
     def __init__(self):
@@ -66,6 +70,13 @@ class IMetaDataRepository(metaclass=ABCMeta):
     async def get(self) -> TGFSMetadata:
         pass
 
+    async def on_message_edited(self, message_id: int) -> bool:
+        """
+        A message of the file channel was edited elsewhere. Reload the metadata if it
+        is kept in that message, returns whether it was reloaded.
+        """
+        return False
+
     def root(self) -> TGFSDirectory:
         if not self.metadata:
             raise MetadataNotInitialized
@@ -5,6 +5,7 @@ from .path import (
     FileOrDirectoryDoesNotExist,
     InvalidName,
     InvalidPath,
+    MoveIntoItself,
 )
 from .telegram import FileSizeTooLarge, MessageNotFound
 from .tgfs import (
@@ -25,6 +26,7 @@ __all__ = [
     "FileOrDirectoryDoesNotExist",
     "InvalidName",
     "InvalidPath",
+    "MoveIntoItself",
     "FileSizeTooLarge",
     "MessageNotFound",
     "MetadataNotFound",
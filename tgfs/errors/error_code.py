@@ -21,3 +21,4 @@ class ErrorCode(Enum):
     TASK_CANCELLED = 16
     LOGIN_FAILED = 17
     DUPLICATED_CHANNEL_ID_OR_NAME = 18
+    MOVE_INTO_ITSELF = 19
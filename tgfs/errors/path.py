@@ -59,3 +59,14 @@ class DirectoryIsNotEmpty(BusinessError):
             cause=message,
             http_error=HTTPStatus.BAD_REQUEST,
         )
+
+
+class MoveIntoItself(BusinessError):
+    def __init__(self, path: str, destination: str):
+        message = f"Cannot move '{path}' into itself: '{destination}'"
+        super().__init__(
+            message=message,
+            code=ErrorCode.MOVE_INTO_ITSELF,
+            cause=message,
+            http_error=HTTPStatus.BAD_REQUEST,
+        )
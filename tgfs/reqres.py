@@ -1,12 +1,13 @@
 import os
 from dataclasses import dataclass, field
+from enum import Enum
 from io import IOBase
 from typing import AsyncIterator, List, Optional, Tuple
 
 from tgfs.tasks.integrations import TaskTracker
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     message_id: int
 
@@ -26,7 +27,7 @@ class GetMessagesReq(Chat):
     message_ids: Tuple[int, ...]
 
 
-@dataclass
+@dataclass(slots=True)
 class Document:
     size: int
     id: int
@@ -35,13 +36,13 @@ class Document:
     mime_type: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageResp(Message):
     text: str
     document: Optional[Document]
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageRespWithDocument(MessageResp):
     document: Document
 
@@ -121,6 +122,18 @@ class DownloadFileReq(Chat, Message):
     end: int
 
 
+class UpdateKind(Enum):
+    NEW_MESSAGE = "new_message"
+    MESSAGE_EDITED = "message_edited"
+    MESSAGES_DELETED = "messages_deleted"
+
+
+@dataclass
+class ChannelUpdate(Chat):
+    kind: UpdateKind
+    message_ids: Tuple[int, ...]
+
+
 FileContent = AsyncIterator[bytes]
 
 
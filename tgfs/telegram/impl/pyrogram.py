@@ -3,8 +3,9 @@ import logging
 import os
 from typing import List, Optional, Sequence, TypeVar
 
-from pyrogram import Client, file_id
+from pyrogram import Client, file_id, filters
 from pyrogram import enums as e
+from pyrogram import handlers as h
 from pyrogram import types as t
 from pyrogram.raw import functions as rf
 from pyrogram.raw import types as rt
@@ -12,6 +13,7 @@ from pyrogram.raw import types as rt
 from tgfs.config import Config
 from tgfs.errors import TechnicalError, UnDownloadableMessage
 from tgfs.reqres import (
+    ChannelUpdate,
     Document,
     DownloadFileReq,
     DownloadFileResp,
@@ -32,8 +34,9 @@ from tgfs.reqres import (
     SendFileReq,
     SendMessageResp,
     SendTextReq,
+    UpdateKind,
 )
-from tgfs.telegram.interface import ITDLibClient
+from tgfs.telegram.interface import ITDLibClient, UpdateHandler
 from tgfs.utils.message_cache import channel_cache
 from tgfs.utils.others import exclude_none
 
@@ -63,7 +66,8 @@ class PyrogramAPI(ITDLibClient):
         res = GetMessagesResp()
 
         for m in messages:
-            if not m:
+            # pyrogram returns deleted messages as empty ones
+            if not m or m.empty:
                 res.append(None)
                 continue
 
@@ -90,6 +94,7 @@ class PyrogramAPI(ITDLibClient):
 
     async def get_messages(self, req: GetMessagesReq) -> GetMessagesResp:
         cache = channel_cache(req.chat).id
+        await cache.load(req.message_ids)
         if message_id_to_fetch := cache.find_nonexistent(req.message_ids):
             if not (
                 fetched_messages := await self._client.get_messages(
@@ -103,17 +108,25 @@ class PyrogramAPI(ITDLibClient):
             if isinstance(fetched_messages, t.Message):
                 fetched_messages = [fetched_messages]
 
-            for message in exclude_none(self._transform_messages(fetched_messages)):
-                cache[message.message_id] = message
+            fetched = {
+                message.message_id: message
+                for message in exclude_none(self._transform_messages(fetched_messages))
+            }
+            for message_id in message_id_to_fetch:
+                if (message := fetched.get(message_id)) is not None:
+                    cache[message_id] = message
+                else:
+                    cache.mark_deleted(message_id)
 
         return GetMessagesResp(cache.gets(req.message_ids))
 
     async def send_text(self, req: SendTextReq) -> SendMessageResp:
         message = await self._client.send_message(chat_id=req.chat, text=req.text)
+        channel_cache(req.chat).search.clear()
         return SendMessageResp(message_id=message.id)
 
     async def edit_message_text(self, req: EditMessageTextReq) -> SendMessageResp:
-        channel_cache(req.chat).id[req.message_id] = None
+        channel_cache(req.chat).invalidate(req.message_id)
         message = await self._client.edit_message_text(
             chat_id=req.chat,
             message_id=req.message_id,
@@ -122,7 +135,7 @@ class PyrogramAPI(ITDLibClient):
         return SendMessageResp(message_id=message.id)
 
     async def edit_message_media(self, req: EditMessageMediaReq) -> Message:
-        channel_cache(req.chat).id[req.message_id] = None
+        channel_cache(req.chat).invalidate(req.message_id)
 
         updates: rt.Updates = await self._client.invoke(
             rf.messages.EditMessage(
@@ -217,6 +230,7 @@ class PyrogramAPI(ITDLibClient):
             )
         )
         update = assert_update(updates, rt.UpdateMessageID)
+        channel_cache(req.chat).search.clear()
         return SendMessageResp(message_id=update.id)
 
     async def send_small_file(self, req: SendFileReq) -> SendMessageResp:
@@ -238,6 +252,7 @@ class PyrogramAPI(ITDLibClient):
             )
         )
         update = assert_update(updates, rt.UpdateMessageID)
+        channel_cache(req.chat).search.clear()
         return SendMessageResp(message_id=update.id)
 
     async def download_file(self, req: DownloadFileReq) -> DownloadFileResp:
@@ -287,6 +302,25 @@ class PyrogramAPI(ITDLibClient):
                 return channel.channel_id
             raise TechnicalError(f"Invalid channel id {channel_id}")
 
+    def subscribe(self, chat: int, handler: UpdateHandler) -> None:
+        async def on_new_message(_: Client, message: t.Message) -> None:
+            await handler(ChannelUpdate(chat, UpdateKind.NEW_MESSAGE, (message.id,)))
+
+        async def on_message_edited(_: Client, message: t.Message) -> None:
+            await handler(ChannelUpdate(chat, UpdateKind.MESSAGE_EDITED, (message.id,)))
+
+        async def on_messages_deleted(_: Client, messages: List[t.Message]) -> None:
+            await handler(
+                ChannelUpdate(
+                    chat, UpdateKind.MESSAGES_DELETED, tuple(m.id for m in messages)
+                )
+            )
+
+        in_chat = filters.chat(chat)
+        self._client.add_handler(h.MessageHandler(on_new_message, in_chat))
+        self._client.add_handler(h.EditedMessageHandler(on_message_edited, in_chat))
+        self._client.add_handler(h.DeletedMessagesHandler(on_messages_deleted, in_chat))
+
     async def _get_me(self) -> GetMeResp:
         me = await self._client.get_me()
         return GetMeResp(
@@ -4,17 +4,19 @@ import os
 from getpass import getpass
 from typing import List, Optional, Sequence
 
-from telethon import TelegramClient
+from telethon import TelegramClient, events
 from telethon import functions as tlf
 from telethon import types as tlt
 from telethon.errors import SessionPasswordNeededError
 from telethon.helpers import TotalList
 from telethon.sessions import StringSession
 from telethon.tl.types import InputDocumentFileLocation, PeerChannel
+from telethon.utils import get_peer_id
 
 from tgfs.config import Config
 from tgfs.errors import TechnicalError, UnDownloadableMessage
 from tgfs.reqres import (
+    ChannelUpdate,
     Document,
     DownloadFileReq,
     DownloadFileResp,
@@ -35,8 +37,9 @@ from tgfs.reqres import (
     SendFileReq,
     SendMessageResp,
     SendTextReq,
+    UpdateKind,
 )
-from tgfs.telegram.interface import ITDLibClient
+from tgfs.telegram.interface import ITDLibClient, UpdateHandler
 from tgfs.utils.message_cache import channel_cache
 from tgfs.utils.others import exclude_none
 
@@ -92,13 +95,21 @@ class TelethonAPI(ITDLibClient):
 
     async def get_messages(self, req: GetMessagesReq) -> GetMessagesResp:
         cache = channel_cache(req.chat).id
+        await cache.load(req.message_ids)
         if message_id_to_fetch := cache.find_nonexistent(req.message_ids):
             fetched_messages = await self.__get_messages(
                 entity=PeerChannel(channel_id=req.chat), ids=message_id_to_fetch
             )
 
-            for message in exclude_none(self._transform_messages(fetched_messages)):
-                cache[message.message_id] = message
+            fetched = {
+                message.message_id: message
+                for message in exclude_none(self._transform_messages(fetched_messages))
+            }
+            for message_id in message_id_to_fetch:
+                if (message := fetched.get(message_id)) is not None:
+                    cache[message_id] = message
+                else:
+                    cache.mark_deleted(message_id)
 
         return GetMessagesResp(cache.gets(req.message_ids))
 
@@ -106,10 +117,11 @@ class TelethonAPI(ITDLibClient):
         message = await self._client.send_message(
             entity=PeerChannel(channel_id=req.chat), message=req.text
         )
+        channel_cache(req.chat).search.clear()
         return SendMessageResp(message_id=message.id)
 
     async def edit_message_text(self, req: EditMessageTextReq) -> SendMessageResp:
-        channel_cache(req.chat).id[req.message_id] = None
+        channel_cache(req.chat).invalidate(req.message_id)
         message = await self._client.edit_message(
             entity=PeerChannel(channel_id=req.chat),
             message=req.message_id,
@@ -118,7 +130,7 @@ class TelethonAPI(ITDLibClient):
         return SendMessageResp(message_id=message.id)
 
     async def edit_message_media(self, req: EditMessageMediaReq) -> Message:
-        channel_cache(req.chat).id[req.message_id] = None
+        channel_cache(req.chat).invalidate(req.message_id)
         message = await self._client.edit_message(
             entity=PeerChannel(channel_id=req.chat),
             message=req.message_id,
@@ -198,6 +210,7 @@ class TelethonAPI(ITDLibClient):
         )
         if not isinstance(message, tlt.Message):
             raise TechnicalError("Unexpected response type from send_file")
+        channel_cache(req.chat).search.clear()
         return SendMessageResp(message_id=message.id)
 
     async def send_small_file(self, req: SendFileReq) -> SendMessageResp:
@@ -215,6 +228,7 @@ class TelethonAPI(ITDLibClient):
         )
         if not isinstance(message, tlt.Message):
             raise TechnicalError("Unexpected response type from send_file")
+        channel_cache(req.chat).search.clear()
         return SendMessageResp(message_id=message.id)
 
     async def download_file(self, req: DownloadFileReq) -> DownloadFileResp:
@@ -266,6 +280,34 @@ class TelethonAPI(ITDLibClient):
                 raise TechnicalError("Expected a Telegram channel")
             return entity.id
 
+    def subscribe(self, chat: int, handler: UpdateHandler) -> None:
+        chats = [get_peer_id(PeerChannel(channel_id=chat))]
+
+        async def on_new_message(event: events.NewMessage.Event) -> None:
+            await handler(
+                ChannelUpdate(chat, UpdateKind.NEW_MESSAGE, (event.message.id,))
+            )
+
+        async def on_message_edited(event: events.MessageEdited.Event) -> None:
+            await handler(
+                ChannelUpdate(chat, UpdateKind.MESSAGE_EDITED, (event.message.id,))
+            )
+
+        async def on_messages_deleted(event: events.MessageDeleted.Event) -> None:
+            await handler(
+                ChannelUpdate(
+                    chat, UpdateKind.MESSAGES_DELETED, tuple(event.deleted_ids)
+                )
+            )
+
+        self._client.add_event_handler(on_new_message, events.NewMessage(chats=chats))
+        self._client.add_event_handler(
+            on_message_edited, events.MessageEdited(chats=chats)
+        )
+        self._client.add_event_handler(
+            on_messages_deleted, events.MessageDeleted(chats=chats)
+        )
+
     async def _get_me(self) -> GetMeResp:
         me = await self._client.get_me()
         if not isinstance(me, tlt.User):
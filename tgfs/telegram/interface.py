@@ -1,9 +1,10 @@
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
 from itertools import cycle
-from typing import Optional, Sequence
+from typing import Awaitable, Callable, Optional, Sequence
 
 from tgfs.reqres import (
+    ChannelUpdate,
     DownloadFileReq,
     DownloadFileResp,
     EditMessageMediaReq,
@@ -24,6 +25,8 @@ from tgfs.reqres import (
     SendTextReq,
 )
 
+UpdateHandler = Callable[[ChannelUpdate], Awaitable[None]]
+
 
 class ITDLibClient(metaclass=ABCMeta):
     def __init__(self):
@@ -83,6 +86,11 @@ class ITDLibClient(metaclass=ABCMeta):
     async def resolve_channel_id(self, channel_id: str) -> int:
         pass
 
+    @abstractmethod
+    def subscribe(self, chat: int, handler: UpdateHandler) -> None:
+        """Call the handler with the new, edited and deleted messages of a chat"""
+        pass
+
     @abstractmethod
     async def _get_me(self) -> GetMeResp:
         pass
@@ -0,0 +1,30 @@
+import bisect
+from typing import Dict, Sequence
+
+
+class Histogram:
+    """
+    Cumulative histogram over fixed bucket upper bounds, in the shape of a
+    Prometheus histogram: the count of each bucket includes all smaller ones.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        # one extra slot for the values above the largest bound (+Inf)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        cumulative: Dict[str, int] = {}
+        total = 0
+        for bound, count in zip(self.buckets, self._counts):
+            total += count
+            cumulative[f"{bound:g}"] = total
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
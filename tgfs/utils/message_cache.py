@@ -1,50 +1,305 @@
-from collections import defaultdict
+import sys
+import time
 from dataclasses import dataclass
-from typing import DefaultDict, Generic, Iterable, List, Optional, Tuple, TypeVar
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from lru import LRU  # type: ignore
 
+from tgfs.config import MessageCacheConfig
 from tgfs.reqres import MessageResp
+from tgfs.utils.message_store import ChannelMessageStore, MessageStore
+
+if TYPE_CHECKING:
+    from tgfs.core.model import TGFSFileDesc
 
 K = TypeVar("K")
 V = TypeVar("V")
 
 
+def message_size(message: Optional[MessageResp]) -> int:
+    """Approximate memory held by a cached message"""
+    if message is None:
+        return 0
+    size = sys.getsizeof(message) + sys.getsizeof(message.text)
+    if (doc := message.document) is not None:
+        size += sys.getsizeof(doc) + len(doc.file_reference) + len(doc.mime_type or "")
+    return size
+
+
+class EntryState(Enum):
+    MISSING = "missing"
+    # the message is known to be gone, there is no point in asking Telegram again
+    DELETED = "deleted"
+    PRESENT = "present"
+
+
+@dataclass(slots=True, frozen=True)
+class _Deleted:
+    expires_at: float
+
+
 class MessageCache(Generic[K, V]):
-    def __init__(self):
-        self._lru = LRU(1024)  # type: LRU[K, V]
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+        deleted_ttl: float = 600,
+    ):
+        self._lru = LRU(
+            max_entries, callback=self._evicted
+        )  # type: LRU[K, Union[V, _Deleted]]
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._deleted_ttl = deleted_ttl
+
+        self.size_bytes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _size(self, value: Union[V, _Deleted, None]) -> int:
+        if self._sizeof is None or value is None or isinstance(value, _Deleted):
+            return 0
+        return self._sizeof(value)
+
+    def _evicted(self, key: K, value: Union[V, _Deleted]) -> None:
+        self.evictions += 1
+        self.size_bytes -= self._size(value)
+
+    def _set(self, key: K, value: Union[V, _Deleted]) -> None:
+        self.size_bytes -= self._size(self._lru.get(key))
+        self._lru[key] = value
+        self.size_bytes += self._size(value)
+
+        if self._max_bytes is not None:
+            while self.size_bytes > self._max_bytes and len(self._lru) > 1:
+                self._evicted(*self._lru.popitem())
+
+    def _entry(self, key: K) -> Union[V, _Deleted, None]:
+        entry = self._lru.get(key)
+        if isinstance(entry, _Deleted) and entry.expires_at <= time.monotonic():
+            del self._lru[key]
+            return None
+        return entry
+
+    def state(self, key: K) -> EntryState:
+        entry = self._entry(key)
+        if entry is None:
+            return EntryState.MISSING
+        if isinstance(entry, _Deleted):
+            return EntryState.DELETED
+        return EntryState.PRESENT
 
     def get(self, key: K) -> Optional[V]:
-        return self._lru.get(key)
+        """The cached value, None if it is missing or known to be deleted"""
+        entry = self._entry(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if isinstance(entry, _Deleted):
+            self.negative_hits += 1
+            return None
+        self.hits += 1
+        return entry
 
     def __setitem__(self, key: K, value: V) -> None:
-        self._lru[key] = value
+        self._set(key, value)
 
     def __getitem__(self, key: K) -> V:
-        return self._lru[key]
+        if (value := self.get(key)) is None:
+            raise KeyError(key)
+        return value
+
+    def mark_deleted(self, key: K) -> None:
+        """Remember for a while that the key has no value"""
+        self._set(key, _Deleted(time.monotonic() + self._deleted_ttl))
+
+    def invalidate(self, key: K) -> None:
+        """Forget the key, the next lookup goes to the source again"""
+        self.size_bytes -= self._size(self._lru.pop(key, None))
+
+    def clear(self) -> None:
+        self._lru.clear()
+        self.size_bytes = 0
 
     def __contains__(self, key: K) -> bool:
-        return key in self._lru
+        return self.state(key) == EntryState.PRESENT
+
+    async def load(self, keys: Iterable[K]) -> None:
+        """Bring entries kept outside of memory in, before the keys are looked up"""
 
     def gets(self, keys: Iterable[K]) -> List[Optional[V]]:
         return [self.get(key) for key in keys]
 
     def find_nonexistent(self, keys: Iterable[K]) -> List[K]:
-        return [key for key in keys if self.get(key) is None]
+        """The keys which have to be looked up at the source"""
+        return [key for key in keys if self.state(key) == EntryState.MISSING]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._lru),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class PersistentMessageCache(MessageCache[int, MessageResp]):
+    """
+    Messages by id, backed by a local store which outlives the process: load() looks
+    up the keys missing in memory in the store, and the first load() brings the most
+    recently stored messages back into memory.
+    """
+
+    def __init__(
+        self,
+        store: ChannelMessageStore,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        deleted_ttl: float = 600,
+    ):
+        super().__init__(max_entries, max_bytes, message_size, deleted_ttl)
+        self._store = store
+        self._warm = False
+        # bumped by every removal, a lookup in the store which overlapped one may
+        # have read what was removed
+        self._removals = 0
+        self.store_hits = 0
+
+    async def load(self, keys: Iterable[int]) -> None:
+        removals = self._removals
+        found: List[MessageResp] = []
+        if not self._warm:
+            self._warm = True
+            found = await self._store.recent(self._lru.get_size())
+        if missing := [key for key in keys if key not in self._lru]:
+            stored = await self._store.get_many(missing)
+            self.store_hits += len(stored)
+            found.extend(stored.values())
+
+        if self._removals != removals:
+            return
+        for message in found:
+            if message.message_id not in self._lru:
+                self._set(message.message_id, message)
+
+    def __setitem__(self, key: int, value: MessageResp) -> None:
+        super().__setitem__(key, value)
+        self._store.put(value)
+
+    def mark_deleted(self, key: int) -> None:
+        super().mark_deleted(key)
+        self._removals += 1
+        self._store.delete(key)
+
+    def invalidate(self, key: int) -> None:
+        super().invalidate(key)
+        self._removals += 1
+        self._store.delete(key)
+
+    def clear(self) -> None:
+        super().clear()
+        self._removals += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**super().stats(), "store_hits": self.store_hits}
 
 
 @dataclass
 class ChannelMessageCache:
-    id: MessageCache[int, Optional[MessageResp]]
+    id: MessageCache[int, MessageResp]
     search: MessageCache[str, Tuple[MessageResp, ...]]
+    # parsed and validated file descriptors, keyed by the descriptor message id
+    fd: MessageCache[int, "TGFSFileDesc"]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "id": self.id.stats(),
+            "search": self.search.stats(),
+            "fd": self.fd.stats(),
+        }
+
+    def invalidate(self, message_id: int) -> None:
+        """Forget everything derived from a message which changed"""
+        self.id.invalidate(message_id)
+        self.fd.invalidate(message_id)
+        # the message may match different searches now
+        self.search.clear()
 
 
-global_message_cache: DefaultDict[int, ChannelMessageCache] = defaultdict(
-    lambda: ChannelMessageCache(
-        id=MessageCache[int, Optional[MessageResp]](),
-        search=MessageCache[str, Tuple[MessageResp, ...]](),
+_config: Optional[MessageCacheConfig] = None
+_store: Optional[MessageStore] = None
+
+
+def _create_channel_cache(channel_id: int) -> ChannelMessageCache:
+    if _config is None:
+        return ChannelMessageCache(
+            id=MessageCache[int, MessageResp](),
+            search=MessageCache[str, Tuple[MessageResp, ...]](),
+            fd=MessageCache[int, "TGFSFileDesc"](),
+        )
+
+    max_entries = _config.max_entries
+    max_bytes = _config.max_size_mb * 1024 * 1024
+    deleted_ttl = _config.deleted_ttl
+    return ChannelMessageCache(
+        id=(
+            PersistentMessageCache(
+                _store.channel(channel_id), max_entries, max_bytes, deleted_ttl
+            )
+            if _store is not None
+            else MessageCache[int, MessageResp](
+                max_entries, max_bytes, message_size, deleted_ttl
+            )
+        ),
+        search=MessageCache[str, Tuple[MessageResp, ...]](
+            max_entries,
+            max_bytes,
+            lambda messages: sum(message_size(m) for m in messages),
+        ),
+        fd=MessageCache[int, "TGFSFileDesc"](max_entries),
     )
-)
+
+
+class ChannelMessageCaches(Dict[int, ChannelMessageCache]):
+    def __missing__(self, channel_id: int) -> ChannelMessageCache:
+        cache = self[channel_id] = _create_channel_cache(channel_id)
+        return cache
+
+
+global_message_cache = ChannelMessageCaches()
+
+
+def configure_message_cache(config: MessageCacheConfig) -> None:
+    """Size the caches created from now on and open the persistent store"""
+    global _config, _store
+    _config = config
+    if _store is not None:
+        _store.close()
+    _store = (
+        MessageStore(
+            config.path, config.store_max_size_mb * 1024 * 1024, config.store_max_age
+        )
+        if config.persistent
+        else None
+    )
+    global_message_cache.clear()
 
 
 def channel_cache(channel_id: int) -> ChannelMessageCache:
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence, TypeVar
+
+from tgfs.reqres import MessageResp
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# bumped whenever the table changes, older databases are dropped (they are caches)
+SCHEMA_VERSION = 1
+# writes between two checks of the size of the database
+PRUNE_EVERY = 1000
+# ids per query, below the variable limit of old SQLite builds
+QUERY_SIZE = 500
+
+
+class MessageStore:
+    """
+    SQLite database behind the in-memory message caches, so that a restart does not
+    fetch every file descriptor from Telegram again.
+
+    Only text messages are kept. The file references of documents expire, a stale
+    one would fail the download instead of saving a request. Edits made while the
+    process was not running are never seen, so a stored message is only trusted for
+    `max_age` seconds. The stored texts are kept under `max_bytes`, oldest first out.
+
+    The database is only used from a thread of its own, in the order of the calls.
+    Reads are awaited, writes are not waited for.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_age: float):
+        if (directory := os.path.dirname(path)) and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="message-store"
+        )
+
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS messages")
+            self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " channel INTEGER NOT NULL,"
+            " message_id INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " PRIMARY KEY (channel, message_id))"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS messages_stored_at ON messages (stored_at)"
+        )
+        self._submit(self._prune)
+
+    def channel(self, channel: int) -> "ChannelMessageStore":
+        return ChannelMessageStore(self, channel)
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _submit(self, func: Callable[..., None], *args: Any) -> None:
+        def write() -> None:
+            try:
+                func(*args)
+            except sqlite3.Error as ex:
+                logger.warning(f"Failed to write the message store: {ex}")
+
+        self._executor.submit(write)
+
+    def _oldest_trusted(self) -> float:
+        return time.time() - self._max_age
+
+    async def get_many(
+        self, channel: int, message_ids: Sequence[int]
+    ) -> Dict[int, MessageResp]:
+        return await self._run(self._get_many, channel, message_ids)
+
+    def _get_many(
+        self, channel: int, message_ids: Sequence[int]
+    ) -> Dict[int, MessageResp]:
+        res = {}
+        for i in range(0, len(message_ids), QUERY_SIZE):
+            ids = message_ids[i : i + QUERY_SIZE]
+            placeholders = ", ".join("?" * len(ids))
+            rows = self._db.execute(
+                "SELECT message_id, text FROM messages"  # noqa: S608
+                f" WHERE channel = ? AND stored_at >= ? AND message_id IN ({placeholders})",
+                (channel, self._oldest_trusted(), *ids),
+            ).fetchall()
+            for message_id, text in rows:
+                res[message_id] = MessageResp(message_id, text, None)
+        return res
+
+    def put(self, channel: int, message: MessageResp) -> None:
+        if message.document is not None:
+            return
+        self._submit(self._put, channel, message, time.time())
+
+    def _put(self, channel: int, message: MessageResp, stored_at: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO messages (channel, message_id, text, stored_at)"
+            " VALUES (?, ?, ?, ?)",
+            (channel, message.message_id, message.text, stored_at),
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self._prune()
+
+    def delete(self, channel: int, message_id: int) -> None:
+        self._submit(self._delete, channel, message_id)
+
+    def _delete(self, channel: int, message_id: int) -> None:
+        self._db.execute(
+            "DELETE FROM messages WHERE channel = ? AND message_id = ?",
+            (channel, message_id),
+        )
+
+    def _prune(self) -> None:
+        self._db.execute(
+            "DELETE FROM messages WHERE stored_at < ?", (self._oldest_trusted(),)
+        )
+        self._db.execute(
+            "DELETE FROM messages WHERE rowid IN ("
+            " SELECT rowid FROM ("
+            "  SELECT rowid, SUM(LENGTH(CAST(text AS BLOB)))"
+            "   OVER (ORDER BY stored_at DESC, rowid DESC) AS total"
+            "  FROM messages)"
+            " WHERE total > ?)",
+            (self._max_bytes,),
+        )
+
+    async def recent(self, channel: int, limit: int) -> List[MessageResp]:
+        """The last written messages of a channel, oldest first"""
+        return await self._run(self._recent, channel, limit)
+
+    def _recent(self, channel: int, limit: int) -> List[MessageResp]:
+        rows = self._db.execute(
+            "SELECT message_id, text FROM messages WHERE channel = ? AND stored_at >= ?"
+            " ORDER BY stored_at DESC, rowid DESC LIMIT ?",
+            (channel, self._oldest_trusted(), limit),
+        ).fetchall()
+        return [
+            MessageResp(message_id, text, None) for message_id, text in reversed(rows)
+        ]
+
+    def close(self) -> None:
+        # pending writes go through first
+        self._executor.shutdown(wait=True)
+        self._db.close()
+
+
+class ChannelMessageStore:
+    def __init__(self, store: MessageStore, channel: int):
+        self._store = store
+        self._channel = channel
+
+    async def get_many(self, message_ids: Sequence[int]) -> Dict[int, MessageResp]:
+        return await self._store.get_many(self._channel, message_ids)
+
+    def put(self, message: MessageResp) -> None:
+        self._store.put(self._channel, message)
+
+    def delete(self, message_id: int) -> None:
+        self._store.delete(self._channel, message_id)
+
+    async def recent(self, limit: int) -> List[MessageResp]:
+        return await self._store.recent(self._channel, limit)
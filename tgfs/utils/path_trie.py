@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Iterator, List, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class _Node(Generic[V]):
+    __slots__ = ("key", "parent", "children", "value", "expires_at")
+
+    def __init__(self, key: str, parent: Optional["_Node[V]"]):
+        self.key = key
+        self.parent = parent
+        self.children: Optional[Dict[str, _Node[V]]] = None
+        self.value: Optional[V] = None
+        self.expires_at: Optional[float] = None
+
+
+class PathTrie(Generic[V]):
+    """
+    Values keyed by path, with the paths stored as a trie so that a whole subtree
+    can be dropped at once. Lookups never create nodes: a node exists only while it
+    or something below it holds a value, so probing random paths does not grow the
+    trie. At most `max_entries` values are kept, the least recently used ones are
+    evicted first. With a `ttl`, values are dropped that many seconds after they
+    were set.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: Optional[float] = None):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._root: _Node[V] = _Node("", None)
+        # nodes holding a value, least recently used first
+        self._lru: OrderedDict[_Node[V], None] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def split_path(path: str) -> List[str]:
+        path = path.strip("/")
+        if path == "":
+            return [""]
+        return ["", *path.split("/")]
+
+    def _find(self, parts: List[str]) -> Optional[_Node[V]]:
+        node = self._root
+        for part in parts:
+            if node.children is None or (child := node.children.get(part)) is None:
+                return None
+            node = child
+        return node
+
+    def _insert(self, parts: List[str]) -> _Node[V]:
+        node = self._root
+        for part in parts:
+            if node.children is None:
+                node.children = {}
+            if (child := node.children.get(part)) is None:
+                child = node.children[part] = _Node(part, node)
+            node = child
+        return node
+
+    def _prune(self, node: _Node[V]) -> None:
+        """Remove the node and its ancestors as long as they hold nothing"""
+        while node.parent is not None and node.value is None and not node.children:
+            parent = node.parent
+            if parent.children is not None:
+                del parent.children[node.key]
+            node.parent = None
+            node = parent
+
+    def _drop_value(self, node: _Node[V]) -> None:
+        if node.value is not None:
+            node.value = None
+            node.expires_at = None
+            del self._lru[node]
+
+    def get(self, path: str) -> Optional[V]:
+        node = self._find(self.split_path(path))
+        if node is None or node.value is None:
+            self.misses += 1
+            return None
+        if node.expires_at is not None and node.expires_at <= time.monotonic():
+            self._drop_value(node)
+            self._prune(node)
+            self.misses += 1
+            return None
+        self._lru.move_to_end(node)
+        self.hits += 1
+        return node.value
+
+    def set(self, path: str, value: Optional[V]) -> None:
+        """Values cached below the path stay"""
+        if value is None:
+            self.discard(path)
+            return
+
+        node = self._insert(self.split_path(path))
+        node.value = value
+        node.expires_at = None if self._ttl is None else time.monotonic() + self._ttl
+        self._lru[node] = None
+        self._lru.move_to_end(node)
+
+        while len(self._lru) > self._max_entries:
+            evicted, _ = self._lru.popitem(last=False)
+            evicted.value = None
+            evicted.expires_at = None
+            self.evictions += 1
+            self._prune(evicted)
+
+    def discard(self, path: str) -> None:
+        """Drop the value at the path, but not the ones below it"""
+        if (node := self._find(self.split_path(path))) is not None:
+            self._drop_value(node)
+            self._prune(node)
+
+    def reset(self, path: str) -> None:
+        """Drop the value at the path and everything below it"""
+        if (node := self._find(self.split_path(path))) is None:
+            return
+        for n in self._walk(node):
+            self._drop_value(n)
+        node.children = None
+        self._prune(node)
+
+    def reset_parent(self, path: str) -> None:
+        parts = self.split_path(path)
+        self.reset("/".join(parts[:-1]))
+
+    def clear(self) -> None:
+        self._root = _Node("", None)
+        self._lru.clear()
+
+    @staticmethod
+    def _walk(node: _Node[V]) -> Iterator[_Node[V]]:
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            yield n
+            if n.children:
+                stack.extend(n.children.values())
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._lru),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }